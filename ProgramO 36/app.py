@@ -1,6 +1,7 @@
-from sqlite3 import IntegrityError
 from flask import (
     Flask,
+    Response,
+    stream_with_context,
     render_template,
     request,
     redirect,
@@ -8,23 +9,132 @@ from flask import (
     session,
     flash,
     jsonify,
+    make_response,
 )
-from collections import defaultdict
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict, defaultdict
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 import re
+import sqlite3
+import threading
+import struct
+import zlib
+import hashlib
+import csv
+import io
+import zipfile
+from itertools import groupby
+from xml.sax.saxutils import escape as xml_escape
 import copy
 import random
 import os
+import time
+import math
+import multiprocessing
+import json
+import uuid
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "default_secret_key")
 
+
 # Veritabanı Konfigürasyonu
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///ders_dagitim.db"
+def database_url():
+    url = os.environ.get("DATABASE_URL", "sqlite:///ders_dagitim.db")
+    # Bazı barındırma servisleri eski "postgres://" önekini verir
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://") :]
+    return url
+
+
+def database_engine_options(url):
+    """
+    Motor ayarları. SQLite için kilit bekleme süresi verilir (pragmalar
+    set_sqlite_pragmas içinde); sunucu veritabanları için bağlantı havuzu
+    ortam değişkenleriyle ayarlanır.
+    """
+    if url.startswith("sqlite"):
+        return {
+            "connect_args": {
+                "timeout": app.config["SQLITE_BUSY_TIMEOUT"],
+                # Çözücü işleri ayrı iş parçacıklarında çalışır
+                "check_same_thread": False,
+            }
+        }
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+
+app.config["SQLITE_BUSY_TIMEOUT"] = float(os.environ.get("SQLITE_BUSY_TIMEOUT", 30))
+app.config["SQLITE_CACHE_SIZE_KB"] = int(os.environ.get("SQLITE_CACHE_SIZE_KB", 65536))
+app.config["SQLALCHEMY_DATABASE_URI"] = database_url()
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = database_engine_options(
+    app.config["SQLALCHEMY_DATABASE_URI"]
+)
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Her yeni SQLite bağlantısında: WAL günlüğü (okuyucular yazarı beklemez),
+    kilit bekleme süresi, WAL ile güvenli olan NORMAL senkronizasyon ve
+    büyütülmüş sayfa önbelleği.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(
+        f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT'] * 1000)}"
+    )
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE_KB']}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+# Çözücü sınırları
+app.config["SOLVER_NODE_LIMIT"] = int(os.environ.get("SOLVER_NODE_LIMIT", 200000))
+app.config["SOLVER_TIME_LIMIT"] = float(os.environ.get("SOLVER_TIME_LIMIT", 30))
+app.config["SOLVER_WORKERS"] = int(
+    os.environ.get("SOLVER_WORKERS", os.cpu_count() or 1)
+)
+app.config["SOLVER_IMPROVE_TIME_LIMIT"] = float(
+    os.environ.get("SOLVER_IMPROVE_TIME_LIMIT", 5)
+)
+app.config["SCHEDULE_SAVE_DIFF"] = os.environ.get("SCHEDULE_SAVE_DIFF", "1") == "1"
+app.config["FILTERED_DATA_PAGE_SIZE"] = int(
+    os.environ.get("FILTERED_DATA_PAGE_SIZE", 500)
+)
+app.config["SCHEDULE_SNAPSHOT_KEEP"] = int(os.environ.get("SCHEDULE_SNAPSHOT_KEEP", 20))
+app.config["SCHEDULE_VIEW_CACHE_SIZE"] = int(
+    os.environ.get("SCHEDULE_VIEW_CACHE_SIZE", 64)
+)
+# Şablonlar değiştiğinde (yeni sürüm dağıtımı) programlar sayfasının ETag'leri
+# yenilensin diye anahtara katılır; tüm süreçlerde aynı olmalıdır
+app.config["APP_RELEASE"] = os.environ.get("APP_RELEASE", "")
+app.config["IMPORT_BATCH_SIZE"] = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+app.config["SOLVER_STARTS"] = int(os.environ.get("SOLVER_STARTS", 8))
+app.config["SOLVER_EVENT_INTERVAL"] = float(
+    os.environ.get("SOLVER_EVENT_INTERVAL", 0.25)
+)
+app.config["SOLVER_JOB_WORKERS"] = int(os.environ.get("SOLVER_JOB_WORKERS", 2))
+app.config["GA_POPULATION_SIZE"] = int(os.environ.get("GA_POPULATION_SIZE", 40))
+app.config["GA_GENERATIONS"] = int(os.environ.get("GA_GENERATIONS", 300))
+
 db = SQLAlchemy(app)
 
 
@@ -78,6 +188,18 @@ class Course(db.Model):
 
 
 class TeacherCourseAssignment(db.Model):
+    # Aynı ders aynı öğretmene aynı sınıf için bir kez atanabilir
+    __table_args__ = (
+        db.Index(
+            "uq_assignment_course_teacher_class",
+            "course_id",
+            "teacher_id",
+            "class_id",
+            unique=True,
+        ),
+        db.Index("ix_assignment_user", "user_id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     course_id = db.Column(db.Integer, db.ForeignKey("course.id"), nullable=False)
     teacher_id = db.Column(db.Integer, db.ForeignKey("teacher.id"), nullable=False)
@@ -90,6 +212,8 @@ class TeacherCourseAssignment(db.Model):
 
 
 class Schedule(db.Model):
+    __table_args__ = (db.Index("ix_schedule_user_day_hour", "user_id", "day", "hour"),)
+
     id = db.Column(db.Integer, primary_key=True)
     day = db.Column(db.String(10), nullable=False)
     hour = db.Column(db.Integer, nullable=False)
@@ -100,7 +224,27 @@ class Schedule(db.Model):
         return f"<Schedule {self.day} {self.hour}>"
 
 
+class ScheduleVersion(db.Model):
+    """
+    Kullanıcının program girdilerinin sürüm sayaçları. version okul açık
+    saatleri tablosu, availability_version öğretmen müsaitliği ve sınıf listesi,
+    view_version programlar sayfasındaki adlar her değiştiğinde artar; süreç
+    içi önbellekler bu sayaçlarla doğrulanır.
+    """
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    availability_version = db.Column(db.Integer, nullable=True, default=0)
+    view_version = db.Column(db.Integer, nullable=True, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
 class TeacherSchedule(db.Model):
+    __table_args__ = (
+        db.Index("ix_teacher_schedule_user_day_hour", "user_id", "day", "hour"),
+        db.Index("ix_teacher_schedule_teacher_day_hour", "teacher_id", "day", "hour"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     day = db.Column(db.String(20), nullable=False)
     hour = db.Column(db.Integer, nullable=False)
@@ -114,6 +258,12 @@ class TeacherSchedule(db.Model):
 
 
 class CourseSchedule(db.Model):
+    __table_args__ = (
+        db.Index("ix_course_schedule_user_day_hour", "user_id", "day", "hour"),
+        db.Index("ix_course_schedule_teacher_day_hour", "teacher_id", "day", "hour"),
+        db.Index("ix_course_schedule_class_day_hour", "class_id", "day", "hour"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     day = db.Column(db.String(10), nullable=False)
     hour = db.Column(db.Integer, nullable=False)
@@ -128,9 +278,136 @@ class CourseSchedule(db.Model):
     user = db.relationship("User", backref="course_schedules", lazy=True)
 
 
-with app.app_context():
-    db.create_all()
-    print("Veritabanı oluşturuldu!")
+class ScheduleSnapshot(db.Model):
+    """
+    Bir çözümün sürümlü, sıkıştırılmış kopyası. Hücreler pack_cells ile tek
+    bir ikili alanda tutulur; sürüm numarası kullanıcı bazında artar.
+    """
+
+    __table_args__ = (
+        db.Index("uq_snapshot_user_version", "user_id", "version", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    engine = db.Column(db.String(20), nullable=True)
+    seed = db.Column(db.Integer, nullable=True)
+    cell_count = db.Column(db.Integer, nullable=False, default=0)
+    unplaced_hours = db.Column(db.Integer, nullable=False, default=0)
+    cells = db.Column(db.LargeBinary, nullable=False)
+    # Yerleştirilemeyen dersler (JSON)
+    unplaced = db.Column(db.Text, nullable=True)
+
+
+class ActiveSchedule(db.Model):
+    """Kullanıcının yayındaki program sürümünü gösteren işaretçi."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    snapshot_id = db.Column(
+        db.Integer, db.ForeignKey("schedule_snapshot.id"), nullable=False
+    )
+    published_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class SolverJob(db.Model):
+    """Arka planda çalışan bir program oluşturma işi."""
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    engine = db.Column(db.String(20), nullable=False)
+    time_limit = db.Column(db.Float, nullable=True)
+    # queued, running, done, failed
+    status = db.Column(db.String(10), nullable=False, default="queued")
+    phase = db.Column(db.String(50), nullable=True)
+    unplaced_hours = db.Column(db.Integer, nullable=True)
+    # Çoklu başlangıçta kazanan rastgelelik tohumu
+    seed = db.Column(db.Integer, nullable=True)
+    # İşin yayına aldığı program sürümü (ScheduleSnapshot.version)
+    snapshot_version = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        end = self.finished_at or datetime.now()
+        return {
+            "job_id": self.id,
+            "engine": self.engine,
+            "status": self.status,
+            "phase": self.phase,
+            "elapsed": (
+                round((end - self.started_at).total_seconds(), 1)
+                if self.started_at
+                else 0
+            ),
+            "unplaced_hours": self.unplaced_hours,
+            "seed": self.seed,
+            "snapshot_version": self.snapshot_version,
+            "error": self.error,
+        }
+
+
+def upgrade_database():
+    """
+    Mevcut veritabanı dosyalarını modellere yetiştirir. db.create_all yalnızca
+    eksik tabloları oluşturduğundan eksik sütunlar ve indeksler burada eklenir.
+    """
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    print(f"{table.name}.{column.name} sütunu eklenemedi: boş olamaz.")
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(
+                    db.text(
+                        f'ALTER TABLE "{table.name}" '
+                        f'ADD COLUMN "{column.name}" {column_type}'
+                    )
+                )
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+            except IntegrityError:
+                # Eski veride yinelenen satırlar varsa benzersiz indeks kurulamaz
+                print(f"{index.name} oluşturulamadı: yinelenen kayıtlar var.")
+
+
+def init_database():
+    """
+    Tabloları oluşturur, şemayı yükseltir ve yarım kalan işleri kapatır.
+    Modül içe aktarılırken ana süreçte kendiliğinden çalışır; elle de
+    çağrılabilir (flask --app app init-db).
+    """
+    with app.app_context():
+        db.create_all()
+        upgrade_database()
+        # Çözücü işleri süreç içinde yürütüldüğünden yeniden başlatmada yarım kalır
+        SolverJob.query.filter(SolverJob.status.in_(("queued", "running"))).update(
+            {"status": "failed", "error": "Sunucu yeniden başlatıldı."}
+        )
+        db.session.commit()
+        print("Veritabanı oluşturuldu!")
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Veritabanını oluşturur ve günceller."""
+    init_database()
+
+
+# Çözücü havuzunun spawn ile başlatılan işçileri bu modülü yeniden içe aktarır;
+# onlar veritabanına dokunmaz, yoksa ana süreçte koşan işi başarısız sayarlar
+if multiprocessing.parent_process() is None:
+    init_database()
 
 
 def login_required(f):
@@ -175,6 +452,49 @@ def validate_course_format(format_str, weekly_hours):
     return True, None
 
 
+def clean_teacher(name, surname, email, branch):
+    """Öğretmen alanlarını form kurallarıyla doğrular: (değerler, hata)."""
+    name, surname, branch = (format_name(v or "") for v in (name, surname, branch))
+    email = validate_email((email or "").strip())
+    if not name or not surname or not branch:
+        return None, "Öğretmen için ad, soyad ve branş zorunludur."
+    if email is False:
+        return None, "Geçersiz e-posta adresi!"
+    return {"name": name, "surname": surname, "email": email, "branch": branch}, None
+
+
+def clean_class(class_name):
+    """Sınıf adını form kurallarıyla doğrular: (değerler, hata)."""
+    class_name = (class_name or "").strip()
+    if not class_name:
+        return None, "Sınıf adı boş bırakılamaz!"
+    if not class_name.isalnum():
+        return None, "Sınıf adı sadece harf ve rakamlardan oluşmalıdır!"
+    return {"class_name": class_name.upper()}, None
+
+
+def clean_course(course_name, short_name, weekly_hours, distribution_format):
+    """Ders alanlarını form kurallarıyla doğrular: (değerler, hata)."""
+    course_name = (course_name or "").strip().lower().title()
+    short_name = (short_name or "").strip().upper()
+    distribution_format = str(distribution_format or "").strip()
+    try:
+        weekly_hours = int(weekly_hours)
+    except (TypeError, ValueError):
+        return None, "Haftalık ders sayısı bir tam sayı olmalıdır."
+    if not course_name or not short_name or not distribution_format:
+        return None, "Ders için ad, kısa ad ve yerleştirme biçimi zorunludur."
+    message, valid = validate_course_format(distribution_format, weekly_hours)
+    if valid is False:
+        return None, message
+    return {
+        "course_name": course_name,
+        "short_name": short_name,
+        "weekly_hours": weekly_hours,
+        "distribution_format": distribution_format,
+    }, None
+
+
 # ROUTES
 @app.route("/")
 @login_required
@@ -199,21 +519,13 @@ def okul_bilgileri():
         current_user.school_email = school_email
         current_user.school_principal = school_principal
 
-        for day in DAYS:
-            for hour in HOURS:
-                checkbox_id = f"{day}-{hour}"
-                is_checked = checkbox_id in request.form
-                existing_entry = Schedule.query.filter_by(
-                    day=day, hour=hour, user_id=current_user.id
-                ).first()
-
-                if existing_entry:
-                    existing_entry.is_open = is_checked
-                else:
-                    new_entry = Schedule(
-                        day=day, hour=hour, is_open=is_checked, user_id=current_user.id
-                    )
-                    db.session.add(new_entry)
+        open_cells = {
+            (day, hour): f"{day}-{hour}" in request.form
+            for day in DAYS
+            for hour in HOURS
+        }
+        save_school_schedule(current_user.id, schedules_from_db, open_cells)
+        invalidate_availability(current_user.id)
         db.session.commit()
         flash("Okul bilgileri güncellendi.", "success")
         return redirect(url_for("okul_bilgileri"))
@@ -228,6 +540,50 @@ def okul_bilgileri():
     )
 
 
+def save_school_schedule(user_id, schedules_from_db, open_cells):
+    """
+    Okul açık saatleri tablosunu toplu olarak günceller: değişen satırlar tek
+    bir UPDATE, eksik hücreler tek bir INSERT ile yazılır. Tablo değiştiyse
+    sürüm numarası artırılır. Commit çağırana bırakılır.
+    """
+    updates = []
+    for entry in schedules_from_db:
+        is_open = open_cells.get((entry.day, entry.hour))
+        if is_open is not None and entry.is_open != is_open:
+            updates.append({"id": entry.id, "is_open": is_open})
+    existing_cells = {(entry.day, entry.hour) for entry in schedules_from_db}
+    inserts = [
+        {"day": day, "hour": hour, "is_open": is_open, "user_id": user_id}
+        for (day, hour), is_open in open_cells.items()
+        if (day, hour) not in existing_cells
+    ]
+    if updates:
+        db.session.execute(db.update(Schedule), updates)
+    if inserts:
+        db.session.execute(db.insert(Schedule), inserts)
+    if updates or inserts:
+        bump_schedule_version(user_id)
+
+
+def bump_schedule_version(user_id, counter="version"):
+    """ScheduleVersion sayacını yazma işleminin içinde artırır."""
+    column = getattr(ScheduleVersion, counter)
+    result = db.session.execute(
+        db.update(ScheduleVersion)
+        .where(ScheduleVersion.user_id == user_id)
+        .values(
+            {counter: db.func.coalesce(column, 0) + 1, "updated_at": datetime.now()}
+        )
+    )
+    if result.rowcount == 0:
+        db.session.add(ScheduleVersion(user_id=user_id, **{counter: 1}))
+
+
+def get_schedule_version(user_id):
+    version = db.session.get(ScheduleVersion, user_id)
+    return version.version if version else 0
+
+
 @app.route("/ogretmen-programi", methods=["GET", "POST"])
 @login_required
 def ogretmen_programi():
@@ -294,6 +650,7 @@ def ogretmen_programi():
                     )
                     db.session.add(new_entry)
 
+        invalidate_availability(current_user.id)
         db.session.commit()
         flash("Öğretmen programı başarıyla kaydedildi.", "success")
         return redirect(url_for("ogretmen_programi", teacher_id=selected_teacher_id))
@@ -318,37 +675,58 @@ def ogretmen_programi():
 @login_required
 def assign_school_schedule_to_teachers():
     current_user = User.query.filter_by(username=session["username"]).first()
-    school_schedule = Schedule.query.filter_by(user_id=current_user.id).all()
-
-    if not school_schedule:
+    if not Schedule.query.filter_by(user_id=current_user.id).first():
         flash("Okul programı bulunamadı.", "danger")
         return redirect(url_for("ogretmen_programi"))
 
-    teachers = Teacher.query.filter_by(user_id=current_user.id).all()
+    # teacher_ids verilmezse tüm öğretmenlere atanır
+    teacher_ids = request.form.getlist("teacher_ids", type=int)
+    teacher_query = db.select(Teacher.id).where(Teacher.user_id == current_user.id)
+    if teacher_ids:
+        teacher_query = teacher_query.where(Teacher.id.in_(teacher_ids))
+    teacher_ids = db.session.execute(teacher_query).scalars().all()
 
-    if not teachers:
+    if not teacher_ids:
         flash("Öğretmen bulunamadı.", "danger")
         return redirect(url_for("ogretmen_programi"))
-    for teacher in teachers:
-        TeacherSchedule.query.filter(
-            TeacherSchedule.teacher_id == teacher.id,
-            TeacherSchedule.day.in_(DAYS),
-            TeacherSchedule.hour.in_(HOURS),
-        ).delete(synchronize_session=False)
-        for entry in school_schedule:
-            new_schedule = TeacherSchedule(
-                day=entry.day,
-                hour=entry.hour,
-                is_open=entry.is_open,
-                teacher_id=teacher.id,
-                user_id=current_user.id,
-            )
-            db.session.add(new_schedule)
+    copy_school_schedule_to_teachers(current_user.id, teacher_ids)
+    invalidate_availability(current_user.id)
     db.session.commit()
     flash("Okul programı öğretmenlere başarıyla atandı.", "success")
     return redirect(url_for("ogretmen_programi"))
 
 
+def copy_school_schedule_to_teachers(user_id, teacher_ids):
+    """
+    Okul programını verilen öğretmenlere kopyalar: tek bir DELETE ve okul
+    programı ile öğretmenlerin çarpımından tek bir INSERT ... SELECT.
+    Commit çağırana bırakılır.
+    """
+    db.session.execute(
+        db.delete(TeacherSchedule).where(
+            TeacherSchedule.teacher_id.in_(teacher_ids),
+            TeacherSchedule.day.in_(DAYS),
+            TeacherSchedule.hour.in_(HOURS),
+        )
+    )
+    school_rows = (
+        db.select(
+            Schedule.day,
+            Schedule.hour,
+            Schedule.is_open,
+            Teacher.id,
+            Schedule.user_id,
+        )
+        .join(Teacher, Teacher.user_id == Schedule.user_id)
+        .where(Schedule.user_id == user_id, Teacher.id.in_(teacher_ids))
+    )
+    db.session.execute(
+        db.insert(TeacherSchedule).from_select(
+            ["day", "hour", "is_open", "teacher_id", "user_id"], school_rows
+        )
+    )
+
+
 # Öğretmen Ekle
 @app.route("/ogretmen-ekle", methods=["GET", "POST"])
 @login_required
@@ -356,28 +734,21 @@ def add_teacher():
     current_user = User.query.filter_by(username=session["username"]).first()
 
     if request.method == "POST":
-
-        name = request.form.get("ad").strip()
-        surname = request.form.get("soyad").strip()
-        email = request.form.get("email").strip() if request.form.get("email") else None
-        branch = request.form.get("brans").strip()
-
-        # E-posta format kontrolü
-        if email and not re.match(r"[^@]+@[^@]+\.[^@]+", email):
-            flash("Geçersiz e-posta adresi! Lütfen doğru formatta giriniz.", "danger")
+        # Form, içe aktarma ve API aynı doğrulama kurallarını kullanır
+        values, error = clean_teacher(
+            request.form.get("ad"),
+            request.form.get("soyad"),
+            request.form.get("email"),
+            request.form.get("brans"),
+        )
+        if error:
+            flash(error, "danger")
             return redirect(url_for("add_teacher"))
 
-        new_teacher = Teacher(
-            name=name.lower().title(),
-            surname=surname.lower().title(),
-            email=email.lower() if email else None,
-            branch=branch.lower().title(),
-            user_id=current_user.id,
-        )
-        db.session.add(new_teacher)
+        db.session.add(Teacher(user_id=current_user.id, **values))
         db.session.commit()
 
-        flash(f"{name} {surname} başarıyla eklendi!", "success")
+        flash(f"{values['name']} {values['surname']} başarıyla eklendi!", "success")
         return redirect(url_for("add_teacher"))
 
     teachers = (
@@ -404,22 +775,19 @@ def edit_teacher(teacher_id):
     if teacher_to_edit.email == None:
         teacher_to_edit.email = ""
     if request.method == "POST":
-        # Küçük harfe çevir, sonra title() uygula
-        teacher_to_edit.name = request.form.get("ad").lower().title()
-        # Küçük harfe çevir, sonra title() uygula
-        teacher_to_edit.surname = request.form.get("soyad").lower().title()
-        teacher_to_edit.email = (
-            request.form.get("email").lower() if request.form.get("email") else ""
-        )
-        teacher_to_edit.branch = request.form.get("brans").lower().title()
-
-        # E-posta format kontrolü
-        if teacher_to_edit.email and not re.match(
-            r"[^@]+@[^@]+\.[^@]+", teacher_to_edit.email
-        ):
-            flash("Geçersiz e-posta adresi! Lütfen doğru formatta giriniz.", "danger")
+        values, error = clean_teacher(
+            request.form.get("ad"),
+            request.form.get("soyad"),
+            request.form.get("email"),
+            request.form.get("brans"),
+        )
+        if error:
+            flash(error, "danger")
             return redirect(url_for("edit_teacher", teacher_id=teacher_id))
 
+        for key, value in values.items():
+            setattr(teacher_to_edit, key, value)
+        invalidate_schedule_view(current_user.id)
         db.session.commit()
         flash(
             f"{teacher_to_edit.name} {teacher_to_edit.surname} başarıyla güncellendi!",
@@ -449,16 +817,13 @@ def delete_teacher(teacher_id):
         id=teacher_id, user_id=current_user.id
     ).first_or_404()
 
-    assignments = TeacherCourseAssignment.query.filter_by(
-        teacher_id=teacher.id, user_id=current_user.id
-    ).all()
-    for assignment in assignments:
-        db.session.delete(assignment)
-
-    db.session.delete(teacher)
+    name = teacher.name
+    delete_records(Teacher, [teacher.id])
+    invalidate_availability(current_user.id)
+    invalidate_schedule_view(current_user.id)
     db.session.commit()
 
-    flash(f"{teacher.name} başarıyla silindi!", "success")
+    flash(f"{name} başarıyla silindi!", "success")
     return redirect(url_for("add_teacher"))
 
 
@@ -469,27 +834,15 @@ def add_class():
     current_user = User.query.filter_by(username=session["username"]).first()
 
     if request.method == "POST":
-        class_name = request.form.get("sinif_adi")
-
-        # Sınıf adı boşluk kontrolü
-        if not class_name:
-            flash("Sınıf adı boş bırakılamaz!", "danger")
+        values, error = clean_class(request.form.get("sinif_adi"))
+        if error:
+            flash(error, "danger")
             return redirect(url_for("add_class"))
 
-        # Sadece harf ve sayı kontrolü (Python tarafında)
-        if not class_name.isalnum():
-            flash("Sınıf adı sadece harf ve rakamlardan oluşmalıdır!", "danger")
-            return redirect(url_for("add_class"))
-
-        # Büyük harfe çevirme
-        class_name = class_name.upper()
-
-        new_class = Class(
-            class_name=class_name, user_id=current_user.id  # Kullanıcı ID'sini ekle
-        )
-        db.session.add(new_class)
+        db.session.add(Class(user_id=current_user.id, **values))
+        invalidate_availability(current_user.id)
         db.session.commit()
-        flash(f"{class_name} başarıyla eklendi!", "success")
+        flash(f"{values['class_name']} başarıyla eklendi!", "success")
         return redirect(url_for("add_class"))
 
     classes = (
@@ -510,14 +863,15 @@ def edit_class(class_id):
     ).first_or_404()
 
     if request.method == "POST":
-        new_name = request.form.get("sinif_adi")
-        if not new_name:
-            flash("Sınıf adı boş bırakılamaz!", "danger")
+        values, error = clean_class(request.form.get("sinif_adi"))
+        if error:
+            flash(error, "danger")
             return redirect(url_for("edit_class", class_id=class_id))
 
-        class_to_edit.class_name = new_name
+        class_to_edit.class_name = values["class_name"]
+        invalidate_schedule_view(current_user.id)
         db.session.commit()
-        flash(f"Sınıf başarıyla güncellendi: {new_name}", "success")
+        flash(f"Sınıf başarıyla güncellendi: {values['class_name']}", "success")
         return redirect(url_for("add_class"))
 
     classes = (
@@ -540,15 +894,12 @@ def delete_class(class_id):
         id=class_id, user_id=current_user.id
     ).first_or_404()
 
-    assignments = TeacherCourseAssignment.query.filter_by(
-        class_id=class_id, user_id=current_user.id
-    ).all()
-    for assignment in assignments:
-        db.session.delete(assignment)
-
-    db.session.delete(class_to_delete)
+    class_name = class_to_delete.class_name
+    delete_records(Class, [class_to_delete.id])
+    invalidate_availability(current_user.id)
+    invalidate_schedule_view(current_user.id)
     db.session.commit()
-    flash(f"{class_to_delete.class_name} başarıyla silindi!", "success")
+    flash(f"{class_name} başarıyla silindi!", "success")
     return redirect(url_for("add_class"))
 
 
@@ -559,40 +910,19 @@ def add_course():
     current_user = User.query.filter_by(username=session["username"]).first()
 
     if request.method == "POST":
-        course_name = request.form.get("ders_adi").lower().title()
-        short_name = request.form.get("ders_kisa_adi").upper()
-        weekly_hours = int(request.form.get("haftalik_ders_sayisi"))  # Integer'a çevir
-        distribution_format = request.form.get("yerlestirme_bicimi")
-
-        # Yerleştirme biçimi kontrolü (sadece sayı ve + içermeli)
-        if not all(c.isdigit() or c == "+" for c in distribution_format):
-            flash(
-                "Yerleştirme biçimi sadece rakamlar ve '+' işaretinden oluşmalıdır!",
-                "danger",
-            )
-            return redirect(url_for("add_course"))
-
-        # Haftalık ders saati ve yerleştirme biçimi toplam kontrolü
-        distribution_numbers = [
-            int(num) for num in distribution_format.split("+") if num.isdigit()
-        ]
-        if sum(distribution_numbers) != weekly_hours:
-            flash(
-                "Haftalık ders saati ile yerleştirme biçimindeki sayıların toplamı eşit olmalıdır!",
-                "danger",
-            )
+        values, error = clean_course(
+            request.form.get("ders_adi"),
+            request.form.get("ders_kisa_adi"),
+            request.form.get("haftalik_ders_sayisi"),
+            request.form.get("yerlestirme_bicimi"),
+        )
+        if error:
+            flash(error, "danger")
             return redirect(url_for("add_course"))
 
-        new_course = Course(
-            course_name=course_name,
-            short_name=short_name,
-            weekly_hours=weekly_hours,
-            distribution_format=distribution_format,
-            user_id=current_user.id,
-        )
-        db.session.add(new_course)
+        db.session.add(Course(user_id=current_user.id, **values))
         db.session.commit()
-        flash(f"{course_name} başarıyla eklendi!", "success")
+        flash(f"{values['course_name']} başarıyla eklendi!", "success")
         return redirect(url_for("add_course"))
 
     courses = (
@@ -615,32 +945,19 @@ def edit_course(course_id):
     ).first_or_404()
 
     if request.method == "POST":
-        course_to_edit.course_name = request.form.get("ders_adi").lower().title()
-        course_to_edit.short_name = request.form.get("ders_kisa_adi").upper()
-        course_to_edit.weekly_hours = int(request.form.get("haftalik_ders_sayisi"))
-        course_to_edit.distribution_format = request.form.get("yerlestirme_bicimi")
-
-        # Yerleştirme biçimi kontrolü (sadece sayı ve + içermeli)
-        if not all(c.isdigit() or c == "+" for c in course_to_edit.distribution_format):
-            flash(
-                "Yerleştirme biçimi sadece rakamlar ve '+' işaretinden oluşmalıdır!",
-                "danger",
-            )
-            return redirect(url_for("edit_course", course_id=course_id))
-
-        # Haftalık ders saati ve yerleştirme biçimi toplam kontrolü
-        distribution_numbers = [
-            int(num)
-            for num in course_to_edit.distribution_format.split("+")
-            if num.isdigit()
-        ]
-        if sum(distribution_numbers) != course_to_edit.weekly_hours:
-            flash(
-                "Haftalık ders saati ile yerleştirme biçimindeki sayıların toplamı eşit olmalıdır!",
-                "danger",
-            )
+        values, error = clean_course(
+            request.form.get("ders_adi"),
+            request.form.get("ders_kisa_adi"),
+            request.form.get("haftalik_ders_sayisi"),
+            request.form.get("yerlestirme_bicimi"),
+        )
+        if error:
+            flash(error, "danger")
             return redirect(url_for("edit_course", course_id=course_id))
 
+        for key, value in values.items():
+            setattr(course_to_edit, key, value)
+        invalidate_schedule_view(current_user.id)
         db.session.commit()
         flash(f"{course_to_edit.course_name} başarıyla güncellendi!", "success")
         return redirect(url_for("add_course"))
@@ -667,16 +984,13 @@ def delete_course(course_id):
         id=course_id, user_id=current_user.id
     ).first_or_404()
 
-    assignments = TeacherCourseAssignment.query.filter_by(
-        course_id=course.id, user_id=current_user.id
-    ).all()
-    for assignment in assignments:
-        db.session.delete(assignment)
-
-    db.session.delete(course)
+    course_name = course.course_name
+    delete_records(Course, [course.id])
+    invalidate_availability(current_user.id)
+    invalidate_schedule_view(current_user.id)
     db.session.commit()
 
-    flash(f"{course.course_name} başarıyla silindi!", "success")
+    flash(f"{course_name} başarıyla silindi!", "success")
     return redirect(url_for("add_course"))
 
 
@@ -768,18 +1082,31 @@ def assign_course():
 @app.route("/get-filtered-data", methods=["GET"])
 @login_required
 def get_filtered_data():
-    current_user = User.query.filter_by(username=session["username"]).first()
-
+    """
+    Ders atamalarını süzüp sayfa sayfa döndürür (limit/offset). Yanıt bir ETag
+    taşır; içerik değişmediyse If-None-Match isteğine 304 döner.
+    """
     sinif_secimi = request.args.get("sinif_secimi")
     ogretmen_secimi = request.args.get("ogretmen_secimi")
     ders_secimi = request.args.get("ders_secimi")
+    page_size = app.config["FILTERED_DATA_PAGE_SIZE"]
+    limit = min(max(request.args.get("limit", page_size, type=int), 1), page_size)
+    offset = max(request.args.get("offset", 0, type=int), 0)
 
     query = (
-        db.session.query(TeacherCourseAssignment)
-        .join(Course)
-        .join(Teacher)
-        .join(Class)
-        .filter(TeacherCourseAssignment.user_id == current_user.id)
+        db.session.query(
+            TeacherCourseAssignment.id,
+            Course.course_name,
+            Teacher.name,
+            Teacher.surname,
+            Class.class_name,
+            Course.weekly_hours,
+            Course.distribution_format,
+        )
+        .join(Course, Course.id == TeacherCourseAssignment.course_id)
+        .join(Teacher, Teacher.id == TeacherCourseAssignment.teacher_id)
+        .join(Class, Class.id == TeacherCourseAssignment.class_id)
+        .filter(TeacherCourseAssignment.user_id == session["user_id"])
     )
 
     if sinif_secimi:
@@ -789,24 +1116,37 @@ def get_filtered_data():
     if ders_secimi:
         query = query.filter(TeacherCourseAssignment.course_id == ders_secimi)
 
-    # Öğretmen ismine göre sırala
-    query = query.order_by(Teacher.name, Teacher.surname)
-    programlar = query.all()
+    # Öğretmen ismine göre sırala; id sayfaların kararlı olmasını sağlar
+    query = query.order_by(Teacher.name, Teacher.surname, TeacherCourseAssignment.id)
+    # Bir fazla satır, sonraki sayfanın olup olmadığını gösterir
+    programlar = query.limit(limit + 1).offset(offset).all()
 
     result = []
-    for program in programlar:
+    for program in programlar[:limit]:
         result.append(
             {
                 "id": program.id,
-                "course_name": program.course.course_name,
-                "teacher_name": f"{program.teacher.name} {program.teacher.surname}",
-                "class_name": program.class_.class_name,
-                "weekly_hours": program.course.weekly_hours,
-                "distribution_format": program.course.distribution_format,
+                "course_name": program.course_name,
+                "teacher_name": f"{program.name} {program.surname}",
+                "class_name": program.class_name,
+                "weekly_hours": program.weekly_hours,
+                "distribution_format": program.distribution_format,
             }
         )
 
-    return jsonify(result)
+    response = jsonify(
+        {
+            "items": result,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": offset + limit if len(programlar) > limit else None,
+        }
+    )
+    response.add_etag()
+    # Tarayıcı her seferinde ETag ile doğrulasın
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 # Ders Atama Sil
@@ -819,7 +1159,9 @@ def delete_assignment(assignment_id):
             id=assignment_id, user_id=current_user.id
         ).first_or_404()
 
-        db.session.delete(assignment)
+        delete_records(TeacherCourseAssignment, [assignment.id])
+        invalidate_availability(current_user.id)
+        invalidate_schedule_view(current_user.id)
         db.session.commit()
 
         flash("Ders atama başarıyla silindi.", "success")
@@ -830,624 +1172,3013 @@ def delete_assignment(assignment_id):
     return redirect(url_for("assign_course"))
 
 
-# Programlar
-@app.route("/schedules")
-@login_required
-def schedules():
-    current_user = User.query.filter_by(id=session["user_id"]).first()
-    # Ders programlarını tek bir sorguda alma
-    all_schedules = (
-        CourseSchedule.query.filter_by(user_id=current_user.id)
-        .order_by(
-            CourseSchedule.class_id,
-            CourseSchedule.teacher_id,
-            CourseSchedule.day,
-            CourseSchedule.hour,
-        )
-        .all()
-    )
+# Toplu içe aktarma
+IMPORT_KINDS = ("ogretmen", "sinif", "ders", "atama")
 
-    # Açık saatleri alma
-    school_schedule = Schedule.query.filter_by(
-        user_id=current_user.id, is_open=True
-    ).all()
-    open_hours_by_day = create_open_day_hour_set(school_schedule)
 
-    # Yerleştirilemeyen dersleri session'dan alma
-    unplaced_assignments = sorted(
-        session.get("unplaced_assignments", []), key=lambda x: x["class_id"]
-    )
+@app.route("/toplu-ice-aktar", methods=["POST"])
+@login_required
+def bulk_import():
+    """
+    Öğretmen, sınıf, ders ve ders atamalarını tek bir CSV veya JSON
+    dosyasından içe aktarır. Hatalı satır varsa hiçbir kayıt yazılmaz ve
+    hatalar satır satır döndürülür.
+    """
+    user_id = session["user_id"]
+    upload = request.files.get("dosya")
+    stream = upload.stream if upload else request.stream
+    filename = upload.filename if upload else ""
+    content_type = upload.mimetype if upload else request.mimetype
+    try:
+        records = read_import_records(stream, filename, content_type)
+        created, errors = import_records(user_id, records)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        created, errors = {}, [{"satir": None, "hata": f"Dosya okunamadı: {e}"}]
+
+    if wants_json() or not upload:
+        status = 422 if errors else 200
+        return jsonify({"created": created, "errors": errors}), status
+    if errors:
+        for error in errors[:10]:
+            row = f"{error['satir']}. satır: " if error["satir"] else ""
+            flash(f"{row}{error['hata']}", "danger")
+        if len(errors) > 10:
+            flash(
+                f"... ve {len(errors) - 10} hata daha. Hiçbir kayıt eklenmedi.",
+                "danger",
+            )
+    else:
+        summary = ", ".join(f"{count} {kind}" for kind, count in created.items())
+        flash(f"İçe aktarma tamamlandı: {summary}.", "success")
+    return redirect(url_for("assign_course"))
 
-    # Program yapıları
-    schedule_by_class = {}
-    schedule_by_teacher = {}
 
-    # Programları işleme
-    for entry in all_schedules:
-        # Sınıf bazlı program
-        class_id = entry.class_id
-        if class_id not in schedule_by_class:
-            schedule_by_class[class_id] = {
-                "class_name": entry.class_.class_name,
-                "schedule": {day: {} for day in open_hours_by_day},
-            }
-        schedule_by_class[class_id]["schedule"][entry.day][entry.hour] = {
-            "course_id": entry.course_id,
-            "course_name": entry.course.course_name,
-            "teacher_name": f"{entry.teacher.name} {entry.teacher.surname}",
-            "teacher_id": entry.teacher.id,
-            "class_name": entry.class_.class_name,
-            "block_id": entry.id,
-        }
+def read_import_records(stream, filename="", content_type=""):
+    """
+    İçe aktarma dosyasını satır satır okuyup (satır no, kayıt) üretir.
+    CSV ve JSON Lines akış olarak okunur; düz JSON ise liste veya
+    {"ogretmen": [...], "sinif": [...], ...} biçiminde olabilir.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if filename.endswith(".csv") or content_type == "text/csv":
+        for number, record in enumerate(csv.DictReader(text), start=2):
+            yield number, record
+    elif filename.endswith(".jsonl") or content_type == "application/x-ndjson":
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{number}. satır: {e}")
+            yield number, record
+    else:
+        data = json.load(text)
+        if isinstance(data, dict):
+            if not all(isinstance(data.get(kind, []), list) for kind in IMPORT_KINDS):
+                raise ValueError("Her kayıt türü bir liste olmalıdır.")
+            # Nesne olmayan kayıtlar satır hatası olarak bildirilir
+            data = [
+                dict(record, tur=kind) if isinstance(record, dict) else record
+                for kind in IMPORT_KINDS
+                for record in data.get(kind, [])
+            ]
+        elif not isinstance(data, list):
+            raise ValueError(
+                "JSON bir liste veya kayıt türlerine göre listeler içeren "
+                "bir nesne olmalıdır."
+            )
+        for number, record in enumerate(data, start=1):
+            yield number, record
 
-        # Öğretmen bazlı program
-        teacher_id = entry.teacher_id
-        if teacher_id not in schedule_by_teacher:
-            schedule_by_teacher[teacher_id] = {
-                "teacher_name": f"{entry.teacher.name} {entry.teacher.surname}",
-                "schedule": {day: {} for day in open_hours_by_day},
-            }
-        schedule_by_teacher[teacher_id]["schedule"][entry.day][entry.hour] = {
-            "course_id": entry.course_id,
-            "course_name": entry.course.course_name,
-            "teacher_name": f"{entry.teacher.name} {entry.teacher.surname}",
-            "teacher_id": entry.teacher.id,
-            "class_name": entry.class_.class_name,
-            "block_id": entry.id,
-        }
 
-    return render_template(
-        "schedules.html",
-        schedule_by_class=schedule_by_class,
-        schedule_by_teacher=schedule_by_teacher,
-        open_hours_by_day=open_hours_by_day,
-        unplaced_assignments=unplaced_assignments,
+def import_records(user_id, records):
+    """
+    Kayıtları mevcut form kurallarıyla doğrular, isimleri bellekteki
+    eşlemelerle kimliklere çevirir ve hepsini tek işlemde toplu ekler.
+    (eklenen sayıları, satır hataları) döndürür.
+    """
+    teacher_ids, class_ids, course_ids = import_lookup_maps(user_id)
+    # Mevcut atamalar None, dosyadakiler geçtikleri satırla tutulur
+    assigned = dict.fromkeys(
+        db.session.execute(
+            db.select(
+                TeacherCourseAssignment.course_id,
+                TeacherCourseAssignment.teacher_id,
+                TeacherCourseAssignment.class_id,
+            ).where(TeacherCourseAssignment.user_id == user_id)
+        ).all()
     )
 
+    # Yeni kayıtlar henüz kimliksiz; eşlemelerde kimlik yerine ("satir", no)
+    # tutulur, böylece aynı kaydın farklı adları (ad soyad ve e-posta, ders
+    # adı ve kısa adı) tek kayda çözülür
+    new_rows = {kind: [] for kind in IMPORT_KINDS}
+    errors = []
+    for number, record in records:
+        record, error = clean_record_fields(record)
+        if error:
+            errors.append({"satir": number, "tur": None, "hata": error})
+            continue
+        kind = (record.get("tur") or "").strip().lower()
+        if kind not in IMPORT_KINDS:
+            error = "Kayıt türü ogretmen, sinif, ders veya atama olmalıdır."
+        elif kind == "ogretmen":
+            error = import_teacher(number, record, teacher_ids, new_rows[kind])
+        elif kind == "sinif":
+            error = import_class(number, record, class_ids, new_rows[kind])
+        elif kind == "ders":
+            error = import_course(number, record, course_ids, new_rows[kind])
+        else:
+            error = import_assignment(
+                number,
+                record,
+                teacher_ids,
+                class_ids,
+                course_ids,
+                assigned,
+                new_rows[kind],
+            )
+        if error:
+            errors.append({"satir": number, "tur": kind, "hata": error})
 
-# Sabitler
-HOURS = [i for i in range(1, 11)]
-DAYS = ["pazartesi", "salı", "çarşamba", "perşembe", "cuma", "cumartesi", "pazar"]
+    created = {kind: len(rows) for kind, rows in new_rows.items()}
+    if errors:
+        return created, errors
 
+    batch_size = app.config["IMPORT_BATCH_SIZE"]
 
-def create_open_day_hour_set(schedules):
-    open_hours_by_day = {
-        day: sorted(
-            {entry.hour for entry in schedules if entry.day == day and entry.is_open},
-            key=HOURS.index,
+    def insert_batches(model, rows):
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(db.insert(model), rows[start : start + batch_size])
+
+    try:
+        insert_batches(
+            Teacher, [dict(row, user_id=user_id) for row in new_rows["ogretmen"]]
         )
-        for day in sorted(
-            {entry.day for entry in schedules if entry.is_open}, key=DAYS.index
+        insert_batches(Class, [dict(row, user_id=user_id) for row in new_rows["sinif"]])
+        insert_batches(Course, [dict(row, user_id=user_id) for row in new_rows["ders"]])
+
+        # Yeni eklenenlerin kimliklerini alıp atamaları çöz
+        if new_rows["atama"]:
+            teacher_ids, class_ids, course_ids = import_lookup_maps(user_id)
+        insert_batches(
+            TeacherCourseAssignment,
+            [
+                {
+                    "course_id": course_ids[course],
+                    "teacher_id": teacher_ids[teacher],
+                    "class_id": class_ids[class_name],
+                    "user_id": user_id,
+                }
+                for teacher, class_name, course in new_rows["atama"]
+            ],
         )
-    }
-    return open_hours_by_day
-
+        invalidate_availability(user_id)
+        invalidate_schedule_view(user_id)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return created, [{"satir": None, "hata": "Kayıtlar veritabanına yazılamadı."}]
 
-def create_teacher_avail(teacher_schedules, open_hours_by_day):
-    teacher_avail = {}
-    # Tüm öğretmen ID'lerini al
-    for teacher_id in {teacher.teacher_id for teacher in teacher_schedules}:
-        teacher_avail[teacher_id] = {}
-        # Her açık gün için öğretmenin müsaitlik durumunu oluştur
-        for day, hours in open_hours_by_day.items():
-            teacher_open_hours = {
-                entry.hour
-                for entry in teacher_schedules
-                if entry.teacher_id == teacher_id and entry.day == day and entry.is_open
-            }
-            teacher_avail[teacher_id][day] = {
-                hour: (hour in teacher_open_hours) for hour in hours
-            }
+    return created, []
 
-    return teacher_avail
 
+def clean_record_fields(record):
+    """
+    İçe aktarma veya API kaydının bir nesne ve alanlarının metin veya sayı
+    olduğunu denetler; sayılar form alanları gibi metne çevrilir: (kayıt, hata).
+    """
+    if not isinstance(record, dict):
+        return None, "Kayıt bir nesne olmalıdır."
+    cleaned = {}
+    for key, value in record.items():
+        # CSV'de başlıktan fazla sütun None anahtarında liste olarak gelir
+        if value is not None and (
+            isinstance(value, bool) or not isinstance(value, (str, int, float))
+        ):
+            return None, "Alan değerleri metin veya sayı olmalıdır."
+        cleaned[key] = str(value) if isinstance(value, (int, float)) else value
+    return cleaned, None
 
-def create_class_avail(classes, school_schedules, open_hours_by_day):
-    class_avail = {}
 
-    # Her sınıf için işlem yap
-    for class_ in classes:
-        class_avail[class_.id] = {}
+def import_lookup_maps(user_id):
+    """Öğretmen, sınıf ve ders adlarından kimliklere bellek içi eşlemeler."""
+    teacher_ids = {}
+    for teacher_id, name, surname, email in db.session.execute(
+        db.select(Teacher.id, Teacher.name, Teacher.surname, Teacher.email).where(
+            Teacher.user_id == user_id
+        )
+    ):
+        teacher_ids[f"{name} {surname}".lower()] = teacher_id
+        if email:
+            teacher_ids[email.lower()] = teacher_id
+    class_ids = dict(
+        db.session.execute(
+            db.select(Class.class_name, Class.id).where(Class.user_id == user_id)
+        ).all()
+    )
+    course_ids = {}
+    for course_id, course_name, short_name in db.session.execute(
+        db.select(Course.id, Course.course_name, Course.short_name).where(
+            Course.user_id == user_id
+        )
+    ):
+        course_ids[course_name.lower()] = course_id
+        course_ids.setdefault(short_name.upper(), course_id)
+    return teacher_ids, class_ids, course_ids
 
-        # Her gün için sınıfın müsaitlik durumu
-        for day, hours in open_hours_by_day.items():
-            class_open_hours = {
-                entry.hour
-                for entry in school_schedules
-                if entry.day == day and entry.is_open
-            }
-            class_avail[class_.id][day] = {
-                hour: (hour in class_open_hours) for hour in hours
-            }
 
-    return class_avail
+def import_duplicate_error(name, existing):
+    """Kayıt veritabanında mı, dosyanın önceki bir satırında mı geçiyor?"""
+    if isinstance(existing, tuple):
+        return f"{name} dosyada {existing[1]}. satırda da geçiyor."
+    return f"{name} zaten kayıtlı."
 
 
-def load_availability():
-    current_user = db.session.get(User, session["user_id"])
-    school_schedules = (
-        db.session.query(Schedule.day, Schedule.hour, Schedule.is_open)
-        .filter_by(user_id=current_user.id, is_open=True)
-        .all()
+def import_teacher(number, record, teacher_ids, new_rows):
+    values, error = clean_teacher(
+        record.get("ad"), record.get("soyad"), record.get("email"), record.get("brans")
     )
-    open_hours_by_day = create_open_day_hour_set(school_schedules)
-    teacher_schedules = (
-        db.session.query(
-            TeacherSchedule.teacher_id,
-            TeacherSchedule.day,
-            TeacherSchedule.hour,
-            TeacherSchedule.is_open,
-        )
-        .filter(
-            TeacherSchedule.user_id == current_user.id,
+    if error:
+        return error
+    key = f"{values['name']} {values['surname']}".lower()
+    email = values["email"]
+    for alias in (key, email):
+        if alias and alias in teacher_ids:
+            return import_duplicate_error(
+                f"{values['name']} {values['surname']}", teacher_ids[alias]
+            )
+    teacher_ids[key] = ("satir", number)
+    if email:
+        teacher_ids[email] = ("satir", number)
+    new_rows.append(values)
+
+
+def import_class(number, record, class_ids, new_rows):
+    values, error = clean_class(record.get("sinif_adi"))
+    if error:
+        return error
+    if values["class_name"] in class_ids:
+        return import_duplicate_error(
+            values["class_name"], class_ids[values["class_name"]]
         )
-        .all()
+    class_ids[values["class_name"]] = ("satir", number)
+    new_rows.append(values)
+
+
+def import_course(number, record, course_ids, new_rows):
+    values, error = clean_course(
+        record.get("ders_adi"),
+        record.get("ders_kisa_adi"),
+        record.get("haftalik_ders_sayisi"),
+        record.get("yerlestirme_bicimi"),
     )
-    teacher_avail = create_teacher_avail(teacher_schedules, open_hours_by_day)
-    classes = Class.query.filter_by(user_id=current_user.id).all()
-    class_avail = create_class_avail(classes, school_schedules, open_hours_by_day)
-    school_avail_data = {
-        "open_hours_by_day": open_hours_by_day,
-    }
-    return teacher_avail, class_avail, open_hours_by_day
+    if error:
+        return error
+    if values["course_name"].lower() in course_ids:
+        return import_duplicate_error(
+            values["course_name"], course_ids[values["course_name"].lower()]
+        )
+    course_ids[values["course_name"].lower()] = ("satir", number)
+    course_ids.setdefault(values["short_name"], ("satir", number))
+    new_rows.append(values)
 
 
-def update_teacher_avail(teacher_avail, teacher_id, day, hour, is_open):
+def import_assignment(
+    number, record, teacher_ids, class_ids, course_ids, assigned, new_rows
+):
+    # Öğretmen "Ad Soyad" veya e-posta, ders ise ad veya kısa adla verilebilir
+    teacher = " ".join((record.get("ogretmen") or "").split()).lower()
+    class_name = (record.get("sinif") or "").strip().upper()
+    course = (record.get("ders") or "").strip()
+    course = course.lower() if course.lower() in course_ids else course.upper()
+    if teacher not in teacher_ids:
+        return f"Öğretmen bulunamadı: {record.get('ogretmen')}"
+    if class_name not in class_ids:
+        return f"Sınıf bulunamadı: {record.get('sinif')}"
+    if course not in course_ids:
+        return f"Ders bulunamadı: {record.get('ders')}"
+    key = (course_ids[course], teacher_ids[teacher], class_ids[class_name])
+    if key in assigned:
+        if assigned[key] is None:
+            return "Bu ders, öğretmen ve sınıf için zaten atanmış."
+        return f"Bu atama dosyada {assigned[key]}. satırda da geçiyor."
+    assigned[key] = number
+    new_rows.append((teacher, class_name, course))
+
+
+# JSON toplu CRUD API
+API_MODELS = {
+    "teachers": Teacher,
+    "classes": Class,
+    "courses": Course,
+    "assignments": TeacherCourseAssignment,
+}
+
+
+@app.route("/api/<entity>/batch", methods=["POST"])
+@login_required
+def api_batch(entity):
     """
-    Öğretmen sözlüğünü güncellemek için fonksiyon.
+    {"create": [...], "update": [{"id": ..., ...}], "delete": [id, ...]}
+    işlemlerini tek işlemde uygular; yalnızca etkilenen satırları döndürür.
     """
-    # Öğretmenin sözlükte olup olmadığını kontrol et
-    if teacher_id not in teacher_avail:
-        teacher_avail[teacher_id] = {}
-    # Belirtilen saati ve açık/kapalı durumunu güncelle
-    teacher_avail[teacher_id][day][hour] = is_open
+    model = API_MODELS.get(entity)
+    if model is None:
+        return jsonify({"error": "Bilinmeyen kayıt türü."}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Geçersiz JSON gövdesi."}), 400
+
+    user_id = session["user_id"]
+    creates = data.get("create") or []
+    updates = data.get("update") or []
+    deletes = data.get("delete") or []
+    if not all(isinstance(ops, list) for ops in (creates, updates, deletes)):
+        return jsonify({"error": "create, update ve delete liste olmalıdır."}), 400
+    if not all(is_record_id(record_id) for record_id in deletes):
+        return jsonify({"error": "delete yalnızca kayıt kimlikleri içermelidir."}), 400
+
+    result, errors = apply_api_batch(user_id, model, creates, updates, deletes)
+    if errors:
+        return jsonify({"errors": errors}), 422
+    return jsonify(result)
 
-    return teacher_avail
+
+def api_row(model, obj):
+    return {
+        column.name: getattr(obj, column.name)
+        for column in model.__table__.columns
+        if column.name != "user_id"
+    }
+
+
+def is_record_id(value):
+    """JSON'daki kayıt kimliği mi? true/false da int olduğundan ayrıca elenir."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def api_values(model, fields, owned=None):
+    """Tek bir kaydın alanlarını form kurallarıyla doğrular: (değerler, hata)."""
+    if model is not TeacherCourseAssignment:
+        fields, error = clean_record_fields(fields)
+        if error:
+            return None, error
+    if model is Teacher:
+        return clean_teacher(
+            fields.get("name"),
+            fields.get("surname"),
+            fields.get("email"),
+            fields.get("branch"),
+        )
+    if model is Class:
+        return clean_class(fields.get("class_name"))
+    if model is Course:
+        return clean_course(
+            fields.get("course_name"),
+            fields.get("short_name"),
+            fields.get("weekly_hours"),
+            fields.get("distribution_format"),
+        )
+    values = {}
+    for key, related in (
+        ("course_id", Course),
+        ("teacher_id", Teacher),
+        ("class_id", Class),
+    ):
+        value = fields.get(key)
+        if not is_record_id(value) or value not in owned[related]:
+            return None, f"{key} bulunamadı: {value}"
+        values[key] = value
+    return values, None
 
 
-def update_class_avail(class_avail, class_id, day, hour, is_open):
+def apply_api_batch(user_id, model, creates, updates, deletes):
     """
-    Sınıf sözlüğünü güncellemek için fonksiyon.
+    Silme, güncelleme ve ekleme işlemlerini doğrulayıp sırasıyla toplu
+    çalıştırır. Hata varsa hiçbir değişiklik yazılmaz.
     """
-    # Sınıfın sözlükte olup olmadığını kontrol et
-    if class_id not in class_avail:
-        class_avail[class_id] = {}
+    errors = []
+    update_ids = [
+        op.get("id") if isinstance(op, dict) and is_record_id(op.get("id")) else None
+        for op in updates
+    ]
+    existing = {
+        obj.id: obj
+        for obj in model.query.filter(
+            model.user_id == user_id, model.id.in_(update_ids + deletes)
+        )
+    }
+    owned = None
+    if model is TeacherCourseAssignment:
+        owned = {
+            related: set(
+                db.session.execute(
+                    db.select(related.id).where(related.user_id == user_id)
+                ).scalars()
+            )
+            for related in (Course, Teacher, Class)
+        }
 
-    # Belirtilen saati ve açık/kapalı durumunu güncelle
-    class_avail[class_id][day][hour] = is_open
+    create_rows = []
+    for index, fields in enumerate(creates):
+        if not isinstance(fields, dict):
+            errors.append({"islem": "create", "sira": index, "hata": "Geçersiz kayıt."})
+            continue
+        values, error = api_values(model, fields, owned)
+        if error:
+            errors.append({"islem": "create", "sira": index, "hata": error})
+        else:
+            create_rows.append(dict(values, user_id=user_id))
 
-    return class_avail
+    update_rows = []
+    for index, (record_id, fields) in enumerate(zip(update_ids, updates)):
+        if record_id not in existing:
+            errors.append(
+                {"islem": "update", "sira": index, "hata": "Kayıt bulunamadı."}
+            )
+            continue
+        # Verilmeyen alanlar mevcut değerleriyle doğrulanır
+        merged = dict(api_row(model, existing[record_id]), **fields)
+        values, error = api_values(model, merged, owned)
+        if error:
+            errors.append({"islem": "update", "sira": index, "hata": error})
+        else:
+            update_rows.append(dict(values, id=record_id))
 
+    for index, record_id in enumerate(deletes):
+        if record_id not in existing:
+            errors.append(
+                {"islem": "delete", "sira": index, "hata": "Kayıt bulunamadı."}
+            )
+        elif record_id in update_ids:
+            errors.append(
+                {
+                    "islem": "delete",
+                    "sira": index,
+                    "hata": "Kayıt ayrıca güncelleniyor.",
+                }
+            )
+    if errors:
+        return None, errors
 
-def course_block_list_get():
-    current_user = User.query.filter_by(username=session["username"]).first()
-    if current_user is None:
-        flash("Kullanıcı bulunamadı. Lütfen tekrar oturum açın.", "danger")
-        return redirect(url_for("login"))
+    try:
+        if deletes:
+            delete_records(model, deletes)
+        if update_rows:
+            db.session.execute(db.update(model), update_rows)
+        created_ids = []
+        if create_rows:
+            created_ids = list(
+                db.session.execute(
+                    db.insert(model).returning(model.id, sort_by_parameter_order=True),
+                    create_rows,
+                ).scalars()
+            )
+        invalidate_availability(user_id)
+        invalidate_schedule_view(user_id)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None, [{"islem": None, "sira": None, "hata": "Kayıt zaten mevcut."}]
 
-    assignments = TeacherCourseAssignment.query.filter_by(user_id=current_user.id).all()
+    # Etkilenen satırları tek sorguda geri oku
+    changed_ids = created_ids + [row["id"] for row in update_rows]
+    rows = {
+        obj.id: api_row(model, obj)
+        for obj in model.query.filter(model.id.in_(changed_ids))
+    }
+    return {
+        "created": [rows[record_id] for record_id in created_ids],
+        "updated": [rows[row["id"]] for row in update_rows],
+        "deleted": deletes,
+    }, None
 
-    if not assignments:
-        flash("Ders ataması bulunamadı. Lütfen önce ders ataması yapın.", "warning")
-        return redirect(url_for("assign_course"))
 
-    course_ids = [assignment.course_id for assignment in assignments]
-    courses = Course.query.filter(Course.id.in_(course_ids)).all()
-    course_dict = {course.id: course for course in courses}
+def delete_records(model, ids):
+    """
+    Kayıtları siler; form ve API silme yolları bunu kullanır. Öğretmen, sınıf
+    veya dersin atamaları ve öğretmenin uygunluk satırları da silinir, program
+    hücrelerindeki bağlantısı boşaltılır. Önbellekleri geçersiz kılmak ve
+    commit çağıranın işidir.
+    """
+    if model is TeacherCourseAssignment:
+        db.session.execute(db.delete(model).where(model.id.in_(ids)))
+        return
+    column = {Teacher: "teacher_id", Class: "class_id", Course: "course_id"}[model]
+    db.session.execute(
+        db.delete(TeacherCourseAssignment).where(
+            getattr(TeacherCourseAssignment, column).in_(ids)
+        )
+    )
+    if model is Teacher:
+        db.session.execute(
+            db.delete(TeacherSchedule).where(TeacherSchedule.teacher_id.in_(ids))
+        )
+    db.session.execute(
+        db.update(CourseSchedule)
+        .where(getattr(CourseSchedule, column).in_(ids))
+        .values({column: None})
+    )
+    db.session.execute(db.delete(model).where(model.id.in_(ids)))
 
-    teacher_dict = {}
-    teacher_ids = [assignment.teacher_id for assignment in assignments]
-    teachers = Teacher.query.filter(Teacher.id.in_(teacher_ids)).all()
-    for teacher in teachers:
-        teacher_dict[teacher.id] = teacher
 
-    class_dict = {}
-    class_ids = [
-        assignment.class_id
-        for assignment in assignments
-        if assignment.class_id is not None
-    ]  # if condition ekle
-    classes = Class.query.filter(Class.id.in_(class_ids)).all()
-    for class_ in classes:
-        class_dict[class_.id] = class_
+# Programlar
+@app.route("/schedules")
+@login_required
+def schedules():
+    """
+    Programlar sayfası. Sayfa, kullanıcı ve yayındaki program sürümüne göre
+    önbelleğe alınır; ETag ve Last-Modified ile tarayıcı değişmemiş sayfayı
+    304 ile doğrular. Gösterilecek flash mesajı veya izlenen bir iş varsa
+    sayfa önbelleğe alınmadan oluşturulur.
+    """
+    user_id = session["user_id"]
+    # Eski sürümlerin çereze yazdığı listeyi temizle
+    session.pop("unplaced_assignments", None)
+    if session.get("_flashes") or request.args.get("job"):
+        return render_schedules_page(user_id)
+
+    key, last_modified = schedule_view_key(user_id)
+    etag = hashlib.sha1(repr(key).encode()).hexdigest()
+    body = schedule_view_cache.get(user_id, etag)
+    if body is None:
+        body = render_schedules_page(user_id)
+        schedule_view_cache.put(user_id, etag, body)
+
+    response = make_response(body)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def render_schedules_page(user_id):
+    # Yerleştirilemeyen dersler yayındaki sürümün kaydından okunur
+    snapshot = get_snapshot(user_id)
+    unplaced_assignments = sorted(
+        json.loads(snapshot.unplaced or "[]") if snapshot else [],
+        key=lambda x: x["class_id"],
+    )
+    schedule_by_class, schedule_by_teacher, open_hours_by_day = build_schedule_view(
+        user_id
+    )
 
-    course_block_list = {}
+    return render_template(
+        "schedules.html",
+        schedule_by_class=schedule_by_class,
+        schedule_by_teacher=schedule_by_teacher,
+        open_hours_by_day=open_hours_by_day,
+        unplaced_assignments=unplaced_assignments,
+        snapshot=snapshot,
+        job_id=request.args.get("job"),
+    )
 
-    block_id_counter = 1  # Ders blokları için sayaç
 
-    for assignment in assignments:
-        # Sadece class_id değeri None olmayan kayıtları dikkate al
-        if assignment.class_id is not None:
-            course = course_dict.get(assignment.course_id)
-            teacher = teacher_dict.get(assignment.teacher_id)
-            class_ = class_dict.get(assignment.class_id)
+class ScheduleViewCache:
+    """
+    Oluşturulmuş programlar sayfaları için LRU önbellek. Girdiler
+    (kullanıcı, ETag) ile tutulur; ETag veritabanındaki sürümlerden
+    türetildiğinden eskiyen girdiler okunmaz, en eski kullanılan girdi atılır.
+    """
 
-            if not course or not teacher or not class_:
-                continue
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
 
-            parts = [int(p) for p in course.distribution_format.split("+") if p]
+    def get(self, user_id, etag):
+        with self.lock:
+            body = self.entries.get((user_id, etag))
+            if body is not None:
+                self.entries.move_to_end((user_id, etag))
+            return body
 
-            for part in parts:
-                if assignment.class_id not in course_block_list:
-                    course_block_list[assignment.class_id] = []
-                course_block_list[assignment.class_id].append(
-                    {
-                        "block_id": block_id_counter,
-                        "course_id": course.id,
-                        "course_name": course.course_name,
-                        "class_id": assignment.class_id,
-                        "class_name": class_.class_name,
-                        "teacher_name": f"{teacher.name} {teacher.surname}",
-                        "teacher_id": teacher.id,
-                        "weekly_hours": part,
-                        "placed": False,
-                    }
-                )
-                block_id_counter += 1
+    def put(self, user_id, etag, body):
+        with self.lock:
+            self.entries[(user_id, etag)] = body
+            self.entries.move_to_end((user_id, etag))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
 
-    for class_id, courses in course_block_list.items():
-        course_block_list[class_id] = sorted(
-            courses, key=lambda course: course["weekly_hours"], reverse=True
-        )
+    def discard(self, user_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == user_id]:
+                del self.entries[key]
 
-    return course_block_list
 
+schedule_view_cache = ScheduleViewCache(app.config["SCHEDULE_VIEW_CACHE_SIZE"])
 
-def is_valid_placement(
-    schedule,
-    block_id,
-    class_id,
-    teacher_id,
-    block_size,
-    open_hours_by_day,
-    teacher_avail,
-    class_avail,
-    course_block_list,
-    day,
-    hour,
-):
+
+def invalidate_schedule_view(user_id):
     """
-    Belirtilen dersin, öğretmenin ve sınıfın belirli bir zaman dilimine yerleştirilmesinin geçerli olup olmadığını kontrol eder.
+    Ders, öğretmen veya sınıf adları gibi sayfadaki veriler değişti: görünüm
+    sürümü yazma işleminin içinde artırılır; commit çağırana kalır.
     """
+    bump_schedule_version(user_id, "view_version")
+    schedule_view_cache.discard(user_id)
 
-    if any(
-        h not in open_hours_by_day.get(day, [])
-        or schedule[class_id][day].get(h) is not None
-        for h in range(hour, hour + block_size)
-    ):
-        return False
-
-    if any(
-        not class_avail[class_id][day].get(h, False)
-        or not teacher_avail[teacher_id][day].get(h, False)
-        for h in range(hour, hour + block_size)
-    ):
-        return False
-
-    if any(
-        course_info["block_id"] == block_id and course_info["placed"]
-        for course_info in course_block_list[class_id]
-    ):
-        return False
 
-    if any(
-        check_hour in open_hours_by_day.get(day, [])
-        and (schedule.get(class_id, {}).get(day, {}).get(check_hour) or {}).get(
-            "teacher_id"
+def schedule_view_key(user_id):
+    """
+    Programlar sayfasının içeriğini belirleyen anahtar ve son değişiklik
+    zamanı: yayındaki sürüm, okul saatleri sürümü ve ad değişikliklerinin
+    sürümü. Hepsi veritabanından okunduğundan süreçler aynı anahtarı üretir.
+    """
+    active = db.session.get(ActiveSchedule, user_id)
+    grid = db.session.get(ScheduleVersion, user_id)
+    key = (
+        app.config["APP_RELEASE"],
+        user_id,
+        active.snapshot_id if active else None,
+        active.published_at.isoformat() if active else None,
+        grid.version if grid else 0,
+        (grid.view_version or 0) if grid else 0,
+    )
+    times = [
+        moment
+        for moment in (
+            active.published_at if active else None,
+            grid.updated_at if grid else None,
         )
-        == teacher_id
-        for delta in [-1, block_size]
-        for check_hour in [hour + delta]
-    ):
-        return False
+        if moment is not None
+    ]
+    return key, max(times) if times else None
 
-    # Aynı öğretmen, aynı gün, aynı sınıfa aynı dersten bir daha yerleşememeli.
-
-    current_course_id = None
-    for course_info in course_block_list[class_id]:
-        if course_info["block_id"] == block_id:
-            current_course_id = course_info["course_id"]
-            break
-    # Şimdi tüm diğer saatlere bakacağız ve bu course_id yi kontrol edeceğiz.
 
-    for check_hour in range(1, len(open_hours_by_day.get(day, {})) + 1):
-        if (
-            check_hour in schedule[class_id][day]
-            and schedule[class_id][day][check_hour] is not None
-        ):
-            if (
-                schedule[class_id][day][check_hour].get("teacher_id") == teacher_id
-                and schedule[class_id][day][check_hour].get("course_id")
-                == current_course_id
-            ):
-                return False
-    return True
+def build_schedule_view(user_id):
+    """
+    Sınıf ve öğretmen bazlı program görünümlerini iki sorguyla kurar: açık
+    saatler ve ders, öğretmen, sınıf adlarıyla birleştirilmiş program
+    hücreleri. İlişkiler tek tek yüklenmez.
 
+    Returns:
+        (schedule_by_class, schedule_by_teacher, open_hours_by_day)
+    """
+    school_schedule = (
+        db.session.query(Schedule.day, Schedule.hour, Schedule.is_open)
+        .filter_by(user_id=user_id, is_open=True)
+        .all()
+    )
+    open_hours_by_day = create_open_day_hour_set(school_schedule)
 
-def assign_course_block(
-    schedule,
-    block_id,
-    course_id,
-    course_name,
-    class_id,
-    class_name,
-    teacher_name,
-    teacher_id,
-    day,
-    hour,
-    block_size,
-    course_block_list,
-    teacher_avail,
-    class_avail,
-):
+    rows = (
+        db.session.query(
+            CourseSchedule.id,
+            CourseSchedule.day,
+            CourseSchedule.hour,
+            CourseSchedule.course_id,
+            CourseSchedule.teacher_id,
+            CourseSchedule.class_id,
+            Course.course_name,
+            Teacher.name,
+            Teacher.surname,
+            Class.class_name,
+        )
+        .join(Course, Course.id == CourseSchedule.course_id)
+        .join(Teacher, Teacher.id == CourseSchedule.teacher_id)
+        .join(Class, Class.id == CourseSchedule.class_id)
+        .filter(CourseSchedule.user_id == user_id)
+        .order_by(
+            CourseSchedule.class_id,
+            CourseSchedule.teacher_id,
+            CourseSchedule.day,
+            CourseSchedule.hour,
+        )
+        .all()
+    )
 
-    for hour in range(hour, hour + block_size):
-        if schedule[class_id][day][hour] is None:
-            schedule[class_id][day][hour] = {
-                "block_id": block_id,
-                "course_id": course_id,
-                "teacher_id": teacher_id,
-                "ders_adi": course_name,
-                "ogretmen_adi": teacher_name,
+    schedule_by_class = {}
+    schedule_by_teacher = {}
+    for (
+        row_id,
+        day,
+        hour,
+        course_id,
+        teacher_id,
+        class_id,
+        course_name,
+        name,
+        surname,
+        class_name,
+    ) in rows:
+        teacher_name = f"{name} {surname}"
+        lesson_info = {
+            "course_id": course_id,
+            "course_name": course_name,
+            "teacher_name": teacher_name,
+            "teacher_id": teacher_id,
+            "class_name": class_name,
+            "block_id": row_id,
+        }
+        # Sınıf bazlı program
+        if class_id not in schedule_by_class:
+            schedule_by_class[class_id] = {
+                "class_name": class_name,
+                "schedule": {day: {} for day in open_hours_by_day},
             }
-            # Öğretmen ve sınıf müsaitlik durumunu güncelle
-            update_teacher_avail(teacher_avail, teacher_id, day, hour, False)
-            update_class_avail(class_avail, class_id, day, hour, False)
-
-        else:
-            print(f"Uyarı: {class_id} sınıfı için {day} günü {hour}. saat zaten dolu!")
-            # Dolu hücreleri de güncelle
-            # course_block_list içindeki ilgili dersi bul ve 'placed' değerini güncelle
-        for course_info in course_block_list[class_id]:
-            if schedule[class_id][day][hour] is not None:
-                if course_info["block_id"] == block_id:
-                    course_info["placed"] = True
-                    break
-
-    return schedule, course_block_list, True
+        schedule_by_class[class_id]["schedule"][day][hour] = lesson_info
 
+        # Öğretmen bazlı program
+        if teacher_id not in schedule_by_teacher:
+            schedule_by_teacher[teacher_id] = {
+                "teacher_name": teacher_name,
+                "schedule": {day: {} for day in open_hours_by_day},
+            }
+        schedule_by_teacher[teacher_id]["schedule"][day][hour] = lesson_info
 
-def remove_lesson(schedule, class_id, day, hour):
-    if schedule[class_id][day][hour] is not None:
-        schedule[class_id][day][hour] = None
+    return schedule_by_class, schedule_by_teacher, open_hours_by_day
 
 
-def create_unplaced_assignments(course_block_list):
-    unplaced_assignments = []
-    for class_id, courses in course_block_list.items():
-        for course_info in courses:
-            if not course_info["placed"]:
-                unplaced_assignments.append(
-                    {
-                        "block_id": course_info["block_id"],
-                        "course_id": course_info["course_id"],
-                        "teacher_id": course_info["teacher_id"],
-                        "class_id": course_info["class_id"],
-                        "course_name": course_info["course_name"],
-                        "class_name": course_info["class_name"],
-                        "teacher_name": course_info["teacher_name"],
-                        "weekly_hours": course_info["weekly_hours"],
-                        "placed_hours": 0,
-                    }
-                )
-    return unplaced_assignments
+# Program dışa aktarma
+EXPORT_VIEWS = ("classes", "teachers")
 
 
-def initialize_schedule(classes, open_hours_by_day):
-    schedule = {}
+@app.route("/schedule-export/<view>.<fmt>", methods=["GET"])
+@login_required
+def export_schedule(view, fmt):
+    """Tüm sınıf veya öğretmen programlarını CSV ya da XLSX olarak akıtır."""
+    if view not in EXPORT_VIEWS or fmt not in ("csv", "xlsx"):
+        return jsonify({"error": "Geçersiz dışa aktarma türü."}), 404
+    grids = export_grids(session["user_id"], view)
+    filename = f"{'siniflar' if view == 'classes' else 'ogretmenler'}.{fmt}"
+    if fmt == "csv":
+        body, mimetype = stream_csv(grids), "text/csv"
+    else:
+        body = stream_xlsx(grids)
+        mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
-    # Her sınıf için takvim oluşturuluyor
-    for class_ in classes:
-        schedule[class_.id] = {
-            day: {hour: None for hour in open_hours_by_day.get(day, [])}
-            for day in open_hours_by_day
-        }
 
-    return schedule
+@app.route("/schedule-export/school.zip", methods=["GET"])
+@login_required
+def export_school_zip():
+    """Her sınıf ve öğretmen programı ayrı bir CSV olarak tek ZIP içinde."""
+    return Response(
+        stream_with_context(stream_school_zip(session["user_id"])),
+        mimetype="application/zip",
+        headers={"Content-Disposition": "attachment; filename=programlar.zip"},
+    )
 
 
-def calculate_teacher_workload_ratio(teacher_avail, course_block_list):
+def export_grids(user_id, view):
     """
-    Öğretmenlerin doluluk oranlarını hesaplar.
-    Args:
-        teacher_avail (dict): Öğretmenlerin müsaitlik bilgileri.
-        course_list (dict): Ders atama bilgileri (yerleşmemiş dersler dahil).
-    Returns:
-        dict: Öğretmenlerin doluluk oranlarını içeren bir sözlük.
+    Program hücrelerini tek bir sorguyla, sınıf (veya öğretmen) sırasıyla
+    akıtır ve her biri için (başlık, satırlar) üretir. Satırlar günler x
+    saatler tablosudur; bellekte aynı anda yalnızca bir program tutulur.
+    """
+    school_schedule = (
+        db.session.query(Schedule.day, Schedule.hour, Schedule.is_open)
+        .filter_by(user_id=user_id, is_open=True)
+        .all()
+    )
+    open_hours_by_day = create_open_day_hour_set(school_schedule)
+    all_hours = sorted({hour for hours in open_hours_by_day.values() for hour in hours})
+
+    if view == "classes":
+        owner_order = (Class.class_name, Class.id)
+    else:
+        owner_order = (Teacher.name, Teacher.surname, Teacher.id)
+    query = (
+        db.select(
+            Class.id.label("class_id"),
+            Class.class_name,
+            Teacher.id.label("teacher_id"),
+            Teacher.name,
+            Teacher.surname,
+            Course.course_name,
+            CourseSchedule.day,
+            CourseSchedule.hour,
+        )
+        .join(Class, Class.id == CourseSchedule.class_id)
+        .join(Teacher, Teacher.id == CourseSchedule.teacher_id)
+        .join(Course, Course.id == CourseSchedule.course_id)
+        .where(CourseSchedule.user_id == user_id)
+        .order_by(*owner_order)
+        .execution_options(yield_per=500)
+    )
+    rows = db.session.execute(query)
+
+    def owner(row):
+        return row.class_id if view == "classes" else row.teacher_id
+
+    for _, lessons in groupby(rows, key=owner):
+        cells = {}
+        for row in lessons:
+            teacher = f"{row.name} {row.surname}"
+            if view == "classes":
+                title = row.class_name
+                cells[(row.day, row.hour)] = f"{teacher} - {row.course_name}"
+            else:
+                title = teacher
+                cells[(row.day, row.hour)] = f"{row.class_name} - {row.course_name}"
+        table = [["Gün"] + [f"{hour}. Saat" for hour in all_hours]]
+        for day in open_hours_by_day:
+            table.append(
+                [day.title()] + [cells.get((day, hour), "") for hour in all_hours]
+            )
+        yield title, table
+
+
+def stream_csv(grids):
+    # Excel'in Türkçe karakterleri doğru açması için UTF-8 BOM
+    yield "\ufeff".encode()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for title, table in grids:
+        writer.writerow([title])
+        writer.writerows(table)
+        writer.writerow([])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class StreamBuffer:
+    """
+    zipfile için yalnızca yazılabilir akış. Arşiv yazıldıkça biriken parçalar
+    drain ile alınıp yanıta aktarılır; tüm dosya bellekte toplanmaz.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+XLSX_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+XLSX_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+XLSX_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+XLSX_PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+
+def unique_name(name, used, max_length=None):
+    # Aynı adlı programlar (ör. iki "Ali Yılmaz") birbirinin üzerine yazılmasın
+    base, number = name[:max_length], 2
+    name = base
+    while name.lower() in used:
+        suffix = f" ({number})"
+        limit = max_length - len(suffix) if max_length else len(base)
+        name = base[:limit] + suffix
+        number += 1
+    used.add(name.lower())
+    return name
+
+
+def xlsx_sheet_name(title, used):
+    # Sayfa adı en çok 31 karakter olabilir ve bazı karakterleri içeremez
+    name = re.sub(r"[\[\]:*?/\\]", "-", title) or "Program"
+    return unique_name(name, used, max_length=31)
+
+
+def stream_xlsx(grids):
+    """
+    Her programı ayrı bir sayfa olarak yazan en küçük XLSX dosyasını akıtır.
+    Sayfalar hazırlandıkça arşive eklenir; sayfa listesi en sonda yazılır.
+    """
+    buffer = StreamBuffer()
+    sheet_names = []
+    used = set()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for title, table in grids:
+            sheet_names.append(xlsx_sheet_name(title, used))
+            rows = "".join(
+                "<row>"
+                + "".join(
+                    f'<c t="inlineStr"><is><t>{xml_escape(str(value))}</t></is></c>'
+                    for value in row
+                )
+                + "</row>"
+                for row in table
+            )
+            archive.writestr(
+                f"xl/worksheets/sheet{len(sheet_names)}.xml",
+                f'{XLSX_HEADER}<worksheet xmlns="{XLSX_MAIN_NS}">'
+                f"<sheetData>{rows}</sheetData></worksheet>",
+            )
+            yield buffer.drain()
+        if not sheet_names:
+            sheet_names.append("Program")
+            archive.writestr(
+                "xl/worksheets/sheet1.xml",
+                f'{XLSX_HEADER}<worksheet xmlns="{XLSX_MAIN_NS}">'
+                "<sheetData/></worksheet>",
+            )
+
+        numbers = range(1, len(sheet_names) + 1)
+        archive.writestr(
+            "[Content_Types].xml",
+            f"{XLSX_HEADER}<Types xmlns="
+            '"http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType='
+            '"application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+                'ContentType="application/'
+                'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for number in numbers
+            )
+            + "</Types>",
+        )
+        archive.writestr(
+            "_rels/.rels",
+            f'{XLSX_HEADER}<Relationships xmlns="{XLSX_PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{XLSX_REL_NS}/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>',
+        )
+        archive.writestr(
+            "xl/workbook.xml",
+            f'{XLSX_HEADER}<workbook xmlns="{XLSX_MAIN_NS}" xmlns:r="{XLSX_REL_NS}">'
+            "<sheets>"
+            + "".join(
+                f'<sheet name="{xml_escape(name, {chr(34): "&quot;"})}" '
+                f'sheetId="{number}" r:id="rId{number}"/>'
+                for number, name in zip(numbers, sheet_names)
+            )
+            + "</sheets></workbook>",
+        )
+        archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'{XLSX_HEADER}<Relationships xmlns="{XLSX_PACKAGE_REL_NS}">'
+            + "".join(
+                f'<Relationship Id="rId{number}" Type="{XLSX_REL_NS}/worksheet" '
+                f'Target="worksheets/sheet{number}.xml"/>'
+                for number in numbers
+            )
+            + "</Relationships>",
+        )
+    yield buffer.drain()
+
+
+def stream_school_zip(user_id):
+    """Okulun tüm sınıf ve öğretmen programlarını CSV dosyaları olarak zipler."""
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for view, folder in zip(EXPORT_VIEWS, ("siniflar", "ogretmenler")):
+            used = set()
+            for title, table in export_grids(user_id, view):
+                name = re.sub(r'[\\/:*?"<>|]', "-", title) or "program"
+                name = unique_name(name, used)
+                archive.writestr(
+                    f"{folder}/{name}.csv",
+                    b"".join(stream_csv([(title, table)])),
+                )
+                yield buffer.drain()
+    yield buffer.drain()
+
+
+# Sabitler
+HOURS = [i for i in range(1, 11)]
+DAYS = ["pazartesi", "salı", "çarşamba", "perşembe", "cuma", "cumartesi", "pazar"]
+
+
+def create_open_day_hour_set(schedules):
+    open_hours_by_day = {
+        day: sorted(
+            {entry.hour for entry in schedules if entry.day == day and entry.is_open},
+            key=HOURS.index,
+        )
+        for day in sorted(
+            {entry.day for entry in schedules if entry.is_open}, key=DAYS.index
+        )
+    }
+    return open_hours_by_day
+
+
+# Müsaitlik bit maskeleri
+# Her öğretmen/sınıf için her gün tek bir tamsayı tutulur: h. bit, h. saatin
+# boş olduğunu gösterir. Bir bloğun sığıp sığmadığı tek bir AND ile anlaşılır.
+def hours_to_mask(hours):
+    """Saat listesini bit maskesine çevirir."""
+    mask = 0
+    for hour in hours:
+        mask |= 1 << hour
+    return mask
+
+
+def block_mask(hour, block_size):
+    """hour saatinden başlayan block_size uzunluğundaki bloğun maskesi."""
+    return ((1 << block_size) - 1) << hour
+
+
+def mask_fits(mask, block):
+    """Bloğun tüm saatleri maskede boş mu?"""
+    return mask & block == block
+
+
+def avail_mask(avail, owner_id, day):
+    """Öğretmen/sınıf için ilgili günün boş saat maskesi (kayıt yoksa 0)."""
+    return avail.get(owner_id, {}).get(day, 0)
+
+
+def create_teacher_avail(teacher_schedules, open_hours_by_day):
+    # Satırlar tek geçişte işlenir; okulun kapalı olduğu saatler maskelenir
+    open_masks = {day: hours_to_mask(hours) for day, hours in open_hours_by_day.items()}
+    teacher_avail = {}
+    for entry in teacher_schedules:
+        days = teacher_avail.get(entry.teacher_id)
+        if days is None:
+            days = teacher_avail[entry.teacher_id] = dict.fromkeys(open_masks, 0)
+        if entry.is_open and entry.day in open_masks:
+            days[entry.day] |= (1 << entry.hour) & open_masks[entry.day]
+
+    return teacher_avail
+
+
+def create_class_avail(classes, school_schedules, open_hours_by_day):
+    # Sınıflar okulun açık saatlerini paylaşır; maskeler bir kez hesaplanır
+    open_masks = {day: hours_to_mask(hours) for day, hours in open_hours_by_day.items()}
+    return {class_.id: dict(open_masks) for class_ in classes}
+
+
+# Kullanıcı bazlı müsaitlik önbelleği:
+# user_id -> (sürümler, (öğretmen, sınıf, açık saatler))
+# Müsaitliği değiştiren her yazma, commit etmeden önce invalidate_availability
+# çağırır. Girdiler veritabanındaki sürümlerle doğrulandığından başka bir
+# süreçteki yazmalar da görülür.
+availability_cache = {}
+availability_cache_lock = threading.Lock()
+
+
+def invalidate_availability(user_id):
+    """Müsaitlik sürümünü yazma işleminin içinde artırır; commit çağırana kalır."""
+    bump_schedule_version(user_id, "availability_version")
+    with availability_cache_lock:
+        availability_cache.pop(user_id, None)
+
+
+def availability_versions(user_id):
+    """Müsaitliği belirleyen (okul saatleri, öğretmen müsaitliği) sürümleri."""
+    row = db.session.execute(
+        db.select(ScheduleVersion.version, ScheduleVersion.availability_version).where(
+            ScheduleVersion.user_id == user_id
+        )
+    ).first()
+    return (row.version, row.availability_version or 0) if row else (0, 0)
+
+
+def cached_availability(user_id):
+    """Önbellekteki müsaitlik; yalnızca okunmalı, değiştirilmemelidir."""
+    versions = availability_versions(user_id)
+    with availability_cache_lock:
+        cached = availability_cache.get(user_id)
+    if cached is None or cached[0] != versions:
+        # Sürümler kurulumdan önce okunur; arada gelen bir yazma sonraki
+        # çağrıda yeniden kurulumu tetikler
+        cached = (versions, build_availability(user_id))
+        with availability_cache_lock:
+            availability_cache[user_id] = cached
+    return cached[1]
+
+
+def load_availability(user_id):
+    """
+    Öğretmen ve sınıf müsaitlik maskelerini ve açık saatleri döndürür.
+    Sonuç önbellekten gelir; çözücüler maskeleri değiştirdiği için her çağrıda
+    kopyası verilir (maskeler tamsayı olduğundan sözlük kopyası yeterlidir).
+    """
+    teacher_avail, class_avail, open_hours_by_day = cached_availability(user_id)
+    return (
+        {teacher_id: dict(days) for teacher_id, days in teacher_avail.items()},
+        {class_id: dict(days) for class_id, days in class_avail.items()},
+        {day: list(hours) for day, hours in open_hours_by_day.items()},
+    )
+
+
+def build_availability(user_id):
+    school_schedules = (
+        db.session.query(Schedule.day, Schedule.hour, Schedule.is_open)
+        .filter_by(user_id=user_id, is_open=True)
+        .all()
+    )
+    open_hours_by_day = create_open_day_hour_set(school_schedules)
+    teacher_schedules = (
+        db.session.query(
+            TeacherSchedule.teacher_id,
+            TeacherSchedule.day,
+            TeacherSchedule.hour,
+            TeacherSchedule.is_open,
+        )
+        .filter(
+            TeacherSchedule.user_id == user_id,
+        )
+        .all()
+    )
+    teacher_avail = create_teacher_avail(teacher_schedules, open_hours_by_day)
+    classes = Class.query.filter_by(user_id=user_id).all()
+    class_avail = create_class_avail(classes, school_schedules, open_hours_by_day)
+    return teacher_avail, class_avail, open_hours_by_day
+
+
+def update_teacher_avail(teacher_avail, teacher_id, day, hour, is_open, block_size=1):
+    """
+    Öğretmen sözlüğünü güncellemek için fonksiyon.
+    """
+    # Öğretmenin sözlükte olup olmadığını kontrol et
+    days = teacher_avail.setdefault(teacher_id, {})
+    # Belirtilen saatleri açık/kapalı duruma getir
+    block = block_mask(hour, block_size)
+    if is_open:
+        days[day] = days.get(day, 0) | block
+    else:
+        days[day] = days.get(day, 0) & ~block
+
+    return teacher_avail
+
+
+def update_class_avail(class_avail, class_id, day, hour, is_open, block_size=1):
+    """
+    Sınıf sözlüğünü güncellemek için fonksiyon.
+    """
+    # Sınıfın sözlükte olup olmadığını kontrol et
+    days = class_avail.setdefault(class_id, {})
+
+    # Belirtilen saatleri açık/kapalı duruma getir
+    block = block_mask(hour, block_size)
+    if is_open:
+        days[day] = days.get(day, 0) | block
+    else:
+        days[day] = days.get(day, 0) & ~block
+
+    return class_avail
+
+
+def course_block_list_get(user_id):
+    assignments = TeacherCourseAssignment.query.filter_by(user_id=user_id).all()
+
+    course_ids = [assignment.course_id for assignment in assignments]
+    courses = Course.query.filter(Course.id.in_(course_ids)).all()
+    course_dict = {course.id: course for course in courses}
+
+    teacher_dict = {}
+    teacher_ids = [assignment.teacher_id for assignment in assignments]
+    teachers = Teacher.query.filter(Teacher.id.in_(teacher_ids)).all()
+    for teacher in teachers:
+        teacher_dict[teacher.id] = teacher
+
+    class_dict = {}
+    class_ids = [
+        assignment.class_id
+        for assignment in assignments
+        if assignment.class_id is not None
+    ]  # if condition ekle
+    classes = Class.query.filter(Class.id.in_(class_ids)).all()
+    for class_ in classes:
+        class_dict[class_.id] = class_
+
+    course_block_list = {}
+
+    block_id_counter = 1  # Ders blokları için sayaç
+
+    for assignment in assignments:
+        # Sadece class_id değeri None olmayan kayıtları dikkate al
+        if assignment.class_id is not None:
+            course = course_dict.get(assignment.course_id)
+            teacher = teacher_dict.get(assignment.teacher_id)
+            class_ = class_dict.get(assignment.class_id)
+
+            if not course or not teacher or not class_:
+                continue
+
+            parts = [int(p) for p in course.distribution_format.split("+") if p]
+
+            for part in parts:
+                if assignment.class_id not in course_block_list:
+                    course_block_list[assignment.class_id] = []
+                course_block_list[assignment.class_id].append(
+                    {
+                        "block_id": block_id_counter,
+                        "course_id": course.id,
+                        "course_name": course.course_name,
+                        "class_id": assignment.class_id,
+                        "class_name": class_.class_name,
+                        "teacher_name": f"{teacher.name} {teacher.surname}",
+                        "teacher_id": teacher.id,
+                        "weekly_hours": part,
+                        "placed": False,
+                    }
+                )
+                block_id_counter += 1
+
+    for class_id, courses in course_block_list.items():
+        course_block_list[class_id] = sorted(
+            courses, key=lambda course: course["weekly_hours"], reverse=True
+        )
+
+    return course_block_list
+
+
+class BlockIndex:
+    """
+    Ders bloklarını block_id ile indeksler.
+
+    blocks: block_id -> course_block_list içindeki blok kaydının kendisi
+    cells: block_id -> bloğun programda kapladığı (sınıf, gün, saat) hücreleri
+    daily_courses: (sınıf, gün) -> {(öğretmen, ders): hücre sayısı}
+    teacher_cells: (öğretmen, gün, saat) -> öğretmenin o saatteki bloğu
+    """
+
+    def __init__(self, course_block_list):
+        self.blocks = {}
+        self.cells = {}
+        self.daily_courses = defaultdict(Counter)
+        self.teacher_cells = {}
+        for courses in course_block_list.values():
+            for course_info in courses:
+                self.blocks[course_info["block_id"]] = course_info
+
+    def get(self, block_id):
+        return self.blocks.get(block_id)
+
+    def is_placed(self, block_id):
+        course_info = self.blocks.get(block_id)
+        return course_info is not None and course_info["placed"]
+
+    def add_cell(self, block_id, class_id, day, hour):
+        self.cells.setdefault(block_id, []).append((class_id, day, hour))
+        course_info = self.blocks.get(block_id)
+        if course_info is not None:
+            key = (course_info["teacher_id"], course_info["course_id"])
+            self.daily_courses[(class_id, day)][key] += 1
+            self.teacher_cells[(course_info["teacher_id"], day, hour)] = block_id
+
+    def placements(self):
+        """Yerleşmiş blokların başlangıç zamanları: block_id -> (gün, saat)."""
+        return {
+            block_id: (cells[0][1], min(hour for _, _, hour in cells))
+            for block_id, cells in self.cells.items()
+            if cells
+        }
+
+    def pop_cells(self, block_id):
+        """Bloğun hücrelerini indeksten çıkarır ve döndürür."""
+        cells = self.cells.pop(block_id, [])
+        course_info = self.blocks.get(block_id)
+        if course_info is not None:
+            key = (course_info["teacher_id"], course_info["course_id"])
+            for class_id, day, hour in cells:
+                courses = self.daily_courses[(class_id, day)]
+                courses[key] -= 1
+                if courses[key] <= 0:
+                    del courses[key]
+                teacher_key = (course_info["teacher_id"], day, hour)
+                if self.teacher_cells.get(teacher_key) == block_id:
+                    del self.teacher_cells[teacher_key]
+        return cells
+
+    def has_daily_course(self, class_id, day, teacher_id, course_id, block_id=None):
+        """
+        Öğretmen o gün bu sınıfa bu dersi veriyor mu?
+        block_id verilirse bloğun kendi hücreleri sayılmaz.
+        """
+        count = self.daily_courses.get((class_id, day), {}).get(
+            (teacher_id, course_id), 0
+        )
+        if count and block_id is not None:
+            count -= sum(
+                1
+                for cell_class_id, cell_day, _ in self.cells.get(block_id, [])
+                if cell_class_id == class_id and cell_day == day
+            )
+        return count > 0
+
+
+def adjacent_teacher_lessons(
+    schedule,
+    class_id,
+    teacher_id,
+    block_size,
+    open_hours_by_day,
+    day,
+    hour,
+    block_id=None,
+):
+    """
+    Bloğun hemen öncesinde ve sonrasında aynı öğretmenin bu sınıftaki
+    dersleri. Bitişik yerleşen bloklar tek blok gibi görüneceğinden yasaktır.
+    """
+    lessons = []
+    for check_hour in (hour - 1, hour + block_size):
+        if check_hour not in open_hours_by_day.get(day, []):
+            continue
+        lesson_info = schedule.get(class_id, {}).get(day, {}).get(check_hour)
+        if (
+            lesson_info
+            and lesson_info.get("teacher_id") == teacher_id
+            and lesson_info.get("block_id") != block_id
+        ):
+            lessons.append(lesson_info)
+    return lessons
+
+
+def is_valid_placement(
+    schedule,
+    block_id,
+    class_id,
+    teacher_id,
+    block_size,
+    open_hours_by_day,
+    teacher_avail,
+    class_avail,
+    course_block_list,
+    day,
+    hour,
+    block_index,
+):
+    """
+    Belirtilen dersin, öğretmenin ve sınıfın belirli bir zaman dilimine yerleştirilmesinin geçerli olup olmadığını kontrol eder.
+    """
+
+    # Sınıf maskesi yalnızca açık ve boş saatleri içerir; tek AND yeterli.
+    block = block_mask(hour, block_size)
+    if not mask_fits(
+        avail_mask(class_avail, class_id, day)
+        & avail_mask(teacher_avail, teacher_id, day),
+        block,
+    ):
+        return False
+
+    course_info = block_index.get(block_id)
+    if course_info is None or course_info["placed"]:
+        return False
+
+    if adjacent_teacher_lessons(
+        schedule, class_id, teacher_id, block_size, open_hours_by_day, day, hour
+    ):
+        return False
+
+    # Aynı öğretmen, aynı gün, aynı sınıfa aynı dersten bir daha yerleşememeli.
+    if block_index.has_daily_course(
+        class_id, day, teacher_id, course_info["course_id"]
+    ):
+        return False
+    return True
+
+
+def assign_course_block(
+    schedule,
+    block_id,
+    course_id,
+    course_name,
+    class_id,
+    class_name,
+    teacher_name,
+    teacher_id,
+    day,
+    hour,
+    block_size,
+    course_block_list,
+    teacher_avail,
+    class_avail,
+    block_index,
+    teacher_queue=None,
+):
+    course_info = block_index.get(block_id)
+    newly_placed = False
+    for hour in range(hour, hour + block_size):
+        if schedule[class_id][day][hour] is None:
+            schedule[class_id][day][hour] = {
+                "block_id": block_id,
+                "course_id": course_id,
+                "teacher_id": teacher_id,
+                "ders_adi": course_name,
+                "ogretmen_adi": teacher_name,
+            }
+            # Öğretmen ve sınıf müsaitlik durumunu güncelle
+            update_teacher_avail(teacher_avail, teacher_id, day, hour, False)
+            update_class_avail(class_avail, class_id, day, hour, False)
+            block_index.add_cell(block_id, class_id, day, hour)
+
+        else:
+            print(f"Uyarı: {class_id} sınıfı için {day} günü {hour}. saat zaten dolu!")
+            # Dolu hücreleri de güncelle
+        # course_block_list içindeki dersin 'placed' değerini güncelle
+        if course_info is not None and schedule[class_id][day][hour] is not None:
+            newly_placed = newly_placed or not course_info["placed"]
+            course_info["placed"] = True
+
+    # Öğretmenin öncelik kaydını güncelle
+    if teacher_queue is not None and newly_placed:
+        teacher_queue.update(teacher_id, teacher_avail, -block_size)
+
+    return schedule, course_block_list, True
+
+
+def remove_lesson(schedule, class_id, day, hour, teacher_avail, class_avail):
+    lesson_info = schedule[class_id][day][hour]
+    if lesson_info is not None:
+        schedule[class_id][day][hour] = None
+        # Boşalan saati öğretmen ve sınıf için tekrar müsait yap
+        update_teacher_avail(teacher_avail, lesson_info["teacher_id"], day, hour, True)
+        update_class_avail(class_avail, class_id, day, hour, True)
+
+
+def place_course_block(
+    schedule,
+    course_info,
+    day,
+    hour,
+    course_block_list,
+    teacher_avail,
+    class_avail,
+    block_index,
+    teacher_queue=None,
+):
+    """Blok kaydındaki bilgilerle dersi verilen gün ve saate yerleştirir."""
+    return assign_course_block(
+        schedule,
+        course_info["block_id"],
+        course_info["course_id"],
+        course_info["course_name"],
+        course_info["class_id"],
+        course_info["class_name"],
+        course_info["teacher_name"],
+        course_info["teacher_id"],
+        day,
+        hour,
+        course_info["weekly_hours"],
+        course_block_list,
+        teacher_avail,
+        class_avail,
+        block_index,
+        teacher_queue,
+    )
+
+
+def unplace_course_block(
+    schedule, block_id, teacher_avail, class_avail, block_index, teacher_queue=None
+):
+    """
+    Bloğu programdan kaldırır, saatleri serbest bırakır ve 'placed' değerini sıfırlar.
+    Blok programda değilse None, aksi halde blok kaydını döndürür.
+    """
+    cells = block_index.pop_cells(block_id)
+    for class_id, day, hour in cells:
+        remove_lesson(schedule, class_id, day, hour, teacher_avail, class_avail)
+    course_info = block_index.get(block_id)
+    if not cells or course_info is None:
+        return None
+    course_info["placed"] = False
+    if teacher_queue is not None:
+        teacher_queue.update(
+            course_info["teacher_id"], teacher_avail, course_info["weekly_hours"]
+        )
+    return course_info
+
+
+def unplaced_assignment_entry(course_info):
+    return {
+        "block_id": course_info["block_id"],
+        "course_id": course_info["course_id"],
+        "teacher_id": course_info["teacher_id"],
+        "class_id": course_info["class_id"],
+        "course_name": course_info["course_name"],
+        "class_name": course_info["class_name"],
+        "teacher_name": course_info["teacher_name"],
+        "weekly_hours": course_info["weekly_hours"],
+        "placed_hours": 0,
+    }
+
+
+def create_unplaced_assignments(course_block_list):
+    unplaced_assignments = []
+    for class_id, courses in course_block_list.items():
+        for course_info in courses:
+            if not course_info["placed"]:
+                unplaced_assignments.append(unplaced_assignment_entry(course_info))
+    return unplaced_assignments
+
+
+def initialize_schedule(classes, open_hours_by_day):
+    schedule = {}
+
+    # Her sınıf için takvim oluşturuluyor
+    for class_ in classes:
+        schedule[class_.id] = {
+            day: {hour: None for hour in open_hours_by_day.get(day, [])}
+            for day in open_hours_by_day
+        }
+
+    return schedule
+
+
+def count_available_hours(availability):
+    """Öğretmenin toplam müsait saatini ve müsait gün sayısını döndürür."""
+    total_available_hours = 0
+    available_days = 0
+    for day, mask in availability.items():
+        if mask:
+            total_available_hours += mask.bit_count()
+            available_days += 1
+    return total_available_hours, available_days
+
+
+class TeacherWorkloadQueue:
+    """
+    Öğretmenlerin doluluk oranları (müsait saat / yerleşmemiş ders saati *
+    müsait gün²) ve her sınıfın yerleşmemiş bloklarının bu oranlara göre
+    sıralı listesi. Ders yerleştirildiğinde veya programdan çıkarıldığında
+    yalnızca ilgili öğretmenin oranı yeniden hesaplanır ve o öğretmenin
+    blokları sınıf listelerinde ikili aramayla yerinden oynatılır; açgözlü
+    yerleştirme sırayı her zaman diliminde yeniden kurmadan okur. Taşıma
+    sıra okunurken yapılır; sırayı okumayan iyileştirme aşaması bedel ödemez.
+
+    Sıra, seçimin yapıldığı sınıf bazında tutulur. Eşit oranlarda blokların
+    course_block_list içindeki sırası korunur. noise: öğretmen -> oran
+    çarpanı (çoklu başlangıçtaki küçük sapmalar).
+    """
+
+    def __init__(self, teacher_avail, course_block_list, noise=None):
+        self._ratios = {}
+        self._available = {}
+        self._unplaced = defaultdict(int)
+        self._noise = noise or {}
+        # sınıf -> [(oran, sıra, blok)]; blok id -> listedeki oranı
+        self._order = defaultdict(list)
+        self._keys = {}
+        self._teacher_blocks = defaultdict(list)
+        # Oranı değişip blokları henüz taşınmamış öğretmenler
+        self._dirty = set()
+
+        # Her öğretmenin bloklarını ve yerleşmemiş derslerini sayalım
+        for class_id, courses in course_block_list.items():
+            for position, course_info in enumerate(courses):
+                teacher_id = course_info["teacher_id"]
+                self._teacher_blocks[teacher_id].append(
+                    (class_id, position, course_info)
+                )
+                if not course_info.get("placed", False):
+                    self._unplaced[teacher_id] += course_info["weekly_hours"]
+
+        for teacher_id, availability in teacher_avail.items():
+            total_available_hours, available_days = count_available_hours(availability)
+            # Hata kontrolü: Yerleşmemiş ders sayısı müsait saatten büyükse
+            if self._unplaced[teacher_id] > total_available_hours:
+                raise ValueError(
+                    f"Öğretmen ID {teacher_id}: Yerleşmemiş ders sayısı ({self._unplaced[teacher_id]}) müsait zamanından ({total_available_hours}) büyük!"
+                )
+            self._available[teacher_id] = (total_available_hours, available_days)
+            self._refresh(teacher_id)
+
+    def __contains__(self, teacher_id):
+        return teacher_id in self._ratios
+
+    def __len__(self):
+        return len(self._ratios)
+
+    def ratio(self, teacher_id):
+        """Öğretmenin güncel doluluk oranı (kuyrukta değilse None)."""
+        return self._ratios.get(teacher_id)
+
+    def blocks(self, class_id):
+        """Sınıfın yerleşmemiş blokları, öğretmeni en zor durumda olandan başlayarak."""
+        for teacher_id in self._dirty:
+            self._reorder(teacher_id)
+        self._dirty.clear()
+        return [course_info for _, _, course_info in self._order.get(class_id, ())]
+
+    def update(self, teacher_id, teacher_avail, unplaced_delta):
+        """
+        Öğretmenin müsaitliği değiştiğinde kaydını yeniler.
+        unplaced_delta: yerleşmemiş ders saatindeki değişim (yerleştirmede eksi).
+        """
+        if teacher_id not in self._available:
+            return
+        self._available[teacher_id] = count_available_hours(
+            teacher_avail.get(teacher_id, {})
+        )
+        self._unplaced[teacher_id] += unplaced_delta
+        self._refresh(teacher_id)
+
+    def _refresh(self, teacher_id):
+        total_available_hours, available_days = self._available[teacher_id]
+        total_unplaced_courses = self._unplaced[teacher_id]
+
+        # Yerleşmemiş ders sayısı ve müsait saat sıfırsa listeye ekleme
+        if total_unplaced_courses <= 0 and total_available_hours <= 0:
+            self._ratios.pop(teacher_id, None)
+            self._dirty.add(teacher_id)
+            return
+
+        # Doluluk oranını hesapla: müsait saat / yerleşmemiş ders sayısı
+        if total_unplaced_courses > 0:
+            ratio = (
+                total_available_hours
+                / total_unplaced_courses
+                * available_days
+                * available_days
+            )
+        else:
+            ratio = 0  # Eğer yerleşmemiş ders yoksa oran sıfır
+
+        self._ratios[teacher_id] = ratio
+        self._dirty.add(teacher_id)
+
+    def _reorder(self, teacher_id):
+        """Öğretmenin bloklarını sınıf listelerinde yeni oranına taşır."""
+        ratio = self._ratios.get(teacher_id)
+        for class_id, position, course_info in self._teacher_blocks[teacher_id]:
+            order = self._order[class_id]
+            old_key = self._keys.pop(course_info["block_id"], None)
+            if old_key is not None:
+                del order[bisect_left(order, (old_key, position))]
+            if ratio is not None and not course_info["placed"]:
+                key = ratio * self._noise.get(teacher_id, 1)
+                insort(order, (key, position, course_info))
+                self._keys[course_info["block_id"]] = key
+
+
+def find_difficult_times(teacher_avail, open_hours_by_day):
+    """
+    Öğretmenlerin müsaitlik bilgilerine göre, en zor zaman dilimlerini belirler.
+    En zor zaman dilimleri, en az öğretmenin müsait olduğu saatlerdir.
+
+    Args:
+        teacher_avail (dict): Öğretmenlerin müsaitlik bilgisi.
+        open_hours_by_day (dict): Günlere göre açık saatler.
+
+    Returns:
+        list: En zor zaman dilimlerinin listesi.
+    """
+    time_load = {}
+
+    # Zor zaman dilimlerini belirlemek için her gün ve saat üzerinde döngü kuruyoruz
+    for day, hours in open_hours_by_day.items():
+        for hour in hours:
+            time_load[(day, hour)] = 0
+            # Öğretmenlerin müsaitlik bilgisi üzerinden her saat için yük hesaplama
+            bit = 1 << hour
+            for teacher_id in teacher_avail:
+                if avail_mask(teacher_avail, teacher_id, day) & bit:
+                    time_load[(day, hour)] += 1
+
+    sorted_time_load = sorted(time_load.items(), key=lambda item: item[1])
+    difficult_times = [(day, hour) for (day, hour), load in sorted_time_load]
+
+    return difficult_times
+
+
+solver_executor = ThreadPoolExecutor(max_workers=app.config["SOLVER_JOB_WORKERS"])
+
+
+def wants_json():
+    accept = request.accept_mimetypes
+    return accept.best == "application/json"
+
+
+@app.route("/create_schedule_genetic", methods=["POST"])
+@login_required
+def create_genetic():
+    """
+    Program oluşturma işini arka plana verir ve hemen iş numarasını döndürür.
+    Kullanıcının süren bir işi varsa yenisi açılmaz, o iş döndürülür.
+    """
+    user_id = session["user_id"]
+    if not TeacherCourseAssignment.query.filter_by(user_id=user_id).first():
+        message = "Ders ataması bulunamadı. Lütfen önce ders ataması yapın."
+        if wants_json():
+            return jsonify({"error": message}), 400
+        flash(message, "warning")
+        return redirect(url_for("assign_course"))
+    try:
+        time_limit = read_time_limit(request.form.get("time_limit"))
+    except ValueError:
+        message = "Süre sınırı pozitif bir sayı olmalıdır."
+        if wants_json():
+            return jsonify({"error": message}), 400
+        flash(message, "danger")
+        return redirect(url_for("schedules"))
+
+    job = SolverJob.query.filter(
+        SolverJob.user_id == user_id,
+        SolverJob.status.in_(("queued", "running")),
+    ).first()
+    if job is None:
+        job = SolverJob(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            engine=request.form.get("engine", "heuristic"),
+            time_limit=time_limit,
+            phase="sırada",
+        )
+        db.session.add(job)
+        db.session.commit()
+        solver_executor.submit(run_solver_job, job.id)
+
+    if wants_json():
+        return (
+            jsonify(
+                {
+                    "job_id": job.id,
+                    "status_url": url_for("schedule_job_status", job_id=job.id),
+                    "events_url": url_for("schedule_job_events", job_id=job.id),
+                }
+            ),
+            202,
+        )
+    return redirect(url_for("schedules", job=job.id))
+
+
+def read_time_limit(value):
+    """
+    İstemcinin verdiği süre sınırı. Boşsa None (motorun varsayılanı); sonlu ve
+    pozitif bir sayı değilse ValueError. SOLVER_TIME_LIMIT'i aşamaz.
+    """
+    if value is None or not value.strip():
+        return None
+    time_limit = float(value)
+    if not math.isfinite(time_limit) or time_limit <= 0:
+        raise ValueError(value)
+    return min(time_limit, app.config["SOLVER_TIME_LIMIT"])
+
+
+@app.route("/schedule-jobs/<job_id>", methods=["GET"])
+@login_required
+def schedule_job_status(job_id):
+    job = SolverJob.query.filter_by(id=job_id, user_id=session["user_id"]).first()
+    if job is None:
+        return jsonify({"error": "İş bulunamadı."}), 404
+    data = job.to_dict()
+    if job.status == "done":
+        data["result_url"] = url_for("schedules")
+    return jsonify(data)
+
+
+@app.route("/schedule-jobs/<job_id>/events", methods=["GET"])
+@login_required
+def schedule_job_events(job_id):
+    """
+    İşin ilerlemesini server-sent events olarak akıtır: aşama, yerleşmemiş
+    saat ve geçen süre en fazla SOLVER_EVENT_INTERVAL saniyede bir gönderilir.
+    İş bitince "done" veya "failed" olayıyla akış kapanır.
+    """
+    job = SolverJob.query.filter_by(id=job_id, user_id=session["user_id"]).first()
+    if job is None:
+        return jsonify({"error": "İş bulunamadı."}), 404
+    result_url = url_for("schedules")
+    interval = app.config["SOLVER_EVENT_INTERVAL"]
+
+    def events():
+        last, last_sent, revision = None, 0, -1
+        while True:
+            state, revision = solver_job_events.wait(job_id, revision, interval)
+            if state is None:
+                # İş başka bir süreçte çalışıyor olabilir; kayıttan oku
+                job = db.session.get(SolverJob, job_id, populate_existing=True)
+                state = job.to_dict()
+                db.session.commit()
+            if state["status"] in ("done", "failed"):
+                if state["status"] == "done":
+                    state["result_url"] = result_url
+                yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+                return
+            now = time.monotonic()
+            if state != last:
+                last, last_sent = state, now
+                yield f"event: progress\ndata: {json.dumps(state)}\n\n"
+            elif now - last_sent > 15:
+                # Vekil sunucular boşta kalan bağlantıyı kapatmasın
+                last_sent = now
+                yield ": keepalive\n\n"
+            time.sleep(interval)
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/schedule-versions", methods=["GET"])
+@login_required
+def schedule_versions():
+    active = get_snapshot(session["user_id"])
+    snapshots = (
+        db.session.query(
+            ScheduleSnapshot.version,
+            ScheduleSnapshot.created_at,
+            ScheduleSnapshot.engine,
+            ScheduleSnapshot.seed,
+            ScheduleSnapshot.cell_count,
+            ScheduleSnapshot.unplaced_hours,
+        )
+        .filter_by(user_id=session["user_id"])
+        .order_by(ScheduleSnapshot.version.desc())
+        .all()
+    )
+    return jsonify(
+        [
+            {
+                "version": snapshot.version,
+                "created_at": snapshot.created_at.isoformat(),
+                "engine": snapshot.engine,
+                "seed": snapshot.seed,
+                "cell_count": snapshot.cell_count,
+                "unplaced_hours": snapshot.unplaced_hours,
+                "active": active is not None and active.version == snapshot.version,
+            }
+            for snapshot in snapshots
+        ]
+    )
+
+
+@app.route("/schedule-versions/<int:version>/restore", methods=["POST"])
+@login_required
+def restore_schedule_version(version):
+    snapshot = restore_snapshot(session["user_id"], version)
+    if snapshot is None:
+        flash("Program sürümü bulunamadı.", "danger")
+    else:
+        flash(f"{version}. sürüm yayına alındı.", "success")
+    return redirect(url_for("schedules"))
+
+
+@app.route("/schedule-versions/compare", methods=["GET"])
+@login_required
+def compare_schedule_versions():
+    old = get_snapshot(session["user_id"], request.args.get("from", type=int))
+    new = get_snapshot(session["user_id"], request.args.get("to", type=int))
+    if old is None or new is None:
+        return jsonify({"error": "Program sürümü bulunamadı."}), 404
+
+    def lesson(value):
+        return {"course_id": value[0], "teacher_id": value[1]} if value else None
+
+    changes = compare_snapshots(unpack_cells(old.cells), unpack_cells(new.cells))
+    return jsonify(
+        {
+            "from": old.version,
+            "to": new.version,
+            "changed": len(changes),
+            "changes": [
+                {
+                    "class_id": class_id,
+                    "day": day,
+                    "hour": hour,
+                    "from": lesson(old_value),
+                    "to": lesson(new_value),
+                }
+                for class_id, day, hour, old_value, new_value in changes
+            ],
+        }
+    )
+
+
+@app.route("/schedule-moves", methods=["POST"])
+@login_required
+def move_lesson():
+    """
+    Yayındaki programda bir ders bloğunu elle taşır veya başka bir blokla
+    yer değiştirir. Gövde {"block_id", "day", "hour"} ya da
+    {"block_id", "swap_with"} olmalıdır. Çözücünün sert kuralları yalnızca
+    taşınan blokların saatleri için indeksli sorgularla denetlenir; geçerli
+    değişiklik yeni bir sürüm olarak yayına alınır. Denetim ve yazma aynı
+    işlemde, yazma kilidi alınarak yapılır; araya başka bir taşıma giremez.
+    """
+    user_id = session["user_id"]
+    data = request.get_json(silent=True)
+    error = lesson_move_input_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Kilit commit'e (veya istek sonundaki rollback'e) kadar tutulur
+    lock_schedule_writes(user_id)
+    block = lesson_block(user_id, data.get("block_id"))
+    if block is None:
+        return jsonify({"error": "Ders bloğu bulunamadı."}), 404
+    if data.get("swap_with") is not None:
+        other = lesson_block(user_id, data["swap_with"])
+        if other is None:
+            return jsonify({"error": "Ders bloğu bulunamadı."}), 404
+        if other["row_ids"] == block["row_ids"]:
+            return jsonify({"error": "Blok kendisiyle yer değiştiremez."}), 400
+        if other["class_id"] != block["class_id"]:
+            return (
+                jsonify(
+                    {"error": "Yalnızca aynı sınıfın dersleri yer değiştirebilir."}
+                ),
+                400,
+            )
+        moves = [
+            (block, other["day"], other["hour"]),
+            (other, block["day"], block["hour"]),
+        ]
+    else:
+        moves = [(block, data.get("day"), data.get("hour"))]
+
+    if all(day == block["day"] and hour == block["hour"] for block, day, hour in moves):
+        return jsonify({"error": "Blok zaten bu saatte."}), 400
+    error = check_lesson_moves(user_id, moves)
+    if error:
+        return jsonify({"error": error}), 409
+    snapshot = apply_lesson_moves(user_id, moves)
+    return jsonify(
+        {
+            "version": snapshot.version,
+            "moved": [
+                {
+                    "block_id": block["row_ids"][0],
+                    "class_id": block["class_id"],
+                    "day": day,
+                    "hour": hour,
+                    "size": len(block["row_ids"]),
+                }
+                for block, day, hour in moves
+            ],
+        }
+    )
+
+
+def lesson_move_input_error(data):
+    """Taşıma isteğinin alan türlerini denetler; hata mesajı veya None."""
+    if not isinstance(data, dict):
+        return "Geçersiz JSON gövdesi."
+    if not is_record_id(data.get("block_id")):
+        return "block_id bir kayıt kimliği olmalıdır."
+    if data.get("swap_with") is not None:
+        if not is_record_id(data["swap_with"]):
+            return "swap_with bir kayıt kimliği olmalıdır."
+    else:
+        hour = data.get("hour")
+        if (
+            not isinstance(data.get("day"), str)
+            or not isinstance(hour, int)
+            or isinstance(hour, bool)
+        ):
+            return "day metin, hour tam sayı olmalıdır."
+    return None
+
+
+def lesson_block(user_id, row_id):
+    """
+    row_id hücresini içeren bloğu döndürür: aynı gün, aynı sınıfta aynı
+    öğretmenin aynı dersinin kesintisiz saatleri. Çözücü aynı öğretmenin
+    bloklarını bitişik yerleştirmediği için blok sınırları belirsiz değildir.
+    """
+    if not is_record_id(row_id):
+        return None
+    cell = (
+        db.session.query(
+            CourseSchedule.class_id,
+            CourseSchedule.teacher_id,
+            CourseSchedule.course_id,
+            CourseSchedule.day,
+            CourseSchedule.hour,
+        )
+        .filter_by(id=row_id, user_id=user_id)
+        .first()
+    )
+    if cell is None:
+        return None
+    class_id, teacher_id, course_id, day, hour = cell
+    same_lesson = dict(
+        db.session.query(CourseSchedule.hour, CourseSchedule.id)
+        .filter_by(
+            class_id=class_id, day=day, teacher_id=teacher_id, course_id=course_id
+        )
+        .all()
+    )
+    start = hour
+    while start - 1 in same_lesson:
+        start -= 1
+    end = hour
+    while end + 1 in same_lesson:
+        end += 1
+    return {
+        "class_id": class_id,
+        "teacher_id": teacher_id,
+        "course_id": course_id,
+        "day": day,
+        "hour": start,
+        "row_ids": [same_lesson[h] for h in range(start, end + 1)],
+    }
+
+
+def check_lesson_moves(user_id, moves):
+    """
+    Taşımaları çözücünün sert kurallarıyla denetler; hata mesajı veya None.
+    Her taşıma için yalnızca hedef günün sınıf satırları ve hedef saatlerin
+    öğretmen satırları okunur (sınıf/öğretmen-gün-saat indeksleri).
+    """
+    teacher_avail, class_avail, open_hours_by_day = cached_availability(user_id)
+    moving_ids = {row_id for block, _, _ in moves for row_id in block["row_ids"]}
+    # Aynı istekteki taşımaların yeni hücreleri birbirine de çarpmamalı
+    placed = []
+    for block, day, hour in moves:
+        size = len(block["row_ids"])
+        class_id, teacher_id = block["class_id"], block["teacher_id"]
+        if day not in open_hours_by_day or not isinstance(hour, int) or hour < 0:
+            return "Geçersiz gün veya saat."
+        hours = range(hour, hour + size)
+        mask = block_mask(hour, size)
+        if not mask_fits(avail_mask(class_avail, class_id, day), mask):
+            return "Okul bu saatlerde kapalı."
+        if not mask_fits(avail_mask(teacher_avail, teacher_id, day), mask):
+            return "Öğretmen bu saatlerde müsait değil."
+
+        class_rows = [
+            (row_hour, row_teacher, row_course)
+            for row_id, row_hour, row_teacher, row_course in db.session.query(
+                CourseSchedule.id,
+                CourseSchedule.hour,
+                CourseSchedule.teacher_id,
+                CourseSchedule.course_id,
+            ).filter_by(class_id=class_id, day=day)
+            if row_id not in moving_ids
+        ] + [
+            (row_hour, row_teacher, row_course)
+            for row_class, row_teacher, row_course, row_day, row_hour in placed
+            if row_class == class_id and row_day == day
+        ]
+        for row_hour, row_teacher, row_course in class_rows:
+            if row_hour in hours:
+                return "Sınıfın bu saatlerde başka dersi var."
+            if row_teacher == teacher_id and row_hour in (hour - 1, hour + size):
+                return "Öğretmenin bu sınıfta bitişik başka bir dersi var."
+            if row_teacher == teacher_id and row_course == block["course_id"]:
+                return "Bu ders o gün bu sınıfta zaten var."
+
+        teacher_busy = db.session.query(CourseSchedule.id).filter(
+            CourseSchedule.teacher_id == teacher_id,
+            CourseSchedule.day == day,
+            CourseSchedule.hour.in_(hours),
+            CourseSchedule.id.not_in(moving_ids),
+        ).first() or any(
+            row_teacher == teacher_id and row_day == day and row_hour in hours
+            for _, row_teacher, _, row_day, row_hour in placed
+        )
+        if teacher_busy:
+            return "Öğretmenin bu saatlerde başka sınıfta dersi var."
+        placed.extend((class_id, teacher_id, block["course_id"], day, h) for h in hours)
+    return None
+
+
+def apply_lesson_moves(user_id, moves):
+    """
+    Blokların satırlarını yerinde günceller (blok id'leri korunur) ve
+    değişikliği yeni bir sürüm olarak yayına alır.
+    """
+    db.session.execute(
+        db.update(CourseSchedule),
+        [
+            {"id": row_id, "day": day, "hour": hour + offset}
+            for block, day, hour in moves
+            for offset, row_id in enumerate(block["row_ids"])
+        ],
+    )
+    active = get_snapshot(user_id)
+    if active is None:
+        # Sürümlerden önce kaydedilmiş program: hücreler tablodan okunur
+        cells = {
+            (class_id, day, hour): (course_id, teacher_id)
+            for class_id, day, hour, course_id, teacher_id in db.session.query(
+                CourseSchedule.class_id,
+                CourseSchedule.day,
+                CourseSchedule.hour,
+                CourseSchedule.course_id,
+                CourseSchedule.teacher_id,
+            ).filter(
+                CourseSchedule.user_id == user_id,
+                CourseSchedule.course_id.isnot(None),
+                CourseSchedule.teacher_id.isnot(None),
+            )
+        }
+        return publish_schedule(user_id, cells, [], engine="manual", save=False)
+
+    cells = unpack_cells(active.cells)
+    for block, _, _ in moves:
+        for offset in range(len(block["row_ids"])):
+            cells.pop((block["class_id"], block["day"], block["hour"] + offset), None)
+    for block, day, hour in moves:
+        for offset in range(len(block["row_ids"])):
+            cells[(block["class_id"], day, hour + offset)] = (
+                block["course_id"],
+                block["teacher_id"],
+            )
+    unplaced = json.loads(active.unplaced or "[]")
+    return publish_schedule(user_id, cells, unplaced, engine="manual", save=False)
+
+
+class SolverJobEvents:
+    """
+    Bu süreçte çalışan işlerin son durumunu bellekte tutar; olay akışları
+    veritabanını sorgulamadan yeni durumu bekler.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.revision = 0
+        self.changed = threading.Condition()
+
+    def publish(self, job_id, state):
+        with self.changed:
+            self.revision += 1
+            self.states[job_id] = state
+            self.changed.notify_all()
+
+    def discard(self, job_id):
+        # Bekleyen akışlar uyanır ve işin son halini kayıttan okur
+        with self.changed:
+            self.revision += 1
+            self.states.pop(job_id, None)
+            self.changed.notify_all()
+
+    def wait(self, job_id, revision, timeout):
+        """revision sonrasında bir değişiklik olana (veya süre dolana) kadar bekler."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.revision != revision, timeout)
+            return self.states.get(job_id), self.revision
+
+
+solver_job_events = SolverJobEvents()
+
+
+class SolverJobProgress:
+    """
+    Çözücülerin bildirdiği aşamayı ve yerleşmemiş saat sayısını olay
+    akışına ve iş kaydına iletir. Aynı aşamadaki bildirimler kayda en fazla
+    interval saniyede bir yazılır.
     """
-    teacher_workload_ratio = {}
 
-    teacher_total_available_hours = {}
-    teacher_available_days = {}
+    def __init__(self, job_id, interval=0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.phase = None
+        self.last_write = 0
+        self.last_publish = 0
+        self.started = time.monotonic()
+        self.state = db.session.get(SolverJob, job_id).to_dict()
+
+    def __call__(self, phase, unplaced=None):
+        now = time.monotonic()
+        if phase != self.phase or now - self.last_publish >= 0.1:
+            self.last_publish = now
+            self.state = dict(
+                self.state,
+                phase=phase,
+                unplaced_hours=unplaced,
+                elapsed=round(now - self.started, 1),
+            )
+            solver_job_events.publish(self.job_id, self.state)
+        if phase == self.phase and now - self.last_write < self.interval:
+            return
+        self.phase = phase
+        self.last_write = now
+        SolverJob.query.filter_by(id=self.job_id).update(
+            {"phase": phase, "unplaced_hours": unplaced}
+        )
+        db.session.commit()
 
-    for teacher_id, availability in teacher_avail.items():
-        total_available_hours = 0
-        available_days = 0
-        for day, hours in availability.items():
-            if any(
-                is_available for hour, is_available in hours.items() if is_available
-            ):
-                total_available_hours += sum(
-                    1 for hour, is_available in hours.items() if is_available
-                )
-                available_days += 1
-        teacher_total_available_hours[teacher_id] = total_available_hours
-        teacher_available_days[teacher_id] = available_days
-
-    # Her öğretmenin yerleşmemiş derslerini sayalım
-    for teacher_id in teacher_avail.keys():
-        # Yerleşmemiş ders sayısını hesapla
-        total_unplaced_courses = 0
-        for class_id, courses in course_block_list.items():
-            for course_info in courses:
-                if course_info.get("teacher_id") == teacher_id and not course_info.get(
-                    "placed", False
-                ):
-                    total_unplaced_courses += course_info.get("weekly_hours")
 
-        # Hata kontrolü: Yerleşmemiş ders sayısı müsait saatten büyükse
-        if total_unplaced_courses > teacher_total_available_hours[teacher_id]:
-            raise ValueError(
-                f"Öğretmen ID {teacher_id}: Yerleşmemiş ders sayısı ({total_unplaced_courses}) müsait zamanından ({teacher_total_available_hours[teacher_id]}) büyük!"
+def run_solver_job(job_id):
+    with app.app_context():
+        job = db.session.get(SolverJob, job_id)
+        job.status = "running"
+        job.started_at = datetime.now()
+        job.phase = "hazırlık"
+        db.session.commit()
+        solver_job_events.publish(job_id, job.to_dict())
+        try:
+            snapshot = create_schedule(
+                job.user_id,
+                engine=job.engine,
+                time_limit=job.time_limit,
+                progress=SolverJobProgress(job_id),
             )
+            job = db.session.get(SolverJob, job_id)
+            job.status = "done"
+            job.phase = "tamamlandı"
+            job.snapshot_version = snapshot.version
+            job.seed = snapshot.seed
+            job.unplaced_hours = snapshot.unplaced_hours
+        except Exception as error:
+            db.session.rollback()
+            app.logger.exception("Program oluşturma işi başarısız: %s", job_id)
+            job = db.session.get(SolverJob, job_id)
+            job.status = "failed"
+            job.error = str(error)
+        job.finished_at = datetime.now()
+        db.session.commit()
+        solver_job_events.discard(job_id)
 
-        # Doluluk oranını hesapla: müsait saat / yerleşmemiş ders sayısı
-        if total_unplaced_courses > 0:
-            workload_ratio = (
-                teacher_total_available_hours[teacher_id]
-                / total_unplaced_courses
-                * teacher_available_days[teacher_id]
-                * teacher_available_days[teacher_id]
-            )
-        else:
-            workload_ratio = 0  # Eğer yerleşmemiş ders yoksa oran sıfır
 
-        # Yerleşmemiş ders sayısı veya müsait saat sıfırsa listeye ekleme
-        if total_unplaced_courses > 0 or teacher_total_available_hours[teacher_id] > 0:
-            teacher_workload_ratio[teacher_id] = workload_ratio
+def create_schedule(user_id, engine="heuristic", time_limit=None, progress=None):
+    """
+    Kullanıcının ders programını seçilen çözücüyle oluşturur, yeni bir sürüm
+    olarak yayına alır ve bu sürümü (ScheduleSnapshot) döndürür. Yerleşmemiş
+    dersler ve çalışma bilgileri sürüm kaydında tutulur.
+    """
+    progress = progress or (lambda phase, unplaced=None: None)
+    teacher_avail, class_avail, open_hours_by_day = load_availability(user_id)
+    course_block_list = course_block_list_get(user_id)
+    schedule = initialize_schedule(
+        Class.query.filter_by(user_id=user_id).all(), open_hours_by_day
+    )
+    block_index = BlockIndex(course_block_list)
+    seed = None
+
+    if engine == "backtracking":
+        # Sezgisel sonuç, aramanın geçmesi gereken başlangıç çözümü olur
+        schedule, course_block_list = solve_backtracking(
+            schedule,
+            teacher_avail,
+            class_avail,
+            open_hours_by_day,
+            course_block_list,
+            block_index,
+            node_limit=app.config["SOLVER_NODE_LIMIT"],
+            time_limit=time_limit or app.config["SOLVER_TIME_LIMIT"],
+            progress=progress,
+            incumbent=heuristic_placements(
+                schedule,
+                teacher_avail,
+                class_avail,
+                open_hours_by_day,
+                course_block_list,
+                time_limit=app.config["SOLVER_IMPROVE_TIME_LIMIT"],
+            ),
+        )
+    elif engine == "genetic":
+        schedule, course_block_list = solve_genetic(
+            schedule,
+            teacher_avail,
+            class_avail,
+            open_hours_by_day,
+            course_block_list,
+            block_index,
+            population_size=app.config["GA_POPULATION_SIZE"],
+            generations=app.config["GA_GENERATIONS"],
+            time_limit=time_limit or app.config["SOLVER_TIME_LIMIT"],
+            workers=app.config["SOLVER_WORKERS"],
+            progress=progress,
+        )
+    elif engine == "multistart":
+        schedule, course_block_list, seed = solve_multistart(
+            schedule,
+            teacher_avail,
+            class_avail,
+            open_hours_by_day,
+            course_block_list,
+            block_index,
+            starts=app.config["SOLVER_STARTS"],
+            workers=app.config["SOLVER_WORKERS"],
+            time_limit=time_limit or app.config["SOLVER_IMPROVE_TIME_LIMIT"],
+            progress=progress,
+        )
+    else:
+        schedule, course_block_list = solve_heuristic(
+            schedule,
+            teacher_avail,
+            class_avail,
+            open_hours_by_day,
+            course_block_list,
+            block_index,
+            time_limit=time_limit or app.config["SOLVER_IMPROVE_TIME_LIMIT"],
+            progress=progress,
+        )
+    unplaced_assignments = create_unplaced_assignments(course_block_list)
+    progress("kaydediliyor", unplaced_hours(course_block_list))
 
-    # Öğretmenleri doluluk oranına göre sıralıyoruz
-    teacher_workload_ratio = dict(
-        sorted(teacher_workload_ratio.items(), key=lambda item: item[1])
+    # Veritabanı işlemleri
+    snapshot = publish_schedule(
+        user_id,
+        schedule_cells(schedule),
+        unplaced_assignments,
+        engine=engine,
+        seed=seed,
     )
 
-    return teacher_workload_ratio
+    return snapshot
 
 
-def find_difficult_times(teacher_avail, open_hours_by_day):
+def schedule_cells(schedule):
+    """Program sözlüğünü {(sınıf, gün, saat): (ders, öğretmen)} biçimine çevirir."""
+    return {
+        (class_id, day, hour): (lesson_info["course_id"], lesson_info["teacher_id"])
+        for class_id, days_data in schedule.items()
+        for day, hours in days_data.items()
+        for hour, lesson_info in hours.items()
+        if lesson_info
+    }
+
+
+# Sürüm kaydındaki hücre biçimi: sınıf, gün sırası, saat, ders, öğretmen
+SNAPSHOT_CELL = struct.Struct("<IBBII")
+
+
+def cell_order(key):
+    class_id, day, hour = key
+    return class_id, DAYS.index(day), hour
+
+
+def pack_cells(cells):
+    return zlib.compress(
+        b"".join(
+            SNAPSHOT_CELL.pack(key[0], DAYS.index(key[1]), key[2], *cells[key])
+            for key in sorted(cells, key=cell_order)
+        )
+    )
+
+
+def unpack_cells(data):
+    return {
+        (class_id, DAYS[day_index], hour): (course_id, teacher_id)
+        for class_id, day_index, hour, course_id, teacher_id in SNAPSHOT_CELL.iter_unpack(
+            zlib.decompress(data)
+        )
+    }
+
+
+def publish_schedule(
+    user_id, cells, unplaced_assignments, engine=None, seed=None, save=True
+):
     """
-    Öğretmenlerin müsaitlik bilgilerine göre, en zor zaman dilimlerini belirler.
-    En zor zaman dilimleri, en az öğretmenin müsait olduğu saatlerdir.
+    Programı yeni bir sürüm olarak kaydeder ve yayına alır. Sürüm kaydı,
+    CourseSchedule tablosunun güncellenmesi ve yayın işaretçisinin yeni
+    sürüme çevrilmesi tek işlemde yapılır; okuyucular yarım program görmez.
+    save=False ise CourseSchedule satırlarını çağıran zaten güncellemiştir.
+    Eşzamanlı yayınlar aynı sürüm numarasını almasın diye yazma kilidi sürüm
+    okunmadan önce alınır.
+    """
+    lock_schedule_writes(user_id)
+    last_version = (
+        db.session.query(db.func.max(ScheduleSnapshot.version))
+        .filter_by(user_id=user_id)
+        .scalar()
+    )
+    snapshot = ScheduleSnapshot(
+        user_id=user_id,
+        version=(last_version or 0) + 1,
+        engine=engine,
+        seed=seed,
+        cell_count=len(cells),
+        unplaced_hours=sum(entry["weekly_hours"] for entry in unplaced_assignments),
+        cells=pack_cells(cells),
+        unplaced=json.dumps(unplaced_assignments),
+    )
+    db.session.add(snapshot)
+    db.session.flush()
+    activate_snapshot(user_id, snapshot, cells, save=save)
+    prune_snapshots(user_id, app.config["SCHEDULE_SNAPSHOT_KEEP"])
+    db.session.commit()
+    return snapshot
 
-    Args:
-        teacher_avail (dict): Öğretmenlerin müsaitlik bilgisi.
-        open_hours_by_day (dict): Günlere göre açık saatler.
 
-    Returns:
-        list: En zor zaman dilimlerinin listesi.
+def lock_schedule_writes(user_id):
     """
-    time_load = {}
+    Kullanıcının program yazmalarını sıraya sokar; kilit commit veya rollback
+    ile bırakılır. SQLite'ta yazma kilidi işlemin başında alınır (BEGIN
+    IMMEDIATE): önce okuyup sonra yazan bir işlem, araya giren başka bir yazma
+    yüzünden "database is locked" almaz, busy_timeout kadar sırasını bekler.
+    Diğer veritabanlarında kullanıcı satırı kilitlenir.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite":
+        # İşlem zaten bir yazmayla açıldıysa kilit elimizdedir
+        if not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        db.session.execute(
+            db.select(User.id).where(User.id == user_id).with_for_update()
+        )
 
-    # Zor zaman dilimlerini belirlemek için her gün ve saat üzerinde döngü kuruyoruz
-    for day, hours in open_hours_by_day.items():
-        for hour in hours:
-            time_load[(day, hour)] = 0
-            # Öğretmenlerin müsaitlik bilgisi üzerinden her saat için yük hesaplama
-            for teacher_id in teacher_avail:
-                if (
-                    day in teacher_avail[teacher_id]
-                    and hour in teacher_avail[teacher_id][day]
+
+def activate_snapshot(user_id, snapshot, cells=None, save=True):
+    """Yayın işaretçisini snapshot'a çevirir; commit çağırana bırakılır."""
+    if save:
+        if cells is None:
+            cells = unpack_cells(snapshot.cells)
+        save_course_schedule(user_id, cells, diff=app.config["SCHEDULE_SAVE_DIFF"])
+    active = db.session.get(ActiveSchedule, user_id)
+    if active is None:
+        db.session.add(ActiveSchedule(user_id=user_id, snapshot_id=snapshot.id))
+    else:
+        active.snapshot_id = snapshot.id
+        active.published_at = datetime.now()
+
+
+def prune_snapshots(user_id, keep):
+    """En yeni keep sürüm ve yayındaki sürüm dışındakileri siler."""
+    kept_ids = (
+        db.select(ScheduleSnapshot.id)
+        .filter_by(user_id=user_id)
+        .order_by(ScheduleSnapshot.version.desc())
+        .limit(keep)
+    )
+    active_id = db.select(ActiveSchedule.snapshot_id).filter_by(user_id=user_id)
+    db.session.execute(
+        db.delete(ScheduleSnapshot).where(
+            ScheduleSnapshot.user_id == user_id,
+            ScheduleSnapshot.id.not_in(kept_ids),
+            ScheduleSnapshot.id.not_in(active_id),
+        )
+    )
+
+
+def get_snapshot(user_id, version=None):
+    """Verilen sürümü, sürüm verilmezse yayındaki sürümü döndürür."""
+    if version is None:
+        return (
+            db.session.query(ScheduleSnapshot)
+            .join(ActiveSchedule, ActiveSchedule.snapshot_id == ScheduleSnapshot.id)
+            .filter(ActiveSchedule.user_id == user_id)
+            .first()
+        )
+    return ScheduleSnapshot.query.filter_by(user_id=user_id, version=version).first()
+
+
+def restore_snapshot(user_id, version):
+    """
+    Eski bir sürümü yeniden yayına alır. Hücreler yayındaki satırlarla
+    karşılaştırılarak yazıldığından kilit okumadan önce alınır.
+    """
+    lock_schedule_writes(user_id)
+    snapshot = get_snapshot(user_id, version)
+    if snapshot is None:
+        return None
+    activate_snapshot(user_id, snapshot)
+    db.session.commit()
+    return snapshot
+
+
+def compare_snapshots(old_cells, new_cells):
+    """İki sürüm arasında değişen hücreler: (sınıf, gün, saat, eski, yeni)."""
+    changes = []
+    for key in sorted(old_cells.keys() | new_cells.keys(), key=cell_order):
+        old_value, new_value = old_cells.get(key), new_cells.get(key)
+        if old_value != new_value:
+            changes.append((*key, old_value, new_value))
+    return changes
+
+
+def save_course_schedule(user_id, cells, diff=True):
+    """
+    Program hücrelerini ({(sınıf, gün, saat): (ders, öğretmen)}) CourseSchedule
+    tablosuna yazar. Satırlar ORM nesnesi oluşturulmadan toplu INSERT
+    (executemany) ile eklenir. Commit çağırana bırakılır.
+
+    diff verilirse yalnızca önceki kayıttan farklı hücreler silinip eklenir;
+    değişmeyen hücrelerin satırları (ve id'leri) korunur.
+    """
+    cells = dict(cells)
+
+    if diff:
+        stale_ids = []
+        existing = (
+            db.session.query(
+                CourseSchedule.id,
+                CourseSchedule.class_id,
+                CourseSchedule.day,
+                CourseSchedule.hour,
+                CourseSchedule.course_id,
+                CourseSchedule.teacher_id,
+            )
+            .filter_by(user_id=user_id)
+            .all()
+        )
+        for row_id, class_id, day, hour, course_id, teacher_id in existing:
+            key = (class_id, day, hour)
+            if cells.get(key) == (course_id, teacher_id):
+                # Aynı hücre zaten kayıtlı; ikinci bir kopyası varsa silinir
+                del cells[key]
+            else:
+                stale_ids.append(row_id)
+        for start in range(0, len(stale_ids), 500):
+            db.session.execute(
+                db.delete(CourseSchedule).where(
+                    CourseSchedule.id.in_(stale_ids[start : start + 500])
+                )
+            )
+    else:
+        db.session.execute(
+            db.delete(CourseSchedule).where(CourseSchedule.user_id == user_id)
+        )
+
+    if cells:
+        db.session.execute(
+            db.insert(CourseSchedule),
+            [
+                {
+                    "day": day,
+                    "hour": hour,
+                    "course_id": course_id,
+                    "teacher_id": teacher_id,
+                    "class_id": class_id,
+                    "user_id": user_id,
+                }
+                for (class_id, day, hour), (course_id, teacher_id) in cells.items()
+            ],
+        )
+
+
+def solve_heuristic(
+    schedule,
+    teacher_avail,
+    class_avail,
+    open_hours_by_day,
+    course_block_list,
+    block_index,
+    time_limit=5,
+    rng=None,
+    progress=None,
+    randomize=False,
+):
+    """
+    Zor zaman dilimlerinden başlayan açgözlü yerleştirme ve ardından
+    time_limit saniyelik iyileştirme aşaması (improve_schedule).
+
+    randomize verilirse zaman dilimi, sınıf ve öğretmen sıralarına rng ile
+    küçük sapmalar eklenir; çoklu başlangıçta her tohum farklı bir program
+    kurar.
+    """
+    if progress:
+        progress("yerleştirme")
+    rng = rng or random.Random()
+    difficult_times = find_difficult_times(teacher_avail, open_hours_by_day)
+    class_ids = list(schedule)
+    ratio_noise = {}
+    if randomize:
+        window = max(1, len(difficult_times) // 10)
+        difficult_times = [
+            time_slot
+            for _, time_slot in sorted(
+                (position + rng.uniform(0, window), time_slot)
+                for position, time_slot in enumerate(difficult_times)
+            )
+        ]
+        rng.shuffle(class_ids)
+        ratio_noise = {
+            teacher_id: 1 + rng.uniform(0, 0.2) for teacher_id in teacher_avail
+        }
+    teacher_queue = TeacherWorkloadQueue(
+        teacher_avail, course_block_list, noise=ratio_noise
+    )
+
+    for day, hour in difficult_times:
+        for class_id in class_ids:
+            # Sınıfın yerleşmemiş dersleri, öğretmeni en zor durumda olandan
+            # başlayarak denenir; sıra yerleştirmelerle birlikte güncel tutulur
+            for assignment in teacher_queue.blocks(class_id):
+                teacher_id = assignment["teacher_id"]
+                if is_valid_placement(
+                    schedule,
+                    assignment["block_id"],
+                    class_id,
+                    teacher_id,
+                    assignment["weekly_hours"],
+                    open_hours_by_day,
+                    teacher_avail,
+                    class_avail,
+                    course_block_list,
+                    day,
+                    hour,
+                    block_index,
                 ):
-                    if teacher_avail[teacher_id][day][hour]:
-                        time_load[(day, hour)] += 1
+                    place_course_block(
+                        schedule,
+                        assignment,
+                        day,
+                        hour,
+                        course_block_list,
+                        teacher_avail,
+                        class_avail,
+                        block_index,
+                        teacher_queue,
+                    )
+    return improve_schedule(
+        schedule,
+        teacher_avail,
+        class_avail,
+        open_hours_by_day,
+        course_block_list,
+        block_index,
+        teacher_queue,
+        time_limit=time_limit,
+        rng=rng,
+        progress=progress,
+    )
 
-    sorted_time_load = sorted(time_load.items(), key=lambda item: item[1])
-    difficult_times = [(day, hour) for (day, hour), load in sorted_time_load]
 
-    return difficult_times
+def unplaced_hours(course_block_list):
+    return sum(
+        course_info["weekly_hours"]
+        for courses in course_block_list.values()
+        for course_info in courses
+        if not course_info["placed"]
+    )
 
 
-@app.route("/create_schedule_genetic", methods=["POST"])
-@login_required
-def create_genetic():
-    schedule = create_schedule()
-    return redirect(url_for("schedules"))
+def improve_schedule(
+    schedule,
+    teacher_avail,
+    class_avail,
+    open_hours_by_day,
+    course_block_list,
+    block_index,
+    teacher_queue=None,
+    time_limit=5,
+    stall_limit=3000,
+    rng=None,
+    progress=None,
+):
+    """
+    Süre sınırlı iyileştirme aşaması; her an görülen en iyi programı korur.
+
+    Önce try_place_courses onarım turları, bir tur ilerleme sağlamayana kadar
+    çalışır. Ardından tabu listeli tavlama benzetimi (simulated annealing)
+    yapılır: yerleşmemiş bir blok, sınıfın ve öğretmenin açık olduğu bir
+    zamana konur, çakıştığı bloklar çıkarılıp başka yerlere yerleştirilmeye
+    çalışılır. Hiç yerleşmemiş ders kalmayınca, süre dolunca veya stall_limit
+    hamle boyunca en iyi sonuç değişmeyince durur.
+    """
+    deadline = time.monotonic() + time_limit
+    rng = rng or random.Random()
+
+    # 1. Onarım turları
+    current = unplaced_hours(course_block_list)
+    while current and time.monotonic() < deadline:
+        # Önceki turda yerleşen bloklar tekrar denenmesin
+        unplaced_assignments = create_unplaced_assignments(course_block_list)
+        schedule, course_block_list = try_place_courses(
+            schedule,
+            unplaced_assignments,
+            teacher_avail,
+            class_avail,
+            open_hours_by_day,
+            course_block_list,
+            block_index,
+            teacher_queue,
+        )
+        previous, current = current, unplaced_hours(course_block_list)
+        if progress:
+            progress("onarım", current)
+        if current >= previous:
+            break
+    if not current or time.monotonic() >= deadline:
+        return schedule, course_block_list
+
+    # 2. Tavlama benzetimi: blokların boş program üzerindeki aday zamanları
+    base_teacher_avail = copy.deepcopy(teacher_avail)
+    base_class_avail = copy.deepcopy(class_avail)
+    for block_id, cells in block_index.cells.items():
+        course_info = block_index.get(block_id)
+        for class_id, day, hour in cells:
+            update_teacher_avail(
+                base_teacher_avail, course_info["teacher_id"], day, hour, True
+            )
+            update_class_avail(base_class_avail, class_id, day, hour, True)
+
+    candidates = {}
+
+    def block_candidates(course_info):
+        block_id = course_info["block_id"]
+        if block_id not in candidates:
+            candidates[block_id] = [
+                (day, hour)
+                for day, hours in open_hours_by_day.items()
+                for hour in hours
+                if mask_fits(
+                    avail_mask(base_class_avail, course_info["class_id"], day)
+                    & avail_mask(base_teacher_avail, course_info["teacher_id"], day),
+                    block_mask(hour, course_info["weekly_hours"]),
+                )
+            ]
+        return candidates[block_id]
+
+    def blockers(course_info, day, hour):
+        """Bloğun (day, hour) zamanına girebilmesi için çıkarılması gerekenler."""
+        class_id = course_info["class_id"]
+        teacher_id = course_info["teacher_id"]
+        size = course_info["weekly_hours"]
+        found = set()
+        for h in range(hour, hour + size):
+            lesson_info = schedule[class_id][day].get(h)
+            if lesson_info is not None:
+                found.add(lesson_info["block_id"])
+            other_id = block_index.teacher_cells.get((teacher_id, day, h))
+            if other_id is not None:
+                found.add(other_id)
+        for lesson_info in schedule[class_id][day].values():
+            if lesson_info is not None and lesson_info["teacher_id"] == teacher_id:
+                # Aynı gün aynı ders ya da bitişik saatte aynı öğretmen
+                if lesson_info["course_id"] == course_info["course_id"]:
+                    found.add(lesson_info["block_id"])
+        for h in (hour - 1, hour + size):
+            lesson_info = schedule[class_id][day].get(h)
+            if lesson_info is not None and lesson_info["teacher_id"] == teacher_id:
+                found.add(lesson_info["block_id"])
+        found.discard(course_info["block_id"])
+        return found
+
+    def try_place(course_info, undo):
+        options = block_candidates(course_info)
+        start = rng.randrange(len(options)) if options else 0
+        for day, hour in options[start:] + options[:start]:
+            if is_valid_placement(
+                schedule,
+                course_info["block_id"],
+                course_info["class_id"],
+                course_info["teacher_id"],
+                course_info["weekly_hours"],
+                open_hours_by_day,
+                teacher_avail,
+                class_avail,
+                course_block_list,
+                day,
+                hour,
+                block_index,
+            ):
+                place_course_block(
+                    schedule,
+                    course_info,
+                    day,
+                    hour,
+                    course_block_list,
+                    teacher_avail,
+                    class_avail,
+                    block_index,
+                    teacher_queue,
+                )
+                undo.append(("place", course_info["block_id"], None))
+                return True
+        return False
 
+    def revert(undo):
+        for action, block_id, placement in reversed(undo):
+            if action == "place":
+                unplace_course_block(
+                    schedule,
+                    block_id,
+                    teacher_avail,
+                    class_avail,
+                    block_index,
+                    teacher_queue,
+                )
+            else:
+                place_course_block(
+                    schedule,
+                    block_index.get(block_id),
+                    placement[0],
+                    placement[1],
+                    course_block_list,
+                    teacher_avail,
+                    class_avail,
+                    block_index,
+                    teacher_queue,
+                )
 
-def create_schedule():
-    current_user = User.query.filter_by(username=session["username"]).first()
-    if current_user is None:
-        flash("Kullanıcı bulunamadı. Lütfen tekrar oturum açın.", "danger")
-        return redirect(url_for("login"))
+    best = current
+    best_placements = block_index.placements()
+    tabu_until = {}
+    start_time = time.monotonic()
+    iteration = 0
+    last_improvement = 0
+    while current and iteration - last_improvement < stall_limit:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        iteration += 1
+        if progress:
+            progress("iyileştirme", best)
+        temperature = max(0.05, 2.0 * (deadline - now) / (deadline - start_time))
+        pending = [
+            course_info
+            for courses in course_block_list.values()
+            for course_info in courses
+            if not course_info["placed"] and block_candidates(course_info)
+        ]
+        if not pending:
+            break
+        course_info = rng.choice(pending)
+        day, hour = rng.choice(block_candidates(course_info))
+        ejected = blockers(course_info, day, hour)
+        if any(tabu_until.get(block_id, 0) > iteration for block_id in ejected):
+            continue
 
-    teacher_avail, class_avail, open_hours_by_day = load_availability()
-    course_block_list = course_block_list_get()
-    schedule = initialize_schedule(
-        Class.query.filter_by(user_id=session["user_id"]).all(), open_hours_by_day
+        undo = []
+        placements = block_index.placements()
+        for block_id in ejected:
+            unplace_course_block(
+                schedule,
+                block_id,
+                teacher_avail,
+                class_avail,
+                block_index,
+                teacher_queue,
+            )
+            undo.append(("unplace", block_id, placements[block_id]))
+        if not try_place(course_info, undo) or not block_index.is_placed(
+            course_info["block_id"]
+        ):
+            revert(undo)
+            continue
+        for block_id in ejected:
+            try_place(block_index.get(block_id), undo)
+
+        candidate = unplaced_hours(course_block_list)
+        delta = candidate - current
+        if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+            current = candidate
+            tabu_until[course_info["block_id"]] = iteration + 10
+            if current < best:
+                best = current
+                best_placements = block_index.placements()
+                last_improvement = iteration
+        else:
+            revert(undo)
+
+    # En iyi programa geri dön
+    if current > best:
+        for block_id in list(block_index.placements()):
+            unplace_course_block(
+                schedule,
+                block_id,
+                teacher_avail,
+                class_avail,
+                block_index,
+                teacher_queue,
+            )
+        for block_id, (day, hour) in best_placements.items():
+            place_course_block(
+                schedule,
+                block_index.get(block_id),
+                day,
+                hour,
+                course_block_list,
+                teacher_avail,
+                class_avail,
+                block_index,
+                teacher_queue,
+            )
+    return schedule, course_block_list
+
+
+def solver_process_pool(workers, initializer=None, initargs=()):
+    """
+    Çözücülerin süreç havuzu. İşler çok iş parçacıklı web sürecinin içinden
+    başlatıldığından fork yerine spawn kullanılır; işçiler app modülünü temiz
+    bir süreçte içe aktarır (işçilerde veritabanı hazırlığı atlanır).
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
     )
 
-    difficult_times = find_difficult_times(teacher_avail, open_hours_by_day)
-    teacher_workload_ratios = calculate_teacher_workload_ratio(
-        teacher_avail, course_block_list
+
+def run_heuristic_start(args):
+    """
+    Çoklu başlangıcın tek bir denemesi; süreç havuzunda çalışır ve
+    (yerleşmemiş saat, tohum, block_id -> (gün, saat)) döndürür.
+    """
+    (
+        schedule,
+        teacher_avail,
+        class_avail,
+        open_hours_by_day,
+        course_block_list,
+        time_limit,
+        seed,
+    ) = args
+    block_index = BlockIndex(course_block_list)
+    solve_heuristic(
+        schedule,
+        teacher_avail,
+        class_avail,
+        open_hours_by_day,
+        course_block_list,
+        block_index,
+        time_limit=time_limit,
+        rng=random.Random(seed),
+        randomize=True,
     )
+    return unplaced_hours(course_block_list), seed, block_index.placements()
 
-    unplaced_assignments = create_unplaced_assignments(course_block_list)
-    # print(course_block_list)
-    placed_in_difficult_time = False
-    for day, hour in difficult_times:
-        for class_id, _ in schedule.items():
-            for assignment in course_block_list[class_id]:
-                for teacher_id, ratio in calculate_teacher_workload_ratio(
-                    teacher_avail, course_block_list
-                ).items():
-                    if assignment["teacher_id"] == teacher_id:
-                        if is_valid_placement(
-                            schedule,
-                            assignment["block_id"],
-                            class_id,
-                            teacher_id,
-                            assignment["weekly_hours"],
-                            open_hours_by_day,
-                            teacher_avail,
-                            class_avail,
-                            course_block_list,
-                            day,
-                            hour,
-                        ):
-                            assign_course_block(
-                                schedule,
-                                assignment["block_id"],
-                                assignment["course_id"],
-                                assignment["course_name"],
-                                class_id,
-                                assignment["class_name"],
-                                assignment["teacher_name"],
-                                teacher_id,
-                                day,
-                                hour,
-                                assignment["weekly_hours"],
-                                course_block_list,
-                                teacher_avail,
-                                class_avail,
-                            )
-    unplaced_assignments = create_unplaced_assignments(course_block_list)
-    # parametre olarak alınan döngü sayısı
-    for _ in range(100):  # 10 defa döngüyü tekrarla
-        schedule, course_block_list = try_place_courses(
+
+def solve_multistart(
+    schedule,
+    teacher_avail,
+    class_avail,
+    open_hours_by_day,
+    course_block_list,
+    block_index,
+    starts=8,
+    workers=1,
+    time_limit=5,
+    seed=None,
+    progress=None,
+):
+    """
+    Sezgisel çözücüyü farklı tohumlarla rastgeleleştirilmiş olarak starts kez
+    çalıştırır ve en az saat boş bırakan programı uygular. Denemeler süreç
+    havuzunda paralel yürür; toplam süre time_limit'i aşmasın diye her
+    denemenin iyileştirme süresi tur sayısına bölünür.
+
+    Returns:
+        (schedule, course_block_list, kazanan tohum)
+    """
+    base_seed = seed if seed is not None else random.randrange(2**31)
+    workers = max(1, min(workers, starts))
+    rounds = -(-starts // workers)
+    tasks = [
+        (
             schedule,
-            unplaced_assignments,
             teacher_avail,
             class_avail,
             open_hours_by_day,
             course_block_list,
+            time_limit / rounds,
+            base_seed + index,
         )
-    unplaced_assignments = create_unplaced_assignments(course_block_list)
-
-    # Veritabanı işlemleri
-    CourseSchedule.query.filter_by(user_id=current_user.id).delete()
+        for index in range(starts)
+    ]
+
+    best = None
+    if progress:
+        progress("çoklu başlangıç")
+    if workers == 1:
+        results = (run_heuristic_start(copy.deepcopy(task)) for task in tasks)
+    else:
+        pool = solver_process_pool(workers)
+        results = (
+            future.result()
+            for future in as_completed(
+                [pool.submit(run_heuristic_start, task) for task in tasks]
+            )
+        )
+    try:
+        for result in results:
+            # Eşitlikte küçük tohum seçilir; sonuç tamamlanma sırasına bağlı olmaz
+            if best is None or result[:2] < best[:2]:
+                best = result
+            if progress:
+                progress("çoklu başlangıç", best[0])
+    finally:
+        if workers > 1:
+            pool.shutdown()
+
+    best_unplaced, best_seed, placements = best
+    for block_id, (day, hour) in placements.items():
+        place_course_block(
+            schedule,
+            block_index.get(block_id),
+            day,
+            hour,
+            course_block_list,
+            teacher_avail,
+            class_avail,
+            block_index,
+        )
+    return schedule, course_block_list, best_seed
 
-    for class_id, days_data in schedule.items():
-        for day, hours in days_data.items():
-            for hour, lesson_info in hours.items():
-                if lesson_info:
-                    new_course_schedule = CourseSchedule(
-                        day=day,
-                        hour=hour,
-                        course_id=lesson_info["course_id"],
-                        teacher_id=lesson_info["teacher_id"],
-                        class_id=class_id,
-                        user_id=current_user.id,
-                    )
-                    db.session.add(new_course_schedule)
-    db.session.commit()
-    # Yerleşim raporu sonuçlarına göre flash mesajları
 
-    print(
-        "unplassssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssssss"
+def heuristic_placements(
+    schedule,
+    teacher_avail,
+    class_avail,
+    open_hours_by_day,
+    course_block_list,
+    time_limit=5,
+):
+    """
+    Sezgisel çözücüyü verilerin kopyası üzerinde çalıştırır ve sonucunu
+    block_id -> (gün, saat) olarak döndürür; asıl veriler değişmez.
+    """
+    seed_schedule, seed_teacher_avail, seed_class_avail, seed_blocks = copy.deepcopy(
+        (schedule, teacher_avail, class_avail, course_block_list)
     )
-
-    session["unplaced_assignments"] = unplaced_assignments
-    return schedule
+    seed_index = BlockIndex(seed_blocks)
+    solve_heuristic(
+        seed_schedule,
+        seed_teacher_avail,
+        seed_class_avail,
+        open_hours_by_day,
+        seed_blocks,
+        seed_index,
+        time_limit=time_limit,
+    )
+    return seed_index.placements()
 
 
 def try_place_courses(
@@ -1457,6 +4188,8 @@ def try_place_courses(
     class_avail,
     open_hours_by_day,
     course_block_list,
+    block_index,
+    teacher_queue=None,
 ):
     """Yerleşmeyen dersleri mevcut programa yerleştirmeye çalışır."""
 
@@ -1477,6 +4210,8 @@ def try_place_courses(
                     open_hours_by_day,
                     course_block_list,
                     unplaced_assignments,
+                    block_index,
+                    teacher_queue,
                 )
             )
             if placed:
@@ -1493,6 +4228,8 @@ def try_swap_placement(
     open_hours_by_day,
     course_block_list,
     unplaced_assignments,
+    block_index,
+    teacher_queue=None,
 ):
     """Mevcut derslerle yer değiştirerek dersi yerleştirmeye çalışır."""
     class_id = assignment["class_id"]
@@ -1523,6 +4260,8 @@ def try_swap_placement(
             hour,
             course_block_list,
             block_id,
+            class_avail,
+            block_index,
         ):
             conflicting_blocks = find_conflicting_blocks(
                 schedule,
@@ -1534,6 +4273,7 @@ def try_swap_placement(
                 hour,
                 course_block_list,
                 block_id,
+                block_index,
             )
             schedule, unplaced_assignments, course_block_list = (
                 remove_and_unplace_blocks(
@@ -1544,6 +4284,10 @@ def try_swap_placement(
                     class_id,
                     day,
                     hour,
+                    teacher_avail,
+                    class_avail,
+                    block_index,
+                    teacher_queue,
                 )
             )
             # Çakışma çözüldükten sonra dersi tekrar yerleştirmeyi deniyoruz
@@ -1567,17 +4311,16 @@ def try_swap_placement(
                 hour,
                 course_block_list,
                 block_id,
+                class_avail,
+                block_index,
             ):
                 return schedule, unplaced_assignments, course_block_list, False
             else:
-                m = True
-                # Blok için tüm saatleri kontrol et
-                for h in range(hour, hour + block_size):
-                    # 3. Öğretmen belirtilen saatte müsait mi?
-                    if not teacher_avail[teacher_id][day].get(h, False):
-                        m = False
-
-                if m == True:
+                # 3. Öğretmen bloğun tüm saatlerinde müsait mi?
+                if mask_fits(
+                    avail_mask(teacher_avail, teacher_id, day),
+                    block_mask(hour, block_size),
+                ):
                     schedule, course_block_list, placed = assign_course_block(
                         schedule,
                         block_id,
@@ -1593,9 +4336,11 @@ def try_swap_placement(
                         course_block_list,
                         teacher_avail,
                         class_avail,
+                        block_index,
+                        teacher_queue,
                     )
-                    print(
-                        "Çakışmalı atandı",
+                    app.logger.debug(
+                        "Çakışmalı atandı: %s %s. saat, %s %s %s",
                         day,
                         hour,
                         assignment["class_name"],
@@ -1605,13 +4350,11 @@ def try_swap_placement(
                     if placed:
                         return schedule, unplaced_assignments, course_block_list, True
         else:
-            m = True
-            # Blok için tüm saatleri kontrol et
-            for h in range(hour, hour + block_size):
-                # 3. Öğretmen belirtilen saatte müsait mi?
-                if not teacher_avail[teacher_id][day].get(h, False):
-                    m = False
-            if m == True:
+            # 3. Öğretmen bloğun tüm saatlerinde müsait mi?
+            if mask_fits(
+                avail_mask(teacher_avail, teacher_id, day),
+                block_mask(hour, block_size),
+            ):
                 schedule, course_block_list, placed = assign_course_block(
                     schedule,
                     block_id,
@@ -1627,9 +4370,11 @@ def try_swap_placement(
                     course_block_list,
                     teacher_avail,
                     class_avail,
+                    block_index,
+                    teacher_queue,
                 )
-                print(
-                    "Çakışmasız atandı",
+                app.logger.debug(
+                    "Çakışmasız atandı: %s %s. saat, %s %s %s",
                     day,
                     hour,
                     assignment["class_name"],
@@ -1686,21 +4431,13 @@ def check_block_availability(
 ):
     """Belirtilen blok zaman diliminin müsait olup olmadığını kontrol eder."""
 
-    # Blok için tüm saatleri kontrol et
-    for h in range(hour, hour + block_size):
-        # 1. Saat okulun açık saatleri içinde mi?
-        if h not in open_hours_by_day.get(day, []):
-            return False
-
-        # 2. Sınıf belirtilen saatte müsait mi?
-        if not class_avail[class_id][day].get(h, False):
-            return False
-
-        # 3. Öğretmen belirtilen saatte müsait mi?
-        if not teacher_avail[teacher_id][day].get(h, False):
-            return False, day, hour
-
-    return True
+    # Sınıf maskesi okulun açık saatleriyle sınırlıdır; öğretmen maskesiyle
+    # birleştirip bloğun tamamını tek seferde kontrol ediyoruz.
+    return mask_fits(
+        avail_mask(class_avail, class_id, day)
+        & avail_mask(teacher_avail, teacher_id, day),
+        block_mask(hour, block_size),
+    )
 
 
 def check_block_conflict(
@@ -1713,6 +4450,8 @@ def check_block_conflict(
     hour,
     course_block_list,
     block_id,
+    class_avail,
+    block_index,
 ):
     """
     Belirtilen ders bloğunun olası bir yerleştirme durumunda çakışma yapıp yapmadığını kontrol eder.
@@ -1727,27 +4466,37 @@ def check_block_conflict(
         hour (int): Dersin planlandığı başlangıç saati.
         course_block_list (dict): Tüm ders bloklarının listesi.
         block_id (int): Kontrol edilen bloğun ID'si.
+        class_avail (dict): Sınıfların boş saat maskeleri.
+        block_index (BlockIndex): Blok ve günlük ders indeksi.
 
         Returns:
         bool: Çakışma varsa True, yoksa False.
     """
-    for h in range(hour, hour + block_size):
-        if h not in open_hours_by_day.get(day, []):
-            return True
-        if schedule[class_id][day].get(h) is not None:
-            return True  # Ders varsa çakışma var
+    # Kapalı ya da dolu bir saat varsa çakışma var
+    if not mask_fits(
+        avail_mask(class_avail, class_id, day), block_mask(hour, block_size)
+    ):
+        return True
 
-    # Öğretmen aynı gün farklı sınıfta aynı saatte derse giremez.
-    for check_hour in range(1, len(open_hours_by_day.get(day, {})) + 1):
-        if (
-            check_hour in schedule[class_id][day]
-            and schedule[class_id][day][check_hour] is not None
-        ):
-            if (
-                schedule[class_id][day][check_hour].get("teacher_id") == teacher_id
-                and schedule[class_id][day][check_hour].get("block_id") != block_id
-            ):
-                return True
+    # Aynı öğretmenin bu sınıftaki dersine bitişik yerleşemez
+    if adjacent_teacher_lessons(
+        schedule,
+        class_id,
+        teacher_id,
+        block_size,
+        open_hours_by_day,
+        day,
+        hour,
+        block_id,
+    ):
+        return True
+
+    # Aynı öğretmen, aynı gün, aynı sınıfa aynı dersten bir daha yerleşememeli.
+    course_info = block_index.get(block_id)
+    if course_info is not None and block_index.has_daily_course(
+        class_id, day, teacher_id, course_info["course_id"], block_id
+    ):
+        return True
     return False
 
 
@@ -1761,6 +4510,7 @@ def find_conflicting_blocks(
     hour,
     course_block_list,
     block_id,
+    block_index,
 ):
     """
     Belirtilen ders bloğunun çakıştığı ders bloklarını tespit eder.
@@ -1774,18 +4524,32 @@ def find_conflicting_blocks(
         if lesson_info and lesson_info.get("block_id") != block_id:
             conflicting_blocks.append(lesson_info)
 
-    # Öğretmen aynı gün farklı sınıfta aynı saatte derse giremez.
-    for check_hour in range(1, len(open_hours_by_day.get(day, {})) + 1):
+    # Bitişik saatlerdeki aynı öğretmen dersleri de çıkarılır
+    for lesson_info in adjacent_teacher_lessons(
+        schedule,
+        class_id,
+        teacher_id,
+        block_size,
+        open_hours_by_day,
+        day,
+        hour,
+        block_id,
+    ):
+        if lesson_info not in conflicting_blocks:
+            conflicting_blocks.append(lesson_info)
+
+    # Aynı öğretmen, aynı gün, aynı sınıfa aynı dersten bir daha yerleşememeli.
+    # Günün hücreleri, açık saatler 1'den başlamasa da eksiksiz dolaşılır.
+    course_id = (block_index.get(block_id) or {}).get("course_id")
+    for lesson_info in schedule[class_id][day].values():
         if (
-            check_hour in schedule[class_id][day]
-            and schedule[class_id][day][check_hour] is not None
+            lesson_info is not None
+            and lesson_info.get("teacher_id") == teacher_id
+            and lesson_info.get("course_id") == course_id
+            and lesson_info.get("block_id") != block_id
+            and lesson_info not in conflicting_blocks
         ):
-            if (
-                schedule[class_id][day][check_hour].get("teacher_id") == teacher_id
-                and schedule[class_id][day][check_hour].get("block_id") != block_id
-            ):
-                if schedule[class_id][day][check_hour] not in conflicting_blocks:
-                    conflicting_blocks.append(schedule[class_id][day][check_hour])
+            conflicting_blocks.append(lesson_info)
 
     return conflicting_blocks
 
@@ -1798,64 +4562,582 @@ def remove_and_unplace_blocks(
     class_id,
     day,
     hour,
+    teacher_avail,
+    class_avail,
+    block_index,
+    teacher_queue=None,
 ):
     """
     Çakışan ders bloklarını programdan kaldırır ve unplaced_assignments listesine ekler.
     """
-    print("burada", class_id, hour, day)
-    removed_blocks = []
     for conflicting_block in conflicting_blocks:
         if conflicting_block and conflicting_block.get("block_id"):
-            block_id = conflicting_block["block_id"]
-            for class_id_schedule, days_data in schedule.items():
-                for day_schedule, hours in days_data.items():
-                    for hour_schedule, lesson_info in hours.items():
-                        if lesson_info and lesson_info.get("block_id") == block_id:
-                            # Schedule'dan kaldır
-                            remove_lesson(
-                                schedule, class_id_schedule, day_schedule, hour_schedule
-                            )
-                            # Unplaced assignment'a ekle
-                            for class_id_course, courses in course_block_list.items():
-                                for course_info in courses:
-                                    if course_info["block_id"] == block_id:
-                                        if course_info not in removed_blocks:
-                                            unplaced_assignments.append(
-                                                {
-                                                    "block_id": course_info["block_id"],
-                                                    "course_id": course_info[
-                                                        "course_id"
-                                                    ],
-                                                    "teacher_id": course_info[
-                                                        "teacher_id"
-                                                    ],
-                                                    "class_id": course_info["class_id"],
-                                                    "course_name": course_info[
-                                                        "course_name"
-                                                    ],
-                                                    "class_name": course_info[
-                                                        "class_name"
-                                                    ],
-                                                    "teacher_name": course_info[
-                                                        "teacher_name"
-                                                    ],
-                                                    "weekly_hours": course_info[
-                                                        "weekly_hours"
-                                                    ],
-                                                    "placed_hours": 0,
-                                                }
-                                            )
-                                            removed_blocks.append(course_info)
-    # Programdan çıkarılan yerlerin yerleşmiş statüsünü sıfırla
-    for class_id_course, courses in course_block_list.items():
-        for course_info in courses:
-            for removed_course in removed_blocks:
-                if course_info["block_id"] == removed_course["block_id"]:
-                    course_info["placed"] = False
-    unplaced_assignments = create_unplaced_assignments(course_block_list)
+            # Bloğu programdan kaldır ve unplaced assignment'a ekle
+            course_info = unplace_course_block(
+                schedule,
+                conflicting_block["block_id"],
+                teacher_avail,
+                class_avail,
+                block_index,
+                teacher_queue,
+            )
+            if course_info is not None:
+                unplaced_assignments.append(unplaced_assignment_entry(course_info))
     return schedule, unplaced_assignments, course_block_list
 
 
+# Geri izlemeli (backtracking) çözücü
+def legal_block_hours(
+    schedule,
+    course_info,
+    day,
+    hours,
+    open_hours_by_day,
+    teacher_avail,
+    class_avail,
+    course_block_list,
+    block_index,
+):
+    """Bloğun verilen gündeki saatlerden hangilerine yerleşebileceğini döndürür."""
+    return [
+        hour
+        for hour in hours
+        if is_valid_placement(
+            schedule,
+            course_info["block_id"],
+            course_info["class_id"],
+            course_info["teacher_id"],
+            course_info["weekly_hours"],
+            open_hours_by_day,
+            teacher_avail,
+            class_avail,
+            course_block_list,
+            day,
+            hour,
+            block_index,
+        )
+    ]
+
+
+def solve_backtracking(
+    schedule,
+    teacher_avail,
+    class_avail,
+    open_hours_by_day,
+    course_block_list,
+    block_index,
+    node_limit=200000,
+    time_limit=30,
+    incumbent=None,
+    progress=None,
+):
+    """
+    Kısıt yaymalı geri izleme ile programı arar.
+
+    Her adımda en az yasal zaman dilimi kalan blok seçilir (MRV). Yerleştirme
+    sonrası aynı sınıfın ve aynı öğretmenin bekleyen bloklarının o günkü
+    seçenekleri daraltılır (forward checking). Yeri kalmayan bir blok boş
+    bırakılabilir; arama, en az yerleşmemiş saatli programı arar ve daha iyi
+    sonuç veremeyecek dalları budar. Düğüm veya süre sınırına ulaşılınca
+    bulunan en iyi program uygulanır.
+
+    incumbent verilirse (block_id -> (gün, saat)) arama yalnızca ondan daha
+    az saat boş bırakan programları kabul eder; bulunamazsa o uygulanır.
+    """
+    deadline = time.monotonic() + time_limit
+    pending = [
+        course_info
+        for courses in course_block_list.values()
+        for course_info in courses
+        if not course_info["placed"]
+    ]
+    blocks = {course_info["block_id"]: course_info for course_info in pending}
+    blocks_by_class = defaultdict(list)
+    blocks_by_teacher = defaultdict(list)
+    for course_info in pending:
+        blocks_by_class[course_info["class_id"]].append(course_info["block_id"])
+        blocks_by_teacher[course_info["teacher_id"]].append(course_info["block_id"])
+
+    # Her bloğun gün gün yasal başlangıç saatleri
+    domains = {}
+    domain_sizes = {}
+    for block_id, course_info in blocks.items():
+        domains[block_id] = {
+            day: legal_block_hours(
+                schedule,
+                course_info,
+                day,
+                hours,
+                open_hours_by_day,
+                teacher_avail,
+                class_avail,
+                course_block_list,
+                block_index,
+            )
+            for day, hours in open_hours_by_day.items()
+        }
+        domain_sizes[block_id] = sum(len(hours) for hours in domains[block_id].values())
+
+    unassigned = set(blocks)
+    # Seçeneği kalmamış bekleyen blokların toplam saati (alt sınır için)
+    empty_hours = sum(
+        blocks[block_id]["weekly_hours"]
+        for block_id in unassigned
+        if domain_sizes[block_id] == 0
+    )
+    skipped_hours = 0
+    total_hours = sum(course_info["weekly_hours"] for course_info in pending)
+    best_skipped_hours = total_hours + 1
+    best_placement = {}
+    if incumbent is not None:
+        best_placement = {
+            block_id: value
+            for block_id, value in incumbent.items()
+            if block_id in blocks
+        }
+        best_skipped_hours = total_hours - sum(
+            blocks[block_id]["weekly_hours"] for block_id in best_placement
+        )
+    placement = {}
+    nodes = 0
+
+    def select_block():
+        # MRV: en az seçeneği olan, eşitlikte en uzun blok
+        return min(
+            unassigned,
+            key=lambda block_id: (
+                domain_sizes[block_id],
+                -blocks[block_id]["weekly_hours"],
+                block_id,
+            ),
+        )
+
+    def push(block_id):
+        nonlocal empty_hours
+        unassigned.discard(block_id)
+        if domain_sizes[block_id] == 0:
+            empty_hours -= blocks[block_id]["weekly_hours"]
+        values = [
+            (day, hour) for day, hours in domains[block_id].items() for hour in hours
+        ]
+        values.append(None)  # Son seçenek: bloğu boş bırak
+        stack.append([block_id, values, 0, None])
+
+    def apply_value(block_id, value):
+        """Değeri uygular; geri almak için iz kaydını döndürür."""
+        nonlocal empty_hours, skipped_hours
+        course_info = blocks[block_id]
+        if value is None:
+            skipped_hours += course_info["weekly_hours"]
+            return ("skip", None)
+        day, hour = value
+        place_course_block(
+            schedule,
+            course_info,
+            day,
+            hour,
+            course_block_list,
+            teacher_avail,
+            class_avail,
+            block_index,
+        )
+        placement[block_id] = value
+        # Forward checking: yalnızca etkilenen blokların o günkü seçenekleri
+        trail = []
+        neighbours = set(blocks_by_class[course_info["class_id"]])
+        neighbours.update(blocks_by_teacher[course_info["teacher_id"]])
+        for other_id in neighbours:
+            if other_id not in unassigned or not domains[other_id][day]:
+                continue
+            old_hours = domains[other_id][day]
+            new_hours = legal_block_hours(
+                schedule,
+                blocks[other_id],
+                day,
+                old_hours,
+                open_hours_by_day,
+                teacher_avail,
+                class_avail,
+                course_block_list,
+                block_index,
+            )
+            if len(new_hours) != len(old_hours):
+                trail.append((other_id, day, old_hours))
+                domains[other_id][day] = new_hours
+                domain_sizes[other_id] -= len(old_hours) - len(new_hours)
+                if domain_sizes[other_id] == 0:
+                    empty_hours += blocks[other_id]["weekly_hours"]
+        return ("place", trail)
+
+    def undo_value(block_id, applied):
+        nonlocal empty_hours, skipped_hours
+        kind, trail = applied
+        if kind == "skip":
+            skipped_hours -= blocks[block_id]["weekly_hours"]
+            return
+        for other_id, day, old_hours in reversed(trail):
+            if domain_sizes[other_id] == 0:
+                empty_hours -= blocks[other_id]["weekly_hours"]
+            domain_sizes[other_id] += len(old_hours) - len(domains[other_id][day])
+            domains[other_id][day] = old_hours
+        unplace_course_block(
+            schedule, block_id, teacher_avail, class_avail, block_index
+        )
+        del placement[block_id]
+
+    stack = []
+    if unassigned:
+        push(select_block())
+    while stack:
+        if nodes >= node_limit or time.monotonic() > deadline:
+            break
+        frame = stack[-1]
+        block_id, values, next_index, applied = frame
+        if applied is not None:
+            undo_value(block_id, applied)
+            frame[3] = None
+        if next_index >= len(values):
+            stack.pop()
+            unassigned.add(block_id)
+            if domain_sizes[block_id] == 0:
+                empty_hours += blocks[block_id]["weekly_hours"]
+            continue
+        frame[2] += 1
+        value = values[next_index]
+        nodes += 1
+        if progress and nodes % 256 == 0:
+            progress("arama", min(best_skipped_hours, total_hours))
+        if (
+            value is None
+            and skipped_hours + blocks[block_id]["weekly_hours"] + empty_hours
+            >= best_skipped_hours
+        ):
+            continue
+        frame[3] = apply_value(block_id, value)
+        # Alt sınır: bu daldan en iyi sonuçtan daha iyisi çıkamıyorsa buda
+        if skipped_hours + empty_hours >= best_skipped_hours:
+            continue
+        if not unassigned:
+            best_skipped_hours = skipped_hours
+            best_placement = dict(placement)
+            if skipped_hours == 0:
+                break
+            continue
+        push(select_block())
+
+    # Arama durumunu geri sar ve en iyi programı uygula
+    for block_id, _, _, applied in reversed(stack):
+        if applied is not None:
+            undo_value(block_id, applied)
+    for block_id, (day, hour) in best_placement.items():
+        place_course_block(
+            schedule,
+            blocks[block_id],
+            day,
+            hour,
+            course_block_list,
+            teacher_avail,
+            class_avail,
+            block_index,
+        )
+    return schedule, course_block_list
+
+
+# Genetik algoritma çözücüsü
+# Bir birey, bekleyen blokların sırasıyla hizalanmış genlerden oluşur. Her gen
+# (gün sırası, başlangıç saati) ya da yerleşmemiş blok için None'dır.
+GA_VIOLATION_WEIGHT = 10
+
+_genetic_problem = None
+
+
+def build_genetic_problem(blocks, teacher_avail, class_avail, days, candidates):
+    """Uygunluk hesabı için süreçlere gönderilecek sade problem verisi."""
+    return {
+        "candidates": candidates,
+        "blocks": [
+            (
+                course_info["class_id"],
+                course_info["teacher_id"],
+                course_info["course_id"],
+                course_info["weekly_hours"],
+            )
+            for course_info in blocks
+        ],
+        "teacher_avail": {
+            teacher_id: [avail_mask(teacher_avail, teacher_id, day) for day in days]
+            for teacher_id in {course_info["teacher_id"] for course_info in blocks}
+        },
+        "class_avail": {
+            class_id: [avail_mask(class_avail, class_id, day) for day in days]
+            for class_id in {course_info["class_id"] for course_info in blocks}
+        },
+    }
+
+
+def init_genetic_worker(problem):
+    global _genetic_problem
+    _genetic_problem = problem
+
+
+def evaluate_timetable(genes, problem=None):
+    """
+    Bireyi sırayla çözümleyip onarır ve (uygunluk, onarılmış genler) döndürür.
+
+    Kısıtlardan birini ihlal eden gen, bloğun aday zamanlarından çakışmasız
+    ilkine taşınır; hiçbiri uymazsa blok yerleşmemiş sayılır. Uygunluk (küçük
+    olan iyi), onarım sonrası yerleşmemiş saatler ile GA_VIOLATION_WEIGHT
+    ağırlıklı ihlal sayısının toplamıdır.
+    """
+    problem = problem or _genetic_problem
+    teacher_avail = problem["teacher_avail"]
+    class_avail = problem["class_avail"]
+    class_used = defaultdict(int)
+    teacher_used = defaultdict(int)
+    teacher_in_class = defaultdict(int)
+    daily_courses = set()
+
+    def fits(class_id, teacher_id, course_id, block_size, day, hour):
+        block = block_mask(hour, block_size)
+        return (
+            mask_fits(class_avail[class_id][day] & ~class_used[(class_id, day)], block)
+            and mask_fits(
+                teacher_avail[teacher_id][day] & ~teacher_used[(teacher_id, day)],
+                block,
+            )
+            # Aynı öğretmen aynı sınıfta bitişik saatlerde olmamalı
+            and not teacher_in_class[(class_id, teacher_id, day)]
+            & (block_mask(hour - 1, 1) | block_mask(hour + block_size, 1))
+            # Aynı öğretmen, aynı gün, aynı sınıfa aynı dersten bir daha yerleşememeli.
+            and (class_id, teacher_id, course_id, day) not in daily_courses
+        )
+
+    repaired = []
+    unplaced_hours = 0
+    violations = 0
+    for (class_id, teacher_id, course_id, block_size), gene, candidates in zip(
+        problem["blocks"], genes, problem["candidates"]
+    ):
+        if gene is not None and not fits(
+            class_id, teacher_id, course_id, block_size, *gene
+        ):
+            violations += 1
+            gene = next(
+                (
+                    candidate
+                    for candidate in candidates
+                    if fits(class_id, teacher_id, course_id, block_size, *candidate)
+                ),
+                None,
+            )
+        repaired.append(gene)
+        if gene is None:
+            unplaced_hours += block_size
+            continue
+        day, hour = gene
+        block = block_mask(hour, block_size)
+        class_used[(class_id, day)] |= block
+        teacher_used[(teacher_id, day)] |= block
+        teacher_in_class[(class_id, teacher_id, day)] |= block
+        daily_courses.add((class_id, teacher_id, course_id, day))
+    return unplaced_hours + GA_VIOLATION_WEIGHT * violations, repaired
+
+
+def solve_genetic(
+    schedule,
+    teacher_avail,
+    class_avail,
+    open_hours_by_day,
+    course_block_list,
+    block_index,
+    population_size=40,
+    generations=300,
+    time_limit=30,
+    workers=1,
+    seed=None,
+    progress=None,
+):
+    """
+    Popülasyon tabanlı genetik algoritma.
+
+    Başlangıç popülasyonu sezgisel çözümden ve onun mutasyonlarından oluşur.
+    Çaprazlama sınıf bazında yapılır (bir sınıfın tüm blokları aynı ebeveynden
+    gelir), mutasyon rastgele blokları öğretmenin ve okulun açık olduğu başka
+    bir zamana taşır. Uygunluk hesabı süreç havuzunda paralel yürütülür. En iyi
+    birey geçerli yerleştirmeler korunarak programa uygulanır.
+    """
+    deadline = time.monotonic() + time_limit
+    rng = random.Random(seed)
+    days = list(open_hours_by_day)
+    day_positions = {day: position for position, day in enumerate(days)}
+    blocks = [
+        course_info
+        for courses in course_block_list.values()
+        for course_info in courses
+        if not course_info["placed"]
+    ]
+    if not blocks:
+        return schedule, course_block_list
+
+    # Her blok için öğretmenin ve okulun açık olduğu başlangıç zamanları
+    candidates = []
+    for course_info in blocks:
+        block_candidates = []
+        for position, day in enumerate(days):
+            free = avail_mask(class_avail, course_info["class_id"], day) & avail_mask(
+                teacher_avail, course_info["teacher_id"], day
+            )
+            for hour in open_hours_by_day[day]:
+                if mask_fits(free, block_mask(hour, course_info["weekly_hours"])):
+                    block_candidates.append((position, hour))
+        candidates.append(block_candidates)
+    problem = build_genetic_problem(
+        blocks, teacher_avail, class_avail, days, candidates
+    )
+
+    positions_by_class = defaultdict(list)
+    for position, course_info in enumerate(blocks):
+        positions_by_class[course_info["class_id"]].append(position)
+
+    seed_placements = heuristic_placements(
+        schedule,
+        teacher_avail,
+        class_avail,
+        open_hours_by_day,
+        course_block_list,
+        time_limit=min(5, time_limit / 4),
+    )
+    seed_genes = [None] * len(blocks)
+    for position, course_info in enumerate(blocks):
+        placement = seed_placements.get(course_info["block_id"])
+        if placement is not None:
+            seed_genes[position] = (day_positions[placement[0]], placement[1])
+
+    def mutate(genes, count):
+        genes = list(genes)
+        for _ in range(count):
+            position = rng.randrange(len(genes))
+            if candidates[position]:
+                genes[position] = rng.choice(candidates[position])
+        return genes
+
+    def crossover(parent_a, parent_b):
+        child = list(parent_a)
+        for positions in positions_by_class.values():
+            if rng.random() < 0.5:
+                for position in positions:
+                    child[position] = parent_b[position]
+        return child
+
+    def tournament(population, scores, size=3):
+        # Küçük popülasyonlarda turnuva tüm bireylerle yapılır
+        size = min(size, len(population))
+        best = min(rng.sample(range(len(population)), size), key=scores.__getitem__)
+        return population[best]
+
+    mutation_count = max(1, len(blocks) // 50)
+    population = [seed_genes] + [
+        mutate(seed_genes, mutation_count) for _ in range(population_size - 1)
+    ]
+
+    with solver_process_pool(
+        max(1, workers), initializer=init_genetic_worker, initargs=(problem,)
+    ) as pool:
+
+        def evaluate(population):
+            # Onarılmış genler popülasyona geri yazılır
+            chunksize = max(1, len(population) // (max(1, workers) * 2))
+            results = list(
+                pool.map(evaluate_timetable, population, chunksize=chunksize)
+            )
+            population[:] = [genes for _, genes in results]
+            return [score for score, _ in results]
+
+        scores = evaluate(population)
+        best_score = min(scores)
+        best_genes = population[scores.index(best_score)]
+        generation = 0
+        for generation in range(generations):
+            if best_score == 0 or time.monotonic() > deadline:
+                break
+            if progress:
+                progress("genetik", best_score)
+            ranked = sorted(range(len(population)), key=scores.__getitem__)
+            # Elitizm: en iyi iki birey değişmeden aktarılır
+            children = [population[index] for index in ranked[:2]]
+            while len(children) < population_size:
+                child = crossover(
+                    tournament(population, scores), tournament(population, scores)
+                )
+                children.append(mutate(child, mutation_count))
+            population = children
+            scores = evaluate(population)
+            generation_best = min(scores)
+            if generation_best < best_score:
+                best_score = generation_best
+                best_genes = population[scores.index(generation_best)]
+
+    # En iyi bireyi geçerli yerleştirmeleri koruyarak uygula
+    for position, gene in enumerate(best_genes):
+        if gene is None:
+            continue
+        course_info = blocks[position]
+        day, hour = days[gene[0]], gene[1]
+        if is_valid_placement(
+            schedule,
+            course_info["block_id"],
+            course_info["class_id"],
+            course_info["teacher_id"],
+            course_info["weekly_hours"],
+            open_hours_by_day,
+            teacher_avail,
+            class_avail,
+            course_block_list,
+            day,
+            hour,
+            block_index,
+        ):
+            place_course_block(
+                schedule,
+                course_info,
+                day,
+                hour,
+                course_block_list,
+                teacher_avail,
+                class_avail,
+                block_index,
+            )
+
+    # Sezgisel başlangıçtan kötü sonuç dönmesin
+    placed_hours = sum(
+        course_info["weekly_hours"] for course_info in blocks if course_info["placed"]
+    )
+    seed_hours = sum(
+        course_info["weekly_hours"]
+        for course_info in blocks
+        if course_info["block_id"] in seed_placements
+    )
+    if placed_hours < seed_hours:
+        for block_id in list(block_index.placements()):
+            unplace_course_block(
+                schedule, block_id, teacher_avail, class_avail, block_index
+            )
+        for course_info in blocks:
+            placement = seed_placements.get(course_info["block_id"])
+            if placement is not None:
+                place_course_block(
+                    schedule,
+                    course_info,
+                    placement[0],
+                    placement[1],
+                    course_block_list,
+                    teacher_avail,
+                    class_avail,
+                    block_index,
+                )
+    return schedule, course_block_list
+
+
 # Giriş Sayfası
 @app.route("/login", methods=["GET", "POST"])
 def login():
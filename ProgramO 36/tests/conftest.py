@@ -0,0 +1,137 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Uygulama içe aktarılmadan önce geçici bir veritabanına yönlendirilir
+os.environ.setdefault(
+    "DATABASE_URL",
+    "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test_ders_dagitim.db"),
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+# Kullanıcı adları ve e-postalar testler arasında çakışmasın
+school_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    app_module.app.config["TESTING"] = True
+    with app_module.app.app_context():
+        app_module.db.drop_all()
+    app_module.init_database()
+    yield app_module.app
+    with app_module.app.app_context():
+        app_module.db.drop_all()
+
+
+@pytest.fixture
+def make_school(app):
+    """Verilen büyüklükte bir okul ve program kurar, kullanıcıyı döndürür."""
+    m = app_module
+
+    def make_school(class_count, teacher_count=3, days=("pazartesi", "salı")):
+        number = next(school_numbers)
+        user = m.User(
+            username=f"okul{number}_{class_count}",
+            password="x",
+            email=f"okul{number}_{class_count}@example.com",
+        )
+        m.db.session.add(user)
+        m.db.session.flush()
+        teachers = [
+            m.Teacher(name=f"Ad{i}", surname="Soyad", branch="Fen", user_id=user.id)
+            for i in range(teacher_count)
+        ]
+        classes = [
+            m.Class(class_name=f"{i + 1}A", user_id=user.id) for i in range(class_count)
+        ]
+        course = m.Course(
+            course_name="Fen",
+            short_name="FEN",
+            weekly_hours=2,
+            distribution_format="2",
+            user_id=user.id,
+        )
+        m.db.session.add_all(teachers + classes + [course])
+        m.db.session.flush()
+        for day in days:
+            for hour in range(1, 7):
+                m.db.session.add(
+                    m.Schedule(day=day, hour=hour, is_open=True, user_id=user.id)
+                )
+        for index, class_ in enumerate(classes):
+            for day in days:
+                m.db.session.add(
+                    m.CourseSchedule(
+                        day=day,
+                        hour=index % 6 + 1,
+                        course_id=course.id,
+                        teacher_id=teachers[index % teacher_count].id,
+                        class_id=class_.id,
+                        user_id=user.id,
+                    )
+                )
+        m.db.session.commit()
+        return user
+
+    with app.app_context():
+        yield make_school
+
+
+@pytest.fixture
+def make_assigned_school(make_school):
+    """
+    Çözücüye verilebilecek bir okul: her sınıfa iki ders atanır ve
+    öğretmenler okulun açık saatlerinde müsaittir.
+    """
+    m = app_module
+
+    def make_assigned_school(class_count, teacher_count=3, days=("pazartesi", "salı")):
+        user = make_school(class_count, teacher_count, days)
+        teachers = m.Teacher.query.filter_by(user_id=user.id).all()
+        classes = m.Class.query.filter_by(user_id=user.id).all()
+        courses = [m.Course.query.filter_by(user_id=user.id).first()]
+        courses.append(
+            m.Course(
+                course_name="Tarih",
+                short_name="TAR",
+                weekly_hours=3,
+                distribution_format="2+1",
+                user_id=user.id,
+            )
+        )
+        m.db.session.add(courses[1])
+        m.db.session.flush()
+        for index, class_ in enumerate(classes):
+            for offset, course in enumerate(courses):
+                m.db.session.add(
+                    m.TeacherCourseAssignment(
+                        course_id=course.id,
+                        teacher_id=teachers[(index + offset) % teacher_count].id,
+                        class_id=class_.id,
+                        user_id=user.id,
+                    )
+                )
+        m.copy_school_schedule_to_teachers(
+            user.id, [teacher.id for teacher in teachers]
+        )
+        m.invalidate_availability(user.id)
+        m.db.session.commit()
+        return user
+
+    return make_assigned_school
+
+
+@pytest.fixture
+def login(app):
+    def login(client, user):
+        with client.session_transaction() as session:
+            session["username"] = user.username
+            session["user_id"] = user.id
+
+    return login
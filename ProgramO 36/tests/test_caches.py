@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import app as m
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_from_other_process(user_id, counter, statement, **params):
+    """Başka bir süreçteki yazmayı taklit eder: bu sürecin önbelleğine dokunmaz."""
+    m.db.session.execute(m.db.text(statement), dict(params, user_id=user_id))
+    m.bump_schedule_version(user_id, counter)
+    m.db.session.commit()
+
+
+def test_availability_cache_sees_writes_of_other_processes(make_school):
+    user = make_school(2)
+    _, class_avail, _ = m.cached_availability(user.id)
+    assert len(class_avail) == 2
+
+    write_from_other_process(
+        user.id,
+        "availability_version",
+        "INSERT INTO class (class_name, user_id) VALUES ('9Z', :user_id)",
+    )
+
+    _, class_avail, _ = m.cached_availability(user.id)
+    assert len(class_avail) == 3
+
+
+def test_schedule_view_sees_renames_of_other_processes(make_school, login, app):
+    user = make_school(2)
+    client = app.test_client()
+    login(client, user)
+    first = client.get("/schedules")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert client.get("/schedules", headers={"If-None-Match": etag}).status_code == 304
+
+    write_from_other_process(
+        user.id,
+        "view_version",
+        "UPDATE teacher SET name = 'Yeniad' WHERE user_id = :user_id",
+    )
+
+    second = client.get("/schedules", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != etag
+    assert "Yeniad" in second.get_data(as_text=True)
+
+
+def test_schedule_view_etag_is_the_same_in_every_process(make_school, login, app):
+    user = make_school(2)
+    client = app.test_client()
+    login(client, user)
+    etag = client.get("/schedules").headers["ETag"]
+
+    # Aynı sayfa başka bir sunucu sürecinde aynı ETag'i almalı
+    script = (
+        "import app\n"
+        "client = app.app.test_client()\n"
+        "with client.session_transaction() as session:\n"
+        f"    session['username'] = {user.username!r}\n"
+        f"    session['user_id'] = {user.id}\n"
+        "print(client.get('/schedules').headers['ETag'])\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=APP_DIR,
+        env=os.environ,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    assert output.splitlines()[-1] == etag
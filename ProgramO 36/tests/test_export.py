@@ -0,0 +1,97 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+
+import app as m
+
+XLSX_NS = {"x": m.XLSX_MAIN_NS}
+
+
+@pytest.fixture
+def client(make_school, login, app):
+    client = app.test_client()
+    client.user = make_school(3)
+    login(client, client.user)
+    return client
+
+
+def expected_grids(user_id, view):
+    """Veritabanındaki hücrelerden {başlık: {(gün, saat sütunu): ders}}."""
+    grids = {}
+    for cell in m.CourseSchedule.query.filter_by(user_id=user_id):
+        teacher = f"{cell.teacher.name} {cell.teacher.surname}"
+        if view == "classes":
+            title, value = cell.class_.class_name, teacher
+        else:
+            title, value = teacher, cell.class_.class_name
+        grids.setdefault(title, {})[
+            (cell.day.title(), f"{cell.hour}. Saat")
+        ] = f"{value} - {cell.course.course_name}"
+    return grids
+
+
+def read_table(rows):
+    """Gün x saat tablosunun dolu hücrelerini {(gün, saat sütunu): ders} yapar."""
+    header, *days = rows
+    return {
+        (row[0], hour): value
+        for row in days
+        for hour, value in zip(header[1:], row[1:])
+        if value
+    }
+
+
+def read_csv_grids(data):
+    grids = {}
+    rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    while rows:
+        end = rows.index([])
+        title, *table = rows[:end]
+        grids[title[0]] = read_table(table)
+        rows = rows[end + 1 :]
+    return grids
+
+
+@pytest.mark.parametrize("view", m.EXPORT_VIEWS)
+def test_csv_export_round_trips(client, view):
+    response = client.get(f"/schedule-export/{view}.csv")
+    assert response.status_code == 200
+    assert read_csv_grids(response.data) == expected_grids(client.user.id, view)
+
+
+@pytest.mark.parametrize("view", m.EXPORT_VIEWS)
+def test_xlsx_export_round_trips(client, view):
+    response = client.get(f"/schedule-export/{view}.xlsx")
+    assert response.status_code == 200
+    grids = {}
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.testzip() is None
+        workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+        sheets = workbook.findall("x:sheets/x:sheet", XLSX_NS)
+        for number, sheet in enumerate(sheets, start=1):
+            worksheet = ElementTree.fromstring(
+                archive.read(f"xl/worksheets/sheet{number}.xml")
+            )
+            rows = [
+                [cell.findtext("x:is/x:t", "", XLSX_NS) for cell in row]
+                for row in worksheet.iterfind("x:sheetData/x:row", XLSX_NS)
+            ]
+            grids[sheet.get("name")] = read_table(rows)
+    assert grids == expected_grids(client.user.id, view)
+
+
+def test_school_zip_export_round_trips(client):
+    response = client.get("/schedule-export/school.zip")
+    assert response.status_code == 200
+    grids = {"classes": {}, "teachers": {}}
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.testzip() is None
+        for name in archive.namelist():
+            folder = name.split("/")[0]
+            view = {"siniflar": "classes", "ogretmenler": "teachers"}[folder]
+            grids[view].update(read_csv_grids(archive.read(name)))
+    for view in m.EXPORT_VIEWS:
+        assert grids[view] == expected_grids(client.user.id, view)
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+
+def post_import(client, body, content_type="application/json"):
+    return client.post("/toplu-ice-aktar", data=body, content_type=content_type)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"5",
+        b'"metin"',
+        b'{"sinif": 5}',
+    ],
+)
+def test_import_rejects_malformed_json_shape(make_school, login, app, body):
+    client = app.test_client()
+    login(client, make_school(1))
+    response = post_import(client, body)
+    assert response.status_code == 422
+    assert response.get_json()["errors"][0]["satir"] is None
+
+
+@pytest.mark.parametrize(
+    "body, content_type",
+    [
+        (b"[1, 2]", "application/json"),
+        (b'{"sinif": [1, {"sinif_adi": "7A"}]}', "application/json"),
+        (b'[{"tur": "sinif", "sinif_adi": ["7A"]}]', "application/json"),
+        (b'[{"tur": "sinif", "sinif_adi": true}]', "application/json"),
+        (b'[1]\n{"tur": "sinif", "sinif_adi": "7A"}\n', "application/x-ndjson"),
+        (b"tur,sinif_adi\nsinif,7A,fazla\n", "text/csv"),
+    ],
+)
+def test_import_reports_invalid_records_as_row_errors(
+    make_school, login, app, body, content_type
+):
+    client = app.test_client()
+    login(client, make_school(1))
+    response = post_import(client, body, content_type)
+    assert response.status_code == 422
+    errors = response.get_json()["errors"]
+    assert errors and all(error["satir"] for error in errors)
+
+
+def test_import_accepts_numbers_as_field_values(make_school, login, app):
+    client = app.test_client()
+    login(client, make_school(1))
+    response = post_import(client, b'[{"tur": "sinif", "sinif_adi": 10}]')
+    assert response.status_code == 200
+    assert response.get_json()["created"]["sinif"] == 1
+
+
+@pytest.mark.parametrize(
+    "records, message",
+    [
+        (
+            [
+                {
+                    "tur": "ogretmen",
+                    "ad": "Ali",
+                    "soyad": "Veli",
+                    "brans": "Fen",
+                    "email": "ali@example.com",
+                },
+                {
+                    "tur": "ogretmen",
+                    "ad": "Ali",
+                    "soyad": "Kaya",
+                    "brans": "Fen",
+                    "email": "ali@example.com",
+                },
+            ],
+            "Ali Kaya dosyada 1. satırda da geçiyor.",
+        ),
+        (
+            [
+                {
+                    "tur": "ogretmen",
+                    "ad": "Ali",
+                    "soyad": "Veli",
+                    "brans": "Fen",
+                    "email": "ali@example.com",
+                },
+                {
+                    "tur": "ders",
+                    "ders_adi": "Tarih",
+                    "ders_kisa_adi": "TAR",
+                    "haftalik_ders_sayisi": "2",
+                    "yerlestirme_bicimi": "2",
+                },
+                {
+                    "tur": "atama",
+                    "ogretmen": "Ali Veli",
+                    "sinif": "1A",
+                    "ders": "Tarih",
+                },
+                {
+                    "tur": "atama",
+                    "ogretmen": "ali@example.com",
+                    "sinif": "1a",
+                    "ders": "TAR",
+                },
+            ],
+            "Bu atama dosyada 3. satırda da geçiyor.",
+        ),
+        (
+            [
+                {"tur": "atama", "ogretmen": "Ad0 Soyad", "sinif": "1A", "ders": "Fen"},
+                {"tur": "atama", "ogretmen": "ad0 soyad", "sinif": "1A", "ders": "FEN"},
+            ],
+            "Bu atama dosyada 1. satırda da geçiyor.",
+        ),
+    ],
+)
+def test_import_reports_rows_naming_the_same_record(
+    make_school, login, app, records, message
+):
+    client = app.test_client()
+    login(client, make_school(1))
+    response = post_import(client, json.dumps(records))
+    assert response.status_code == 422
+    assert response.get_json()["errors"] == [
+        {"satir": len(records), "tur": records[-1]["tur"], "hata": message}
+    ]
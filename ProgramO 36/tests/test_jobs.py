@@ -0,0 +1,97 @@
+import json
+import time
+
+import pytest
+
+import app as m
+
+
+@pytest.fixture
+def client(make_assigned_school, login, app, monkeypatch):
+    monkeypatch.setitem(app.config, "SOLVER_TIME_LIMIT", 1)
+    client = app.test_client()
+    client.user = make_assigned_school(2)
+    login(client, client.user)
+    return client
+
+
+def submit(client, **form):
+    return client.post(
+        "/create_schedule_genetic", data=form, headers={"Accept": "application/json"}
+    )
+
+
+def wait_for_job(client, status_url):
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        # İş başka bir iş parçacığında yazıyor; testin oturumundaki kayıtlar eskir
+        m.db.session.expire_all()
+        job = client.get(status_url).get_json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"İş bitmedi: {job}")
+
+
+@pytest.mark.parametrize("time_limit", ["nan", "inf", "-inf", "-1", "0", "yarım"])
+def test_invalid_time_limits_are_rejected(client, time_limit):
+    response = submit(client, engine="heuristic", time_limit=time_limit)
+    assert response.status_code == 400
+    assert m.SolverJob.query.filter_by(user_id=client.user.id).count() == 0
+
+
+def test_time_limit_is_clamped_and_job_status_is_reported(client):
+    response = submit(client, engine="heuristic", time_limit="1e9")
+    assert response.status_code == 202
+    body = response.get_json()
+    job = m.db.session.get(m.SolverJob, body["job_id"])
+    assert job.time_limit == 1
+
+    # Süren iş varken yeni istek aynı işi döndürür
+    assert submit(client, engine="heuristic").get_json()["job_id"] == body["job_id"]
+
+    result = wait_for_job(client, body["status_url"])
+    assert result["status"] == "done"
+    assert result["unplaced_hours"] == 0
+    assert result["result_url"] == "/schedules"
+    assert result["snapshot_version"] == m.get_snapshot(client.user.id).version
+
+
+def test_job_status_is_private(client, make_school, login, app):
+    job_id = submit(client, engine="heuristic").get_json()["job_id"]
+    wait_for_job(client, f"/schedule-jobs/{job_id}")
+
+    stranger = app.test_client()
+    login(stranger, make_school(1))
+    assert stranger.get(f"/schedule-jobs/{job_id}").status_code == 404
+    assert stranger.get(f"/schedule-jobs/{job_id}/events").status_code == 404
+
+
+def read_events(response):
+    events = []
+    for chunk in response.get_data(as_text=True).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in chunk.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_event_stream_reports_progress_until_done(client):
+    body = submit(client, engine="heuristic").get_json()
+    response = client.get(body["events_url"])
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    # Akış iş bitince kendiliğinden kapanır; son olay sonucu taşır
+    events = read_events(response)
+    assert [name for name, _ in events[:-1]] == ["progress"] * (len(events) - 1)
+    name, state = events[-1]
+    assert name == "done"
+    assert state["job_id"] == body["job_id"]
+    assert state["result_url"] == "/schedules"
+
+
+def test_event_stream_of_a_finished_job_closes_at_once(client):
+    body = submit(client, engine="heuristic").get_json()
+    wait_for_job(client, body["status_url"])
+    assert [name for name, _ in read_events(client.get(body["events_url"]))] == ["done"]
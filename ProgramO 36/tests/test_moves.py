@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+import app as m
+
+
+@pytest.fixture
+def school(make_school, app):
+    """Tek sınıflı okul: iki farklı öğretmenin dersi pazartesi 1. ve 3. saatte."""
+    user = make_school(1, days=("pazartesi",))
+    teachers = m.Teacher.query.filter_by(user_id=user.id).all()
+    class_ = m.Class.query.filter_by(user_id=user.id).first()
+    course = m.Course.query.filter_by(user_id=user.id).first()
+    m.db.session.add(
+        m.CourseSchedule(
+            day="pazartesi",
+            hour=3,
+            course_id=course.id,
+            teacher_id=teachers[1].id,
+            class_id=class_.id,
+            user_id=user.id,
+        )
+    )
+    m.copy_school_schedule_to_teachers(user.id, [teacher.id for teacher in teachers])
+    m.invalidate_availability(user.id)
+    m.db.session.commit()
+    user.block_ids = [
+        row_id
+        for (row_id,) in m.db.session.query(m.CourseSchedule.id)
+        .filter_by(user_id=user.id)
+        .order_by(m.CourseSchedule.hour)
+    ]
+    return user
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [1],
+        {"block_id": "1", "day": "pazartesi", "hour": 5},
+        {"block_id": True, "day": "pazartesi", "hour": 5},
+        {"block_id": 1, "day": ["pazartesi"], "hour": 5},
+        {"block_id": 1, "day": "pazartesi", "hour": True},
+        {"block_id": 1, "day": "pazartesi", "hour": "5"},
+        {"block_id": 1, "swap_with": [2]},
+    ],
+)
+def test_move_rejects_invalid_input_types(school, login, app, body):
+    client = app.test_client()
+    login(client, school)
+    assert client.post("/schedule-moves", json=body).status_code == 400
+
+
+def test_concurrent_moves_are_checked_one_after_another(
+    school, login, app, monkeypatch
+):
+    # İlk taşıma denetimden sonra bekler; kilit yoksa ikincisi de aynı
+    # boş saati görür ve iki ders aynı saate yazılır
+    barrier = threading.Barrier(2)
+    check = m.check_lesson_moves
+
+    def slow_check(user_id, moves):
+        error = check(user_id, moves)
+        try:
+            barrier.wait(timeout=1)
+        except threading.BrokenBarrierError:
+            pass
+        return error
+
+    monkeypatch.setattr(m, "check_lesson_moves", slow_check)
+    statuses = []
+
+    def move(block_id):
+        client = app.test_client()
+        login(client, school)
+        response = client.post(
+            "/schedule-moves",
+            json={"block_id": block_id, "day": "pazartesi", "hour": 5},
+        )
+        statuses.append(response.status_code)
+
+    threads = [
+        threading.Thread(target=move, args=(block_id,)) for block_id in school.block_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200, 409]
+    hours = [
+        hour
+        for (hour,) in m.db.session.query(m.CourseSchedule.hour).filter_by(
+            user_id=school.id
+        )
+    ]
+    assert sorted(hours) in ([1, 5], [3, 5])
+
+
+def test_swap_with_a_block_of_another_class_is_rejected(make_school, login, app):
+    user = make_school(2, days=("pazartesi",))
+    cells = (
+        m.CourseSchedule.query.filter_by(user_id=user.id)
+        .order_by(m.CourseSchedule.hour)
+        .all()
+    )
+    before = [(cell.id, cell.class_id, cell.hour) for cell in cells]
+    assert before[0][1] != before[1][1]
+
+    client = app.test_client()
+    login(client, user)
+    response = client.post(
+        "/schedule-moves", json={"block_id": cells[0].id, "swap_with": cells[1].id}
+    )
+    assert response.status_code == 400
+    m.db.session.expire_all()
+    assert [(cell.id, cell.class_id, cell.hour) for cell in cells] == before
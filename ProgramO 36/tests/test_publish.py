@@ -0,0 +1,101 @@
+import threading
+
+import app as m
+
+
+def test_concurrent_publishes_get_distinct_versions(make_school, app):
+    user_id = make_school(1).id
+    barrier = threading.Barrier(6)
+    versions, errors = [], []
+
+    def publish():
+        with app.app_context():
+            try:
+                # Hepsi sürümü aynı anda okumaya çalışsın
+                barrier.wait()
+                versions.append(
+                    m.publish_schedule(
+                        user_id, [], [], engine="manual", save=False
+                    ).version
+                )
+            except Exception as error:
+                errors.append(error)
+            finally:
+                m.db.session.remove()
+
+    threads = [threading.Thread(target=publish) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(versions) == [1, 2, 3, 4, 5, 6]
+
+
+def school_cells(user_id, hour):
+    """Her sınıfın dersini pazartesi verilen saate koyan program hücreleri."""
+    return {
+        (class_id, "pazartesi", hour): (course_id, teacher_id)
+        for class_id, course_id, teacher_id in m.db.session.query(
+            m.CourseSchedule.class_id,
+            m.CourseSchedule.course_id,
+            m.CourseSchedule.teacher_id,
+        ).filter_by(user_id=user_id, day="pazartesi")
+    }
+
+
+def test_concurrent_restores_write_against_current_rows(make_school, app, monkeypatch):
+    user_id = make_school(3).id
+    m.publish_schedule(user_id, school_cells(user_id, 2), [])
+    m.publish_schedule(user_id, school_cells(user_id, 5), [])
+    m.publish_schedule(user_id, school_cells(user_id, 3), [])
+    # SQLite silinen en büyük rowid'leri yeniden verir; başka bir okulun
+    # satırları bu okulunkilerin üstünde kalsın ki yeni satırlar yeni id alsın
+    make_school(1)
+
+    # İlk geri yükleme farkını yazıp commit etmeden bekler; kilit yoksa
+    # ikincisi henüz değişmemiş satırları okuyup onlara göre fark yazar
+    barrier = threading.Barrier(2)
+    activate_snapshot = m.activate_snapshot
+
+    def slow_activate_snapshot(*args, **kwargs):
+        activate_snapshot(*args, **kwargs)
+        try:
+            barrier.wait(timeout=1)
+        except threading.BrokenBarrierError:
+            pass
+
+    monkeypatch.setattr(m, "activate_snapshot", slow_activate_snapshot)
+    errors = []
+
+    def restore(version):
+        with app.app_context():
+            try:
+                m.restore_snapshot(user_id, version)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                m.db.session.remove()
+
+    threads = [threading.Thread(target=restore, args=(v,)) for v in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    monkeypatch.undo()
+
+    assert errors == []
+    # Tablo, son yazan geri yüklemenin sürümüyle birebir aynı
+    m.db.session.expire_all()
+    active = m.unpack_cells(m.get_snapshot(user_id).cells)
+    saved = m.db.session.query(
+        m.CourseSchedule.class_id,
+        m.CourseSchedule.day,
+        m.CourseSchedule.hour,
+        m.CourseSchedule.course_id,
+        m.CourseSchedule.teacher_id,
+    ).filter_by(user_id=user_id)
+    assert sorted(tuple(row) for row in saved) == sorted(
+        (*key, *value) for key, value in active.items()
+    )
@@ -0,0 +1,154 @@
+import pytest
+
+import app as m
+
+
+@pytest.fixture
+def client(make_school, login, app):
+    client = app.test_client()
+    client.user = make_school(1)
+    login(client, client.user)
+    return client
+
+
+def test_api_delete_rejects_boolean_ids(client):
+    class_ = m.Class(class_name="9Z", user_id=client.user.id)
+    m.db.session.add(class_)
+    m.db.session.commit()
+    response = client.post("/api/classes/batch", json={"delete": [True]})
+    assert response.status_code == 400
+    m.db.session.expire_all()
+    assert m.db.session.get(m.Class, class_.id) is not None
+
+
+def test_api_update_rejects_boolean_ids(client):
+    response = client.post(
+        "/api/classes/batch", json={"update": [{"id": True, "class_name": "8B"}]}
+    )
+    assert response.status_code == 422
+    assert response.get_json()["errors"][0]["hata"] == "Kayıt bulunamadı."
+
+
+@pytest.mark.parametrize(
+    "entity, record",
+    [
+        ("assignments", {"course_id": True, "teacher_id": True, "class_id": True}),
+        ("assignments", {"course_id": [1], "teacher_id": 1, "class_id": 1}),
+        ("teachers", {"name": ["Ali"], "surname": "Veli", "branch": "Fen"}),
+    ],
+)
+def test_api_create_rejects_invalid_field_types(client, entity, record):
+    response = client.post(f"/api/{entity}/batch", json={"create": [record]})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "url, form",
+    [
+        ("/ogretmen-ekle", {"ad": "Ali"}),
+        (
+            "/ogretmen-ekle",
+            {"ad": "Ali", "soyad": "Veli", "brans": "Fen", "email": "x"},
+        ),
+        ("/sinif-ekle", {"sinif_adi": "9-A"}),
+        ("/ders-ekle", {"ders_adi": "Fizik", "ders_kisa_adi": "FZK"}),
+        (
+            "/ders-ekle",
+            {
+                "ders_adi": "Fizik",
+                "ders_kisa_adi": "FZK",
+                "haftalik_ders_sayisi": "3",
+                "yerlestirme_bicimi": "2+2",
+            },
+        ),
+    ],
+)
+def test_forms_flash_validation_errors(client, url, form):
+    before = [
+        m.db.session.query(model).count() for model in (m.Teacher, m.Class, m.Course)
+    ]
+    response = client.post(url, data=form)
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session["_flashes"][0][0] == "danger"
+    after = [
+        m.db.session.query(model).count() for model in (m.Teacher, m.Class, m.Course)
+    ]
+    assert after == before
+
+
+def test_edit_forms_use_the_same_rules(client):
+    teacher = m.Teacher.query.filter_by(user_id=client.user.id).first()
+    course = m.Course.query.filter_by(user_id=client.user.id).first()
+    response = client.post(
+        f"/ogretmen-duzenle/{teacher.id}",
+        data={"ad": " ayşe ", "soyad": "YILMAZ", "email": "", "brans": "fen"},
+    )
+    assert response.status_code == 302
+    response = client.post(
+        f"/ders-duzenle/{course.id}",
+        data={
+            "ders_adi": "Fizik",
+            "ders_kisa_adi": "FZK",
+            "haftalik_ders_sayisi": "iki",
+            "yerlestirme_bicimi": "2",
+        },
+    )
+    assert response.status_code == 302
+    m.db.session.expire_all()
+    assert (teacher.name, teacher.surname, teacher.email) == ("Ayşe", "Yilmaz", None)
+    assert course.weekly_hours == 2
+
+
+def school_state(user_id):
+    """Silme sonrası karşılaştırılacak kayıt sayıları ve dolu hücreler."""
+    counts = [
+        model.query.filter_by(user_id=user_id).count()
+        for model in (
+            m.Teacher,
+            m.Class,
+            m.Course,
+            m.TeacherCourseAssignment,
+            m.TeacherSchedule,
+        )
+    ]
+    cells = sorted(
+        (
+            cell.day,
+            cell.hour,
+            bool(cell.course_id),
+            bool(cell.teacher_id),
+            bool(cell.class_id),
+        )
+        for cell in m.CourseSchedule.query.filter_by(user_id=user_id)
+    )
+    return counts, cells
+
+
+@pytest.mark.parametrize(
+    "model, form_url, entity",
+    [
+        (m.Teacher, "/ogretmen-sil/{}", "teachers"),
+        (m.Class, "/sinif-sil/{}", "classes"),
+        (m.Course, "/ders-sil/{}", "courses"),
+        (m.TeacherCourseAssignment, "/ders-dagitimi-sil/{}", "assignments"),
+    ],
+)
+def test_form_and_api_deletes_leave_the_same_state(
+    make_assigned_school, login, app, model, form_url, entity
+):
+    states = []
+    for use_api in (False, True):
+        user = make_assigned_school(2)
+        client = app.test_client()
+        login(client, user)
+        record_id = model.query.filter_by(user_id=user.id).order_by(model.id).first().id
+        if use_api:
+            response = client.post(f"/api/{entity}/batch", json={"delete": [record_id]})
+            assert response.status_code == 200
+        else:
+            assert client.get(form_url.format(record_id)).status_code == 302
+        m.db.session.expire_all()
+        assert m.db.session.get(model, record_id) is None
+        states.append(school_state(user.id))
+    assert states[0] == states[1]
@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+import app as m
+
+# /schedules için sorgu bütçesi: sayfa boyutundan bağımsız, sabit sayıda sorgu
+SCHEDULES_QUERY_BUDGET = 5
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = m.db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def schedules_queries(app, login, user):
+    client = app.test_client()
+    login(client, user)
+    with count_queries() as statements:
+        response = client.get("/schedules")
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_schedules_page_stays_within_query_budget(app, make_school, login):
+    small = schedules_queries(app, login, make_school(class_count=2))
+    large = schedules_queries(app, login, make_school(class_count=12, teacher_count=8))
+
+    assert large <= SCHEDULES_QUERY_BUDGET
+    # Sınıf ve öğretmen sayısı arttıkça sorgu sayısı artmamalı (N+1 yok)
+    assert small == large
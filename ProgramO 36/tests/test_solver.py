@@ -0,0 +1,181 @@
+from types import SimpleNamespace
+
+import pytest
+
+import app as m
+
+OPEN_HOURS = {"pazartesi": [1, 2, 3, 4, 5]}
+
+
+def lesson_block(block_id, course_id, teacher_id=7, class_id=1, size=1):
+    return {
+        "block_id": block_id,
+        "course_id": course_id,
+        "course_name": f"Ders {course_id}",
+        "class_id": class_id,
+        "class_name": "5A",
+        "teacher_name": "Ali Veli",
+        "teacher_id": teacher_id,
+        "weekly_hours": size,
+        "placed": False,
+    }
+
+
+def setup_problem(*blocks):
+    schedule = m.initialize_schedule([SimpleNamespace(id=1)], OPEN_HOURS)
+    mask = m.hours_to_mask(OPEN_HOURS["pazartesi"])
+    teacher_avail = {7: {"pazartesi": mask}}
+    class_avail = {1: {"pazartesi": mask}}
+    course_block_list = {1: list(blocks)}
+    block_index = m.BlockIndex(course_block_list)
+    return schedule, teacher_avail, class_avail, course_block_list, block_index
+
+
+def teacher_hours(schedule, teacher_id=7):
+    return sorted(
+        hour
+        for hour, lesson in schedule[1]["pazartesi"].items()
+        if lesson and lesson["teacher_id"] == teacher_id
+    )
+
+
+def test_conflict_check_rejects_adjacent_lesson_of_same_teacher():
+    first, second = lesson_block(1, 10), lesson_block(2, 20)
+    schedule, teacher_avail, class_avail, blocks, index = setup_problem(first, second)
+    m.place_course_block(
+        schedule, first, "pazartesi", 1, blocks, teacher_avail, class_avail, index
+    )
+
+    args = (schedule, 2, 1, 7, 1, OPEN_HOURS, teacher_avail, class_avail, blocks)
+    assert not m.is_valid_placement(*args, "pazartesi", 2, index)
+    for hour, conflict in ((2, True), (3, False)):
+        assert (
+            m.check_block_conflict(
+                schedule,
+                1,
+                7,
+                1,
+                OPEN_HOURS,
+                "pazartesi",
+                hour,
+                blocks,
+                2,
+                class_avail,
+                index,
+            )
+            is conflict
+        )
+
+
+def test_swap_repair_never_places_same_teacher_back_to_back():
+    first, second = lesson_block(1, 10), lesson_block(2, 20)
+    schedule, teacher_avail, class_avail, blocks, index = setup_problem(first, second)
+    m.place_course_block(
+        schedule, first, "pazartesi", 1, blocks, teacher_avail, class_avail, index
+    )
+
+    m.try_swap_placement(
+        schedule, second, teacher_avail, class_avail, OPEN_HOURS, blocks, [], index
+    )
+
+    hours = teacher_hours(schedule)
+    assert all(later - earlier > 1 for earlier, later in zip(hours, hours[1:]))
+
+
+def test_workload_queue_keeps_class_order_up_to_date():
+    # 7: 5 saat müsait, 2 saat dersi (oran 2,5); 8: 3 saat müsait, 1 saat (oran 3)
+    first, second = lesson_block(1, 10), lesson_block(2, 20)
+    other = lesson_block(3, 30, teacher_id=8)
+    schedule, teacher_avail, class_avail, blocks, index = setup_problem(
+        first, second, other
+    )
+    teacher_avail[8] = {"pazartesi": m.hours_to_mask([1, 2, 3])}
+    queue = m.TeacherWorkloadQueue(teacher_avail, blocks)
+    assert [block["block_id"] for block in queue.blocks(1)] == [1, 2, 3]
+
+    # Yerleşen blok sıradan çıkar; 7'nin oranı 4'e çıkınca 8 öne geçer
+    m.place_course_block(
+        schedule,
+        first,
+        "pazartesi",
+        5,
+        blocks,
+        teacher_avail,
+        class_avail,
+        index,
+        queue,
+    )
+    assert [block["block_id"] for block in queue.blocks(1)] == [3, 2]
+
+    m.unplace_course_block(schedule, 1, teacher_avail, class_avail, index, queue)
+    assert [block["block_id"] for block in queue.blocks(1)] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("population_size", [1, 3])
+def test_genetic_solver_runs_with_small_populations(population_size):
+    # Öğretmen art arda derse giremediği için dört ders beş saate sığmaz;
+    # çözüm sıfır maliyete inmez ve kuşaklar turnuvayla üretilir
+    schedule, teacher_avail, class_avail, blocks, index = setup_problem(
+        *(lesson_block(block_id, block_id * 10) for block_id in range(1, 5))
+    )
+    schedule, blocks = m.solve_genetic(
+        schedule,
+        teacher_avail,
+        class_avail,
+        OPEN_HOURS,
+        blocks,
+        index,
+        population_size=population_size,
+        generations=3,
+        time_limit=10,
+        seed=1,
+    )
+
+    hours = teacher_hours(schedule)
+    assert len(hours) == sum(block["placed"] for block in blocks[1]) == 3
+    assert all(later - earlier > 1 for earlier, later in zip(hours, hours[1:]))
+
+
+@pytest.mark.parametrize(
+    "engine", ["heuristic", "multistart", "backtracking", "genetic"]
+)
+def test_engines_publish_valid_schedules(
+    make_assigned_school, app, monkeypatch, engine
+):
+    for key, value in {
+        "SOLVER_TIME_LIMIT": 2,
+        "SOLVER_IMPROVE_TIME_LIMIT": 1,
+        "SOLVER_STARTS": 2,
+        "GA_POPULATION_SIZE": 6,
+        "GA_GENERATIONS": 5,
+    }.items():
+        monkeypatch.setitem(app.config, key, value)
+    user = make_assigned_school(3)
+    # İlk öğretmen pazartesi ilk üç saatte müsait değil
+    teacher = m.Teacher.query.filter_by(user_id=user.id).order_by(m.Teacher.id).first()
+    m.TeacherSchedule.query.filter(
+        m.TeacherSchedule.teacher_id == teacher.id,
+        m.TeacherSchedule.day == "pazartesi",
+        m.TeacherSchedule.hour <= 3,
+    ).update({"is_open": False})
+    m.invalidate_availability(user.id)
+    m.db.session.commit()
+
+    snapshot = m.create_schedule(user.id, engine=engine)
+
+    cells = m.CourseSchedule.query.filter_by(user_id=user.id).all()
+    teacher_slots = [(cell.teacher_id, cell.day, cell.hour) for cell in cells]
+    class_slots = [(cell.class_id, cell.day, cell.hour) for cell in cells]
+    assert len(set(teacher_slots)) == len(teacher_slots)
+    assert len(set(class_slots)) == len(class_slots)
+    open_slots = {
+        (row.teacher_id, row.day, row.hour)
+        for row in m.TeacherSchedule.query.filter_by(user_id=user.id, is_open=True)
+    }
+    assert set(teacher_slots) <= open_slots
+    weekly_hours = sum(
+        assignment.course.weekly_hours
+        for assignment in m.TeacherCourseAssignment.query.filter_by(user_id=user.id)
+    )
+    assert len(cells) == snapshot.cell_count == weekly_hours - snapshot.unplaced_hours
+    assert cells
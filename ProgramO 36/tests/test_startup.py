@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import app as m
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_running_job(user_id):
+    job = m.SolverJob(
+        id=uuid.uuid4().hex, user_id=user_id, engine="heuristic", status="running"
+    )
+    m.db.session.add(job)
+    m.db.session.commit()
+    return job.id
+
+
+def job_status(job_id):
+    m.db.session.expire_all()
+    return m.db.session.get(m.SolverJob, job_id).status
+
+
+def test_solver_workers_do_not_touch_the_database(make_school):
+    job_id = add_running_job(make_school(1).id)
+    with m.solver_process_pool(1) as pool:
+        # İşçi app modülünü içe aktarmak zorunda kalır
+        assert pool.submit(m.hours_to_mask, [1, 2]).result() == 0b110
+    assert job_status(job_id) == "running"
+
+
+def test_importing_the_app_prepares_the_database(make_school):
+    job_id = add_running_job(make_school(1).id)
+    with m.db.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE active_schedule")
+    # Sunucu yeniden başlatılır: ek bir komut çalıştırılmadan şema hazırlanır
+    subprocess.run(
+        [sys.executable, "-c", "import app"], cwd=APP_DIR, check=True, env=os.environ
+    )
+    assert "active_schedule" in m.db.inspect(m.db.engine).get_table_names()
+    assert job_status(job_id) == "failed"